@@ -0,0 +1,175 @@
+"""
+Academic Standing - Probation, warnings and study period limits, evaluated for all students in one batch
+"""
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, List, Optional
+from grade_manager import GradeManager
+from grade_calculator import GradeCalculator
+from records import GradeRecord
+from repositories import get_storage
+
+# Standings from least to most severe; a student gets the most severe one triggered
+GOOD = 'good'
+WARNING = 'warning'
+PROBATION = 'probation'
+STUDY_PERIOD_EXCEEDED = 'study_period_exceeded'
+SEVERITY = (GOOD, WARNING, PROBATION, STUDY_PERIOD_EXCEEDED)
+
+
+class StandingRules:
+    """
+    Thresholds for the standing evaluation
+    
+    - probation: IPS of the latest graded semester below probation_ips
+    - warning: at least warning_failed_courses courses whose best grade is
+      still failing, or entering the last year of the study period
+    - study_period_exceeded: max_study_years or more since batch_year
+    """
+    
+    def __init__(self, probation_ips: float = 2.0, warning_failed_courses: int = 3,
+                 max_study_years: int = 7):
+        self.probation_ips = probation_ips
+        self.warning_failed_courses = warning_failed_courses
+        self.max_study_years = max_study_years
+    
+    @staticmethod
+    def from_config(config) -> 'StandingRules':
+        """Rules from the STANDING_* settings of a Flask config"""
+        return StandingRules(config['STANDING_PROBATION_IPS'],
+                             config['STANDING_WARNING_FAILED_COURSES'],
+                             config['STANDING_MAX_STUDY_YEARS'])
+
+
+class AcademicStanding:
+    """Evaluate and store academic standing"""
+    
+    @staticmethod
+    def summarize(records: List[GradeRecord]) -> Dict:
+        """
+        Figures a standing is based on: ips (latest semester), ipk, failed
+        (codes of courses whose best grade is failing) and last_semester
+        """
+        
+        last_semester = max((r.semester for r in records), default=None)
+        ips = None
+        if last_semester is not None:
+            ips = GradeCalculator._ips_from_records([r for r in records if r.semester == last_semester])
+        return {
+            'ips': ips,
+            'ipk': GradeCalculator._ipk_from_records(records),
+            'failed': sorted(code for code, record in GradeCalculator._best_grades_by_course(records).items()
+                             if not GradeManager.is_passed(record.numeric_grade)),
+            'last_semester': last_semester
+        }
+    
+    @staticmethod
+    def evaluate(student: dict, records: List[GradeRecord], rules: StandingRules,
+                 as_of_year: int) -> Dict:
+        """
+        Standing of one student from their already-loaded grade records
+        
+        Returns:
+            Dict: nim, standing, reasons, ips (latest semester), ipk,
+                failed_courses and last_semester
+        """
+        
+        summary = AcademicStanding.summarize(records)
+        last_semester = summary['last_semester']
+        ips = summary['ips']
+        ipk = summary['ipk']
+        failed = summary['failed']
+        
+        standing = GOOD
+        reasons = []
+        
+        def flag(level, reason):
+            nonlocal standing
+            reasons.append(reason)
+            if SEVERITY.index(level) > SEVERITY.index(standing):
+                standing = level
+        
+        years = as_of_year - student['batch_year']
+        if years >= rules.max_study_years:
+            flag(STUDY_PERIOD_EXCEEDED,
+                 f"Masa studi {years} tahun melewati batas {rules.max_study_years} tahun")
+        elif years == rules.max_study_years - 1:
+            flag(WARNING, f"Tahun terakhir masa studi ({rules.max_study_years} tahun)")
+        
+        if ips is not None and ips < rules.probation_ips:
+            flag(PROBATION, f"IPS semester {last_semester} {ips} di bawah {rules.probation_ips}")
+        
+        if len(failed) >= rules.warning_failed_courses:
+            flag(WARNING, f"{len(failed)} mata kuliah belum lulus: {', '.join(failed)}")
+        
+        return {
+            'nim': student['nim'],
+            'standing': standing,
+            'reasons': reasons,
+            'ips': ips,
+            'ipk': ipk,
+            'failed_courses': len(failed),
+            'last_semester': last_semester
+        }
+    
+    @staticmethod
+    def evaluate_all(rules: Optional[StandingRules] = None, as_of_year: Optional[int] = None) -> Dict:
+        """
+        Evaluate every student and store the results (nightly job)
+        
+        Students come from one query and all grades from one streamed pass.
+        Results are compared with the stored standings, and all standings
+        plus the changes are written in a single transaction.
+        
+        Returns:
+            Dict: evaluated, changed and the number of students per standing
+        """
+        
+        rules = rules or StandingRules()
+        as_of_year = as_of_year or datetime.now().year
+        storage = get_storage()
+        
+        current = storage.standings.list_current()
+        
+        # Students and grades are both ordered by NIM: merge them without holding all grades
+        groups = groupby(GradeManager.iter_all_grade_records(), key=lambda r: r.nim)
+        pending = next(groups, None)
+        
+        standings = []
+        changes = []
+        for student in storage.students.list_all():
+            while pending is not None and pending[0] < student['nim']:
+                pending = next(groups, None)  # Grades of an unknown student
+            records = []
+            if pending is not None and pending[0] == student['nim']:
+                records = list(pending[1])
+                pending = next(groups, None)
+            
+            result = AcademicStanding.evaluate(student, records, rules, as_of_year)
+            standings.append(result)
+            previous = current.get(student['nim'])
+            if previous is None or previous['standing'] != result['standing']:
+                changes.append({
+                    'nim': student['nim'],
+                    'old_standing': previous['standing'] if previous else None,
+                    'new_standing': result['standing'],
+                    'reasons': result['reasons']
+                })
+        
+        storage.standings.save_evaluation(standings, changes)
+        
+        counts = {standing: 0 for standing in SEVERITY}
+        for result in standings:
+            counts[result['standing']] += 1
+        return {'evaluated': len(standings), 'changed': len(changes), 'standings': counts}
+    
+    @staticmethod
+    def get_standing(nim: str) -> Optional[Dict]:
+        """A student's stored standing with its history, or None if never evaluated"""
+        
+        storage = get_storage()
+        standing = storage.standings.get(nim)
+        if standing is None:
+            return None
+        standing['history'] = storage.standings.list_history(nim)
+        return standing
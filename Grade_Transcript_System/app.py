@@ -1,52 +1,240 @@
 """
 Flask Web Application for Grade & Transcript Management System
 """
-from flask import Flask, render_template, request, jsonify, send_file, session
+from flask import Blueprint, Flask, Response, current_app, render_template, request, jsonify, send_file, session
+from flask.json.provider import DefaultJSONProvider
 from grade_manager import GradeManager
 from grade_calculator import GradeCalculator
+from grade_simulator import GradeSimulator
+from grade_target_solver import GradeTargetSolver
+from ranking import CohortRankingIndex
+from grading_scale import GradingScaleRegistry
+from grade_components import GradeComponents
+from curriculum import Curriculum, DEFAULT_GRADUATION_SKS
+from academic_standing import AcademicStanding, StandingRules
 from transcript_generator import TranscriptGenerator
-from database import get_connection, init_database, populate_sample_data
+from transcript_verification import TranscriptSigner
+from change_feed import ChangeBroker, parse_last_event_id, stream_events
+from change_log import ChangeLog, DEFAULT_BATCH_SIZE
+from backup import BackupManager, BackupScheduler
+from integrity import IntegrityChecker, DEFAULT_CONSUMER
+from database import init_database, populate_sample_data
+from config import Config
+import database
+import click
+from flask.cli import with_appcontext
+from repositories import get_storage
+from records import GradeRecord
+import json
 import os
+import time
 from datetime import datetime
+from typing import Optional
 
-app = Flask(__name__)
-app.secret_key = 'your-secret-key-here'
+class RecordJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes GradeRecords at the response boundary"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, GradeRecord):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+bp = Blueprint('transcript_system', __name__)
+
+def create_app(config: dict = None) -> Flask:
+    """
+    Application factory
+    
+    Applies the configuration (DB path and shards, connection pool and cache
+    sizes, transcript output directory) without touching the schema, so worker
+    startup stays cheap. Create the schema once before starting workers:
+        
+        flask --app app init-db [--sample-data]
+    
+    Args:
+        config: Overrides for the defaults in config.Config
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+    app.json = RecordJSONProvider(app)
+    
+    database.configure(
+        database_file=app.config['DATABASE_FILE'],
+        snapshot_file=app.config['SNAPSHOT_FILE'],
+        snapshot_max_age=app.config['SNAPSHOT_MAX_AGE_SECONDS'],
+        pool_size=app.config['DB_POOL_SIZE'],
+        cache_size_kb=app.config['SQLITE_CACHE_SIZE_KB'],
+        shard_files=app.config['SHARD_FILES'],
+        shard_key=app.config['SHARD_KEY']
+    )
+    
+    # Deadline-rate grade input: one writer thread commits concurrent submissions together
+    if app.config['GROUP_COMMIT']:
+        GradeManager.enable_group_commit(app.config['GROUP_COMMIT_MAX_DELAY_MS'] / 1000.0,
+                                         app.config['GROUP_COMMIT_MAX_BATCH'])
+    
+    # Signs the QR tokens on transcripts and checks them at /verify (only with an explicit key)
+    signer = None
+    if app.config['SIGNING_KEY']:
+        signer = TranscriptSigner(app.config['SIGNING_KEY'], app.config['VERIFY_BASE_URL'])
+    else:
+        app.logger.warning("SIGNING_KEY (TRANSCRIPT_SIGNING_KEY) is not set: transcripts are printed "
+                           "without verification QR codes and /verify rejects every token")
+    
+    # Pushes stored grades to /api/stream/grades subscribers; held weakly, so the
+    # listener goes away with this app instead of piling up across create_app() calls
+    change_broker = ChangeBroker()
+    GradeManager.add_change_listener(change_broker.publish, weak=True)
+    
+    # Cohort IPK rankings, brought up to date from the grade change log on each query
+    ranking_index = CohortRankingIndex()
+    
+    app.extensions['transcript_system'] = {
+        'transcript_gen': TranscriptGenerator(app.config['TRANSCRIPT_DIR'], signer),
+        'signer': signer,
+        'ranking_index': ranking_index,
+        'change_broker': change_broker
+    }
+    
+    app.register_blueprint(bp)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(evaluate_standing_command)
+    app.cli.add_command(export_changes_command)
+    app.cli.add_command(backup_db_command)
+    app.cli.add_command(restore_db_command)
+    app.cli.add_command(check_integrity_command)
+    
+    return app
 
-# Initialize database
-init_database()
-populate_sample_data()
+def _transcript_gen() -> TranscriptGenerator:
+    return current_app.extensions['transcript_system']['transcript_gen']
 
-# Initialize transcript generator
-transcript_gen = TranscriptGenerator()
+def _signer() -> Optional[TranscriptSigner]:
+    return current_app.extensions['transcript_system']['signer']
+
+def _change_broker() -> ChangeBroker:
+    return current_app.extensions['transcript_system']['change_broker']
+
+def _ranking_index() -> CohortRankingIndex:
+    return current_app.extensions['transcript_system']['ranking_index']
+
+@click.command('init-db')
+@click.option('--sample-data', is_flag=True, help='Also load the sample students, courses and grades.')
+def init_db_command(sample_data):
+    """Create the database schema (run once, before starting workers)"""
+    init_database()
+    if sample_data:
+        populate_sample_data()
+
+@click.command('evaluate-standing')
+@click.option('--year', type=int, default=None, help='Academic year to evaluate as of (default: this year).')
+@with_appcontext
+def evaluate_standing_command(year):
+    """Evaluate every student's academic standing (nightly job)"""
+    summary = AcademicStanding.evaluate_all(StandingRules.from_config(current_app.config), year)
+    click.echo(f"Evaluated {summary['evaluated']} students, {summary['changed']} changed: "
+               + ", ".join(f"{standing}={count}" for standing, count in summary['standings'].items()))
+
+@click.command('export-changes')
+@click.argument('consumer')
+@click.option('--limit', type=int, default=DEFAULT_BATCH_SIZE, help='Changes per batch.')
+@with_appcontext
+def export_changes_command(consumer, limit):
+    """Print a consumer's new grade changes as JSON lines and commit its offset (cron job)"""
+    while True:
+        batch = ChangeLog.poll(consumer, limit)
+        for change in batch['changes']:
+            click.echo(json.dumps(change, ensure_ascii=False))
+        if batch['changes']:
+            ChangeLog.commit(consumer, batch['next_offset'])
+        if not batch['has_more']:
+            break
+
+def _backup_manager() -> BackupManager:
+    return BackupManager(current_app.config['BACKUP_DIR'], current_app.config['BACKUP_COMPRESS'],
+                         current_app.config['BACKUP_PAGES_PER_STEP'], current_app.config['BACKUP_KEEP'])
+
+@click.command('backup-db')
+@click.option('--every', type=float, default=None, help='Keep running, backing up every N seconds.')
+@with_appcontext
+def backup_db_command(every):
+    """Back up the live database (and shards) without stopping the application"""
+    manager = _backup_manager()
+    if every is None:
+        manifest = manager.create()
+        click.echo(f"Backup {manifest['name']} ({len(manifest['files'])} files) as of {manifest['created_at']} UTC")
+        return
+    scheduler = BackupScheduler(manager, every)
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+@click.command('restore-db')
+@click.option('--at', default=None, help='UTC time "YYYY-MM-DD HH:MM:SS" (default: now).')
+@click.option('--target', required=True, help='Directory for the restored database files.')
+@with_appcontext
+def restore_db_command(at, target):
+    """Rebuild the database as of a point in time from a backup plus the change log"""
+    try:
+        result = _backup_manager().restore(target, at)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Restored backup {result['backup']} to {result['at']} UTC, "
+               f"{result['replayed']} changes replayed:")
+    for source, restored in result['files'].items():
+        click.echo(f"  {source} -> {restored}")
+    for source in result['not_replayed']:
+        click.echo(f"  {source} is unreadable: restored as of the backup only")
+
+@click.command('check-integrity')
+@click.option('--incremental', is_flag=True, help='Only re-check grades changed since the last incremental run.')
+@click.option('--consumer', default=DEFAULT_CONSUMER, help='Change log consumer of incremental runs.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the full report as JSON.')
+@with_appcontext
+def check_integrity_command(incremental, consumer, as_json):
+    """Report orphaned grades, grade mismatches, orphaned audit rows and drifted derived data"""
+    checker = IntegrityChecker(current_app.config['INTEGRITY_CHUNK_SIZE'],
+                               current_app.config['INTEGRITY_PAUSE_MS'] / 1000.0)
+    report = checker.scan_changes(consumer) if incremental else checker.scan()
+    if as_json:
+        click.echo(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        click.echo("Checked " + ", ".join(f"{count} {table}" for table, count in report['checked'].items())
+                   + f" in {report['seconds']} s")
+        for issue in report['issues']:
+            key = ", ".join(f"{name}={value}" for name, value in issue.items() if name not in ('check', 'detail'))
+            click.echo(f"  {issue['check']}: {key}: {issue['detail']}")
+        if report['truncated']:
+            click.echo("  ... " + ", ".join(f"{check}={count}" for check, count in report['counts'].items()))
+    if not report['ok']:
+        raise SystemExit(1)  # Non-zero exit for cron/monitoring
 
 # ===================== ROUTES =====================
 
-@app.route('/')
+@bp.route('/')
 def index():
     """Home page"""
     return render_template('index.html')
 
-@app.route('/api/students', methods=['GET'])
+@bp.route('/api/students', methods=['GET'])
 def get_students():
     """Get all students"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM students ORDER BY nim")
-    students = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    students = get_storage().students.list_all()
     return jsonify(students)
 
-@app.route('/api/courses', methods=['GET'])
+@bp.route('/api/courses', methods=['GET'])
 def get_courses():
     """Get all courses"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM courses ORDER BY course_code")
-    courses = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    courses = get_storage().courses.list_all()
     return jsonify(courses)
 
-@app.route('/api/student/<nim>', methods=['GET'])
+@bp.route('/api/student/<nim>', methods=['GET'])
 def get_student_details(nim):
     """Get student details"""
     student = GradeManager.get_student_info(nim)
@@ -54,14 +242,14 @@ def get_student_details(nim):
         return jsonify({'error': 'Student not found'}), 404
     return jsonify(student)
 
-@app.route('/api/grades/<nim>', methods=['GET'])
+@bp.route('/api/grades/<nim>', methods=['GET'])
 def get_student_grades(nim):
     """Get all grades for a student"""
     semester = request.args.get('semester', type=int)
     grades = GradeManager.get_all_grades_for_student(nim, semester)
     return jsonify(grades)
 
-@app.route('/api/grade', methods=['POST'])
+@bp.route('/api/grade', methods=['POST'])
 def input_grade_api():
     """API endpoint to input a grade"""
     data = request.json
@@ -86,7 +274,189 @@ def input_grade_api():
             'message': f'Error: {str(e)}'
         }), 400
 
-@app.route('/api/calculator/ips/<nim>/<int:semester>', methods=['GET'])
+@bp.route('/api/grades/bulk', methods=['POST'])
+def bulk_input_grades_api():
+    """
+    Input many grades in one transaction
+    
+    Body: {"grades": [{"nim", "course_code", "semester", "letter_grade" or "score",
+                       "presence_percentage"?}, ...]}
+    """
+    data = request.json or {}
+    
+    try:
+        results = GradeManager.bulk_input_grades(data.get('grades', []))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 400
+    
+    return jsonify({
+        'success': all(ok for ok, _ in results),
+        'stored': sum(1 for ok, _ in results if ok),
+        'results': [{'success': ok, 'message': message} for ok, message in results]
+    })
+
+@bp.route('/api/grading-scales', methods=['GET'])
+def get_grading_scales():
+    """Get every configured grading scale (default '*' first)"""
+    return jsonify([scale.to_dict() for scale in GradingScaleRegistry.list_scales()])
+
+@bp.route('/api/grading-scales/<program_study>', methods=['PUT'])
+def set_grading_scale(program_study):
+    """
+    Replace a program's grading scale
+    
+    Body: {"entries": [{"letter_grade", "numeric_grade", "min_score"}, ...]}
+    """
+    data = request.json or {}
+    
+    try:
+        entries = [(e['letter_grade'], float(e['numeric_grade']), float(e['min_score']))
+                   for e in data.get('entries', [])]
+        scale = GradingScaleRegistry.set_scale(program_study, entries)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid scale: {str(e)}'}), 400
+    
+    return jsonify(scale.to_dict())
+
+@bp.route('/api/components/<course_code>', methods=['GET'])
+def get_components(course_code):
+    """Get a course's assessment component weights"""
+    return jsonify({'course_code': course_code, 'weights': GradeComponents.get_weights(course_code)})
+
+@bp.route('/api/components/<course_code>', methods=['PUT'])
+def set_components(course_code):
+    """
+    Replace a course's assessment component weights
+    
+    Body: {"weights": {"tugas": 30, "uts": 30, "uas": 40}}
+    """
+    data = request.json or {}
+    
+    try:
+        weights = GradeComponents.set_weights(course_code, data.get('weights', {}))
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid components: {str(e)}'}), 400
+    
+    return jsonify({'course_code': course_code, 'weights': weights})
+
+@bp.route('/api/components/<course_code>/<int:semester>/scores', methods=['POST'])
+def record_component_scores(course_code, semester):
+    """
+    Store raw component scores for a class
+    
+    Body: {"scores": [{"nim", "component", "score"}, ...]}
+    """
+    data = request.json or {}
+    
+    try:
+        stored = GradeComponents.record_scores(
+            course_code, semester,
+            [(row['nim'], row['component'], row['score']) for row in data.get('scores', [])]
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 400
+    
+    return jsonify({'success': True, 'stored': stored})
+
+@bp.route('/api/components/<course_code>/<int:semester>/final', methods=['GET'])
+def get_component_finals(course_code, semester):
+    """Preview final scores and letter grades of a class"""
+    try:
+        return jsonify(GradeComponents.compute_class(course_code, semester))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+
+@bp.route('/api/components/<course_code>/<int:semester>/finalize', methods=['POST'])
+def finalize_component_grades(course_code, semester):
+    """
+    Store a class's computed final grades in the grades table
+    
+    Body: {"presence": {"<nim>": <percentage>, ...}, "allow_missing": false}
+    """
+    data = request.json or {}
+    
+    try:
+        return jsonify(GradeComponents.finalize_class(course_code, semester, data.get('presence'),
+                                                      bool(data.get('allow_missing', False))))
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+@bp.route('/api/curriculum/<program_study>', methods=['GET'])
+def get_curriculum(program_study):
+    """Get a program's curriculum in prerequisite order"""
+    graph = Curriculum.get_graph(program_study)
+    if graph is None:
+        return jsonify({'error': 'Curriculum not found'}), 404
+    return jsonify(graph.to_dict())
+
+@bp.route('/api/curriculum/<program_study>', methods=['PUT'])
+def set_curriculum(program_study):
+    """
+    Replace a program's curriculum
+    
+    Body: {"graduation_sks"?: 144,
+           "courses": [{"course_code", "semester"?, "required"?, "prerequisites"?: [...]}, ...]}
+    """
+    data = request.json or {}
+    
+    try:
+        graph = Curriculum.set_curriculum(program_study, data.get('courses', []),
+                                          data.get('graduation_sks', DEFAULT_GRADUATION_SKS))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid curriculum: {str(e)}'}), 400
+    
+    return jsonify(graph.to_dict())
+
+@bp.route('/api/curriculum/<program_study>/eligibility', methods=['GET'])
+def get_program_eligibility(program_study):
+    """Eligible courses and remaining SKS of every student of a program (KRS opening)"""
+    return jsonify(Curriculum.check_all(program_study))
+
+@bp.route('/api/curriculum/eligibility/<nim>', methods=['GET'])
+def get_student_eligibility(nim):
+    """Eligible courses, blocked courses with missing prerequisites, and remaining SKS"""
+    result = Curriculum.check_student(nim)
+    if result is None:
+        return jsonify({'error': 'Student or curriculum not found'}), 404
+    return jsonify(result)
+
+@bp.route('/api/standing/<nim>', methods=['GET'])
+def get_academic_standing(nim):
+    """Latest academic standing of a student with its change history"""
+    standing = AcademicStanding.get_standing(nim)
+    if standing is None:
+        return jsonify({'error': 'Standing not evaluated yet'}), 404
+    return jsonify(standing)
+
+@bp.route('/api/standing/evaluate', methods=['POST'])
+def evaluate_academic_standing():
+    """
+    Run the standing evaluation for every student now
+    
+    Body: {"year"?: 2025}
+    """
+    data = request.json or {}
+    try:
+        year = int(data['year']) if data.get('year') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'year must be a number'}), 400
+    return jsonify(AcademicStanding.evaluate_all(StandingRules.from_config(current_app.config), year))
+
+@bp.route('/api/semester-close', methods=['POST'])
+def close_semester():
+    """
+    Freeze transcripts up to a semester as new snapshot versions
+    
+    Body: {"semester": 4, "nims"?: ["21001", ...]}
+    """
+    data = request.json or {}
+    try:
+        semester = int(data['semester'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'semester is required'}), 400
+    return jsonify(GradeCalculator.close_semester(semester, data.get('nims')))
+
+@bp.route('/api/calculator/ips/<nim>/<int:semester>', methods=['GET'])
 def get_ips(nim, semester):
     """Calculate IPS for a semester"""
     ips = GradeCalculator.calculate_ips(nim, semester)
@@ -96,7 +466,7 @@ def get_ips(nim, semester):
         'ips': ips
     })
 
-@app.route('/api/calculator/ipk/<nim>', methods=['GET'])
+@bp.route('/api/calculator/ipk/<nim>', methods=['GET'])
 def get_ipk(nim):
     """Calculate IPK"""
     ipk = GradeCalculator.calculate_ipk(nim)
@@ -107,21 +477,162 @@ def get_ipk(nim):
         'predicate': predicate
     })
 
-@app.route('/api/transcript/<nim>', methods=['GET'])
+@bp.route('/api/calculator/what-if/<nim>', methods=['POST'])
+def what_if(nim):
+    """
+    Project IPS/IPK for hypothetical grades
+    
+    Body: {"grades": [{"course_code", "letter_grade", "semester"?, "sks"?}, ...]}
+      or  {"scenarios": [[...], [...]]} to evaluate several at once
+    """
+    if not GradeManager.get_student_info(nim):
+        return jsonify({'error': 'Student not found'}), 404
+    
+    data = request.json or {}
+    
+    try:
+        simulator = GradeSimulator(nim)
+        if 'scenarios' in data:
+            return jsonify(simulator.simulate_many(data['scenarios']))
+        return jsonify(simulator.simulate(data.get('grades', [])))
+    
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid scenario: {str(e)}'}), 400
+
+@bp.route('/api/calculator/predicate-targets/<nim>', methods=['POST'])
+def predicate_targets(nim):
+    """
+    Minimum grades on planned courses needed for each graduation predicate
+    
+    Body: {"planned": [{"course_code", "sks"?}, ...]}
+    """
+    if not GradeManager.get_student_info(nim):
+        return jsonify({'error': 'Student not found'}), 404
+    
+    data = request.json or {}
+    
+    try:
+        return jsonify(GradeTargetSolver.solve(nim, data.get('planned', [])))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid plan: {str(e)}'}), 400
+
+@bp.route('/api/calculator/predicate-targets', methods=['POST'])
+def predicate_targets_cohort():
+    """
+    Predicate targets for a whole cohort in one call
+    
+    Body: {"plans": {"<nim>": [{"course_code", "sks"?}, ...], ...}}
+    """
+    data = request.json or {}
+    
+    try:
+        return jsonify(GradeTargetSolver.solve_cohort(data.get('plans', {})))
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        return jsonify({'error': f'Invalid plan: {str(e)}'}), 400
+
+@bp.route('/api/transcript/<nim>', methods=['GET'])
 def get_transcript_api(nim):
-    """Get full transcript"""
-    transcript = GradeCalculator.get_transcript(nim)
+    """Get full transcript (?version=N for a frozen snapshot version)"""
+    version = request.args.get('version', type=int)
+    if version is not None:
+        transcript = GradeCalculator.get_transcript_version(nim, version)
+    else:
+        transcript = GradeCalculator.get_transcript(nim)
     if not transcript:
         return jsonify({'error': 'No transcript data found'}), 404
     return jsonify(transcript)
 
-@app.route('/api/performance-stats/<nim>', methods=['GET'])
+@bp.route('/api/transcript/<nim>/versions', methods=['GET'])
+def get_transcript_versions(nim):
+    """Frozen snapshot versions of a student's transcript, newest first"""
+    return jsonify(GradeCalculator.list_transcript_versions(nim))
+
+@bp.route('/api/performance-stats/<nim>', methods=['GET'])
 def get_performance_stats(nim):
     """Get performance statistics"""
     stats = GradeCalculator.get_performance_statistics(nim)
     return jsonify(stats)
 
-@app.route('/api/audit-trail/<nim>', methods=['GET'])
+@bp.route('/api/ranking/<program_study>/<int:batch_year>', methods=['GET'])
+def get_cohort_ranking(program_study, batch_year):
+    """Top-K students of a cohort by IPK"""
+    k = request.args.get('k', default=10, type=int)
+    return jsonify(_ranking_index().top(program_study, batch_year, k))
+
+@bp.route('/api/ranking/student/<nim>', methods=['GET'])
+def get_student_rank(nim):
+    """IPK rank and percentile of a student within their cohort"""
+    rank = _ranking_index().rank_of(nim)
+    if rank is None:
+        return jsonify({'error': 'Student not found'}), 404
+    return jsonify(rank)
+
+@bp.route('/api/stream/grades', methods=['GET'])
+def stream_grades():
+    """
+    Server-Sent Events stream of stored grades
+    
+    Query: nim and/or course_code to filter (default: every change). Each
+    event is {id, nim, course_code, semester, letter_grade, numeric_grade,
+    updated}; a 'resync' event means changes were missed and the client
+    should re-fetch. Reconnecting clients resume from Last-Event-ID.
+    """
+    subscription = _change_broker().subscribe(
+        request.args.get('nim'), request.args.get('course_code'),
+        parse_last_event_id(request.headers.get('Last-Event-ID')))
+    return Response(stream_events(subscription), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/api/metrics/single-flight', methods=['GET'])
+def get_single_flight_metrics():
+    """Coalescing counts of concurrent transcript/IPK computations in this worker"""
+    return jsonify(GradeCalculator.flight_metrics())
+
+@bp.route('/api/changes', methods=['GET'])
+def get_changes():
+    """
+    Grade changes after an offset, oldest first
+    
+    Query: since (change_id, or one per shard as "12.0.7"; default 0), limit.
+    Returns {changes, next_offset, has_more}; pass next_offset as since for
+    the next batch.
+    """
+    try:
+        return jsonify(ChangeLog.read(request.args.get('since', '0'),
+                                      request.args.get('limit', DEFAULT_BATCH_SIZE, type=int)))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid offset: {e}'}), 400
+
+@bp.route('/api/changes/consumers', methods=['GET'])
+def get_change_consumers():
+    """Committed offset and lag of every change log consumer"""
+    return jsonify(ChangeLog.consumers())
+
+@bp.route('/api/changes/consumers/<consumer>', methods=['GET'])
+def poll_changes(consumer):
+    """Next batch of changes after a consumer's committed offset (?limit=)"""
+    return jsonify(ChangeLog.poll(consumer, request.args.get('limit', DEFAULT_BATCH_SIZE, type=int)))
+
+@bp.route('/api/changes/consumers/<consumer>', methods=['PUT'])
+def commit_changes(consumer):
+    """
+    Commit a consumer's offset once it has processed a batch
+    
+    Body: {"offset": 120} (with shards, the poll's next_offset, e.g. "12.0.7")
+    """
+    data = request.json or {}
+    try:
+        return jsonify(ChangeLog.commit(consumer, data['offset']))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid offset: {e}'}), 400
+
+@bp.route('/api/metrics/group-commit', methods=['GET'])
+def get_group_commit_metrics():
+    """Rows, commits and group sizes of the grade group commit writer in this worker"""
+    metrics = GradeManager.group_commit_metrics()
+    return jsonify({'enabled': metrics is not None, **(metrics or {})})
+
+@bp.route('/api/audit-trail/<nim>', methods=['GET'])
 def get_audit_trail(nim):
     """Get grade change audit trail"""
     history = GradeManager.get_grade_history(nim)
@@ -129,16 +640,17 @@ def get_audit_trail(nim):
 
 # ===================== PDF GENERATION ROUTES =====================
 
-@app.route('/download-transcript/<nim>', methods=['GET'])
+@bp.route('/download-transcript/<nim>', methods=['GET'])
 def download_transcript(nim):
-    """Download transcript as PDF"""
+    """Download transcript as PDF (?version=N for a frozen snapshot version)"""
     try:
         student = GradeManager.get_student_info(nim)
         if not student:
             return "Student not found", 404
         
+        version = request.args.get('version', type=int)
         filename = f"Transcript_{nim}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf_path = transcript_gen.generate_transcript(nim, filename)
+        pdf_path = _transcript_gen().generate_transcript(nim, filename, version=version)
         
         return send_file(
             pdf_path,
@@ -149,42 +661,70 @@ def download_transcript(nim):
     except Exception as e:
         return f"Error generating transcript: {str(e)}", 500
 
+def _render_transcript(nim: str, format: str):
+    try:
+        content, media_type = _transcript_gen().render(nim, format, request.args.get('version', type=int))
+    except ValueError:
+        return jsonify({'error': 'No transcript data found'}), 404
+    return Response(content, mimetype=media_type)
+
+@bp.route('/transcript/<nim>/preview', methods=['GET'])
+def preview_transcript(nim):
+    """Printable HTML transcript rendered on the server (?version=N), without building a PDF"""
+    return _render_transcript(nim, 'html')
+
+@bp.route('/api/transcript/<nim>/credential', methods=['GET'])
+def get_transcript_credential(nim):
+    """Machine-readable transcript as an Open Badges 3.0 JSON-LD credential (?version=N)"""
+    return _render_transcript(nim, 'jsonld')
+
+@bp.route('/verify/<token>', methods=['GET'])
+def verify_transcript(token):
+    """Check the QR token of a printed transcript against the stored snapshots"""
+    if _signer() is None:
+        return jsonify({'valid': False, 'error': 'Transcript verification is not configured'}), 503
+    result = _signer().verify(token)
+    if result is None:
+        return jsonify({'valid': False, 'error': 'Unknown transcript or invalid signature'}), 404
+    return jsonify(result)
+
 # ===================== WEB INTERFACE ROUTES =====================
 
-@app.route('/grades')
+@bp.route('/grades')
 def grades_page():
     """Grade management page"""
     return render_template('grades.html')
 
-@app.route('/transcript')
+@bp.route('/transcript')
 def transcript_page():
     """Transcript view page"""
     return render_template('transcript.html')
 
-@app.route('/analytics')
+@bp.route('/analytics')
 def analytics_page():
     """Analytics and reports page"""
     return render_template('analytics.html')
 
-@app.route('/audit-trail')
+@bp.route('/audit-trail')
 def audit_page():
     """Audit trail page"""
     return render_template('audit_trail.html')
 
 # ===================== ERROR HANDLERS =====================
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Not found'}), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def server_error(error):
     return jsonify({'error': 'Server error'}), 500
 
 if __name__ == '__main__':
-    # Create transcripts directory if it doesn't exist
-    if not os.path.exists('transcripts'):
-        os.makedirs('transcripts')
+    # Development server: create the schema and sample data in-process
+    app = create_app()
+    init_database()
+    populate_sample_data()
     
     print("=" * 50)
     print("Grade & Transcript Management System")
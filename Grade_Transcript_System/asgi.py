@@ -0,0 +1,216 @@
+"""
+ASGI Entry Point - Serve the application from an asyncio server with a bounded database executor
+
+Connections are held by the event loop, so thousands of waiting clients
+cost coroutines rather than worker threads. Each request runs the Flask
+app in a fixed-size thread pool (sized like the SQLite connection pool),
+so the blocking sqlite3 calls never exceed what the database can serve.
+Identical concurrent GETs on the read endpoints share one computation.
+The grade event stream is served on the event loop itself, so open streams
+hold no threads.
+
+Run with any ASGI server, e.g.:
+    uvicorn --factory "asgi:create_asgi_app" --workers 4
+"""
+import asyncio
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from flask import Flask
+from app import create_app
+from change_feed import HEARTBEAT_SECONDS, format_sse, parse_last_event_id
+
+# GET endpoints whose responses depend only on path and query, safe to share
+COALESCED_PATHS = re.compile(
+    r'^/api/(transcript/[^/]+(/versions|/credential)?|grades/[^/]+|calculator/(ips/[^/]+/\d+|ipk/[^/]+)'
+    r'|performance-stats/[^/]+)$'
+)
+
+# Server-Sent Events endpoint handled natively (see AsyncApp._stream)
+STREAM_PATH = '/api/stream/grades'
+
+Response = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+
+class AsyncApp:
+    """
+    ASGI application running a Flask app in a bounded executor
+    
+    Attributes:
+        requests: HTTP requests handled
+        coalesced: Requests answered by another request's in-flight computation
+    """
+    
+    def __init__(self, app: Flask, max_workers: int):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='transcript-db')
+        self._inflight: Dict[Tuple[str, bytes], asyncio.Future] = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.heartbeat = HEARTBEAT_SECONDS
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']}")
+        
+        body = await self._read_body(receive)
+        self.requests += 1
+        if scope['method'] == 'GET' and scope['path'] == STREAM_PATH:
+            await self._stream(scope, receive, send)
+            return
+        if scope['method'] == 'GET' and COALESCED_PATHS.match(scope['path']):
+            status, headers, content = await self._shared((scope['path'], scope['query_string']), scope)
+        else:
+            status, headers, content = await self._run(scope, body)
+        
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+    
+    async def _shared(self, key: Tuple[str, bytes], scope) -> Response:
+        """Join the in-flight request for key, or start it"""
+        
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._run(scope, b'')
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._inflight[key]
+    
+    async def _stream(self, scope, receive, send):
+        """Grade change events for as long as the client stays connected"""
+        
+        query = parse_qs(scope['query_string'].decode('latin-1'))
+        headers = dict(scope['headers'])
+        broker = self.app.extensions['transcript_system']['change_broker']
+        subscription = broker.subscribe_async(
+            query.get('nim', [None])[0], query.get('course_code', [None])[0],
+            parse_last_event_id(headers.get(b'last-event-id', b'').decode('latin-1')))
+        disconnected = asyncio.ensure_future(receive())
+        
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no')]})
+            await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+            while True:
+                next_event = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait({next_event, disconnected}, timeout=self.heartbeat,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnected in done:
+                    next_event.cancel()
+                    break
+                if next_event in done:
+                    text = format_sse(next_event.result())
+                else:
+                    next_event.cancel()
+                    text = ": keep-alive\n\n"
+                await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+        finally:
+            subscription.close()
+            disconnected.cancel()
+    
+    async def _run(self, scope, body: bytes) -> Response:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._call_wsgi, scope, body)
+    
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+    
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    def _call_wsgi(self, scope, body: bytes) -> Response:
+        """Run one request through the Flask app (executor thread)"""
+        
+        environ = self._environ(scope, body)
+        started = {}
+        
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                  for name, value in headers]
+        
+        result = self.app.wsgi_app(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return started['status'], started['headers'], content
+    
+    @staticmethod
+    def _environ(scope, body: bytes) -> dict:
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            'CONTENT_LENGTH': str(len(body)),
+        }
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                key = f'HTTP_{name}'
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+
+def create_asgi_app(config: Optional[dict] = None) -> AsyncApp:
+    """
+    ASGI application factory
+    
+    Args:
+        config: Overrides for the defaults in config.Config, as for create_app
+    """
+    app = create_app(config)
+    return AsyncApp(app, app.config['ASYNC_MAX_WORKERS'] or max(app.config['DB_POOL_SIZE'], 1))
@@ -0,0 +1,353 @@
+"""
+Backup - Hot backups with the SQLite online backup API and point-in-time restore from the change log
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import database
+
+MANIFEST = "manifest.json"
+
+# Format of SQLite's CURRENT_TIMESTAMP (UTC), used for every backup and restore time
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _open(database_file: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(database_file, timeout=database.BUSY_TIMEOUT, isolation_level=None,
+                           uri=database_file.startswith("file:"))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _open_live(database_file: str) -> Optional[sqlite3.Connection]:
+    """Open a live database read-only (never creating it), or None if it is gone"""
+    if database_file.startswith("file:"):
+        return _open(database_file)
+    if not os.path.exists(database_file):
+        return None
+    return _open(Path(database_file).resolve().as_uri() + "?mode=ro")
+
+
+def _timestamp(at: Union[str, datetime, None]) -> str:
+    """A restore point as a UTC timestamp string (naive datetimes are taken as UTC)"""
+    if at is None:
+        return datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+    if isinstance(at, datetime):
+        if at.tzinfo is not None:
+            at = at.astimezone(timezone.utc)
+        return at.strftime(TIMESTAMP_FORMAT)
+    return datetime.strptime(at, TIMESTAMP_FORMAT).strftime(TIMESTAMP_FORMAT)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackupManager:
+    """
+    Consistent copies of the live database (and its shards) taken while it serves traffic
+    
+    Each file is copied with the online backup API in steps of
+    pages_per_step pages, inside one read transaction: in WAL mode writers
+    keep committing, and the copy is the database as of the moment the
+    read began. That moment's last grade_change_log and grade_history ids
+    are stored in the backup's manifest, so restore() can roll a backup
+    forward to any later time by replaying the live change log.
+    
+    A backup is a directory <backup_dir>/<UTC time>/ with one file per
+    database (gzip-compressed unless compress=False) and manifest.json.
+    """
+    
+    def __init__(self, backup_dir: str, compress: bool = True, pages_per_step: int = 256,
+                 keep: Optional[int] = None):
+        self.backup_dir = backup_dir
+        self.compress = compress
+        self.pages_per_step = pages_per_step
+        self.keep = keep
+    
+    def create(self) -> Dict:
+        """
+        Back up the live database and every shard
+        
+        Returns:
+            Dict: The backup's manifest (name, created_at, files)
+        """
+        
+        now = datetime.now(timezone.utc)
+        name = now.strftime("%Y%m%dT%H%M%S%fZ")
+        staging = os.path.join(self.backup_dir, name + ".tmp")
+        os.makedirs(staging)
+        
+        router = database.shard_router()
+        sources = [("main.db", database.DATABASE_FILE)]
+        if router is not None:
+            sources += [(f"shard{index}.db", shard_file)
+                        for index, shard_file in enumerate(router.shard_files)]
+        
+        try:
+            files = [self._copy(source, os.path.join(staging, file_name))
+                     for file_name, source in sources]
+            # Every change in the backup happened at or before its newest file snapshot
+            manifest = {'name': name, 'created_at': max(f['snapshot_at'] for f in files), 'files': files}
+            with open(os.path.join(staging, MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(staging, os.path.join(self.backup_dir, name))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        
+        if self.keep:
+            self.prune(self.keep)
+        return manifest
+    
+    def _copy(self, source: str, target: str) -> Dict:
+        """Copy one database file in page steps from a single read snapshot"""
+        
+        conn = _open(source)
+        destination = sqlite3.connect(target)
+        steps = 0
+        
+        def progress(status, remaining, total):
+            nonlocal steps
+            steps += 1
+        
+        try:
+            # The read transaction pins the snapshot: every step copies the same
+            # version of the database and the ids below describe exactly that version
+            conn.execute("BEGIN")
+            last_change_id = conn.execute(
+                "SELECT COALESCE(MAX(change_id), 0) FROM grade_change_log").fetchone()[0]
+            last_history_id = conn.execute(
+                "SELECT COALESCE(MAX(history_id), 0) FROM grade_history").fetchone()[0]
+            snapshot_at = conn.execute("SELECT CURRENT_TIMESTAMP").fetchone()[0]  # Not before the snapshot
+            conn.backup(destination, pages=self.pages_per_step, progress=progress)
+            conn.execute("COMMIT")
+            # A rollback journal keeps the copy in one self-contained file
+            destination.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            destination.close()
+            conn.close()
+        
+        if self.compress:
+            with open(target, 'rb') as raw, gzip.open(target + ".gz", 'wb', compresslevel=6) as packed:
+                shutil.copyfileobj(raw, packed, 1 << 20)
+            os.remove(target)
+            target += ".gz"
+        
+        return {
+            'file': os.path.basename(target),
+            'source': source,
+            'snapshot_at': snapshot_at,
+            'last_change_id': last_change_id,
+            'last_history_id': last_history_id,
+            'steps': steps,
+            'size': os.path.getsize(target),
+            'sha256': _sha256(target)
+        }
+    
+    def list(self) -> List[Dict]:
+        """Manifests of the complete backups, oldest first"""
+        
+        if not os.path.isdir(self.backup_dir):
+            return []
+        manifests = []
+        for name in sorted(os.listdir(self.backup_dir)):
+            path = os.path.join(self.backup_dir, name, MANIFEST)
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    manifests.append(json.load(f))
+        return manifests
+    
+    def prune(self, keep: int) -> int:
+        """Delete all but the newest keep backups; returns how many were deleted"""
+        
+        old = self.list()[:-keep] if keep > 0 else []
+        for manifest in old:
+            shutil.rmtree(os.path.join(self.backup_dir, manifest['name']))
+        return len(old)
+    
+    def restore(self, target_dir: str, at: Union[str, datetime, None] = None) -> Dict:
+        """
+        Rebuild the databases as they were at a point in time, into target_dir
+        
+        Takes the newest backup made at or before `at` (UTC; default now),
+        then replays the grade changes logged after it up to `at` from the
+        live databases' grade_change_log, together with their grade_history
+        rows. Grades and the audit trail are restored to the second; other
+        tables are as of the backup. The live databases are only read, and
+        not at all when `at` is the backup's own time (which restores the
+        backup as taken): stop the application and swap the restored files in.
+        
+        A live database that is gone (or has no change log) can't be
+        replayed: its file is restored as of the backup and listed in
+        not_replayed, so a lost database can still be recovered.
+        
+        Returns:
+            Dict: backup used, at, files (live source -> restored path),
+                replayed (number of changes applied) and not_replayed
+                (sources restored only as of the backup)
+        
+        Raises:
+            ValueError: If no backup is old enough, a backup file is corrupt,
+                or the live change log no longer reaches back to the backup
+        """
+        
+        at = _timestamp(at)
+        candidates = [m for m in self.list() if m['created_at'] <= at]
+        if not candidates:
+            raise ValueError(f"No backup at or before {at}")
+        manifest = candidates[-1]
+        os.makedirs(target_dir, exist_ok=True)
+        
+        files = {entry['source']: self._extract(manifest, entry, target_dir) for entry in manifest['files']}
+        
+        replayed = 0
+        not_replayed = []
+        if at > manifest['created_at']:
+            for entry in manifest['files']:
+                logged = self._read_log(entry, at)
+                if logged is None:
+                    not_replayed.append(entry['source'])
+                    continue
+                replayed += self._replay(entry, files[entry['source']], *logged)
+        
+        return {'backup': manifest['name'], 'at': at, 'files': files, 'replayed': replayed,
+                'not_replayed': not_replayed}
+    
+    def _extract(self, manifest: Dict, entry: Dict, target_dir: str) -> str:
+        """Verify one backup file and write it uncompressed into target_dir"""
+        
+        backup_file = os.path.join(self.backup_dir, manifest['name'], entry['file'])
+        if _sha256(backup_file) != entry['sha256']:
+            raise ValueError(f"Backup file {backup_file} is corrupt")
+        
+        target = os.path.join(target_dir, entry['file'][:-3] if entry['file'].endswith(".gz")
+                              else entry['file'])
+        if entry['file'].endswith(".gz"):
+            with gzip.open(backup_file, 'rb') as packed, open(target, 'wb') as raw:
+                shutil.copyfileobj(packed, raw, 1 << 20)
+        else:
+            shutil.copyfile(backup_file, target)
+        return target
+    
+    @staticmethod
+    def _read_log(entry: Dict, at: str) -> Optional[Tuple[list, list]]:
+        """The source's logged grade changes and audit rows after the backup, up to at (None if unreachable)"""
+        
+        try:
+            live = _open_live(entry['source'])
+        except sqlite3.OperationalError:
+            live = None
+        if live is None:
+            return None
+        try:
+            try:
+                latest = live.execute("SELECT COALESCE(MAX(change_id), 0) FROM grade_change_log").fetchone()[0]
+            except sqlite3.OperationalError:
+                return None
+            if latest < entry['last_change_id']:
+                raise ValueError(f"The change log of {entry['source']} does not reach back to the backup")
+            changes = live.execute("""
+                SELECT * FROM grade_change_log
+                WHERE change_id > ? AND changed_at <= ?
+                ORDER BY change_id
+            """, (entry['last_change_id'], at)).fetchall()
+            history = live.execute("""
+                SELECT * FROM grade_history
+                WHERE history_id > ? AND changed_at <= ?
+                ORDER BY history_id
+            """, (entry['last_history_id'], at)).fetchall()
+        finally:
+            live.close()
+        return changes, history
+    
+    @staticmethod
+    def _replay(entry: Dict, target: str, changes: list, history: list) -> int:
+        """Apply logged grade changes and audit rows to a restored file"""
+        
+        conn = _open(target)
+        try:
+            conn.execute("BEGIN")
+            for change in changes:
+                if change['operation'] == 'insert':
+                    conn.execute("""
+                        INSERT INTO grades (grade_id, nim, course_code, semester, letter_grade,
+                                            numeric_grade, presence_percentage, created_at, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (change['grade_id'], change['nim'], change['course_code'], change['semester'],
+                          change['letter_grade'], change['numeric_grade'], change['presence_percentage'],
+                          change['changed_at'], change['changed_at']))
+                elif change['operation'] == 'update':
+                    conn.execute("""
+                        UPDATE grades
+                        SET letter_grade = ?, numeric_grade = ?, presence_percentage = ?, updated_at = ?
+                        WHERE grade_id = ?
+                    """, (change['letter_grade'], change['numeric_grade'], change['presence_percentage'],
+                          change['changed_at'], change['grade_id']))
+                else:
+                    conn.execute("DELETE FROM grades WHERE grade_id = ?", (change['grade_id'],))
+            
+            # The triggers logged the replay under new timestamps: keep the original log instead
+            conn.execute("DELETE FROM grade_change_log WHERE change_id > ?", (entry['last_change_id'],))
+            if changes:
+                columns = changes[0].keys()
+                conn.executemany(
+                    f"INSERT INTO grade_change_log ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})", [tuple(change) for change in changes])
+            if history:
+                columns = history[0].keys()
+                conn.executemany(
+                    f"INSERT INTO grade_history ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})", [tuple(row) for row in history])
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return len(changes)
+
+
+class BackupScheduler:
+    """Take a backup on a fixed interval in a background thread"""
+    
+    def __init__(self, manager: BackupManager, interval_seconds: float = 3600.0):
+        self.manager = manager
+        self.interval_seconds = interval_seconds
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Take a backup now and keep taking them until stop() is called"""
+        if self._thread is not None:
+            return
+        self.manager.create()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the background backups"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.manager.create()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Backup failed: {e}")
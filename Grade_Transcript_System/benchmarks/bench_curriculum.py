@@ -0,0 +1,82 @@
+"""
+KRS eligibility benchmark
+
+Builds a temporary database with a whole student body and a layered
+prerequisite curriculum, then times Curriculum.check_all() (what runs when
+course registration opens) against checking each student separately.
+
+Usage:
+    python benchmarks/bench_curriculum.py [--students 20000] [--courses 60]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import init_database, use_database
+from repositories import get_storage
+from curriculum import Curriculum
+
+
+def build(students: int, courses: int, rng: random.Random):
+    codes = [f"MK{i:03d}" for i in range(courses)]
+    curriculum = []
+    for i, code in enumerate(codes):
+        semester = i * 8 // courses + 1
+        earlier = [c['course_code'] for c in curriculum if c['semester'] < semester]
+        curriculum.append({'course_code': code, 'semester': semester,
+                           'prerequisites': rng.sample(earlier, min(len(earlier), rng.randint(0, 2)))})
+    
+    storage = get_storage()
+    storage.courses.add_many((code, f"Mata Kuliah {code}", rng.choice((2, 3, 4))) for code in codes)
+    storage.students.add_many((f"{i:07d}", f"Mahasiswa {i}", "Teknik Informatika", 2020 + i % 4)
+                              for i in range(students))
+    
+    grades = []
+    for i in range(students):
+        taken = codes[:rng.randint(0, courses * 3 // 4)]
+        for code in taken:
+            letter, numeric = rng.choice((("A", 4.0), ("B", 3.0), ("C", 2.0), ("D", 1.0), ("E", 0.0)))
+            grades.append((f"{i:07d}", code, 1, letter, numeric, 90))
+    storage.grades.add_many(grades)
+    
+    Curriculum.set_curriculum("Teknik Informatika", curriculum)
+    return len(grades)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--courses", type=int, default=60)
+    parser.add_argument("--sample", type=int, default=500, help="students checked one by one")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        previous = use_database(os.path.join(tmp, "bench.db"))
+        try:
+            init_database(verbose=False)
+            grades = build(args.students, args.courses, random.Random(42))
+            
+            start = time.perf_counter()
+            results = Curriculum.check_all()
+            batch = time.perf_counter() - start
+            
+            nims = [r['nim'] for r in results[:args.sample]]
+            start = time.perf_counter()
+            for nim in nims:
+                Curriculum.check_student(nim)
+            single = (time.perf_counter() - start) / max(len(nims), 1)
+        finally:
+            use_database(*previous)
+    
+    print(f"Students: {args.students}, courses: {args.courses}, grades: {grades}")
+    print(f"check_all():                 {batch:8.2f} s")
+    print(f"check_student() x students:  {single * args.students:8.2f} s (extrapolated)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Grade submission throughput benchmark
+
+Simulates a grading deadline: many threads call GradeManager.input_grade()
+at once against a temporary database file, first with a transaction per
+call, then with group commit (GradeManager.enable_group_commit()).
+
+Usage:
+    python benchmarks/bench_group_commit.py [--threads 32] [--grades 4000] [--delay-ms 0]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from database import init_database, use_database
+from repositories import get_storage
+from grade_manager import GradeManager
+
+
+def build(grades: int, courses: int = 50):
+    storage = get_storage()
+    storage.courses.add_many((f"MK{i:03d}", f"Mata Kuliah {i}", 3) for i in range(courses))
+    students = (grades + courses - 1) // courses
+    storage.students.add_many((f"{i:07d}", f"Mahasiswa {i}", "Teknik Informatika", 2022)
+                              for i in range(students))
+    return [(f"{i // courses:07d}", f"MK{i % courses:03d}") for i in range(grades)]
+
+
+def run(submissions, threads: int, semester: int) -> float:
+    def submit(submission):
+        success, msg = GradeManager.input_grade(submission[0], submission[1], semester, "B", 90)
+        if not success:
+            raise RuntimeError(msg)
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(submit, submissions))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--grades", type=int, default=4000)
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="group commit max delay")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        previous = use_database(os.path.join(tmp, "bench.db"))
+        database.configure(pool_size=args.threads)
+        try:
+            init_database(verbose=False)
+            submissions = build(args.grades)
+            
+            single = run(submissions, args.threads, 1)
+            writer = GradeManager.enable_group_commit(args.delay_ms / 1000.0)
+            try:
+                grouped = run(submissions, args.threads, 2)
+                metrics = writer.metrics()
+            finally:
+                GradeManager.disable_group_commit()
+        finally:
+            database.configure(pool_size=0)
+            use_database(*previous)
+    
+    print(f"Submissions: {args.grades}, threads: {args.threads}")
+    print(f"Transaction per call: {single:8.2f} s  {args.grades / single:8.0f} grades/s")
+    print(f"Group commit:         {grouped:8.2f} s  {args.grades / grouped:8.0f} grades/s "
+          f"({metrics['commits']} commits, average group {metrics['average_group']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Long transcript PDF rendering benchmark
+
+Renders synthetic transcripts of long-study students (14 semesters by
+default, with failed courses retaken the next semester) against a
+temporary database, once with the whole story built before layout and
+once with the streaming story (TranscriptGenerator(streaming=True)), and
+reports time per transcript, pages and peak memory of one render.
+
+Usage:
+    python benchmarks/bench_pdf.py [--students 20] [--semesters 14] [--courses 12]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import init_database, use_database
+from repositories import get_storage
+from transcript_generator import TranscriptGenerator
+
+GRADES = (("A", 4.0), ("B", 3.0), ("C", 2.0), ("D", 1.0), ("E", 0.0))
+
+
+def build(students: int, semesters: int, courses: int):
+    storage = get_storage()
+    catalog = semesters * courses
+    storage.courses.add_many((f"MK{i:04d}", f"Mata Kuliah Pilihan Lanjutan {i}", 2 + i % 3)
+                             for i in range(catalog))
+    nims = [f"{i:07d}" for i in range(students)]
+    storage.students.add_many((nim, f"Mahasiswa {nim}", "Teknik Informatika", 2015) for nim in nims)
+    
+    rows = []
+    for s, nim in enumerate(nims):
+        retake = []
+        for semester in range(1, semesters + 1):
+            codes = retake + [f"MK{((semester - 1) * courses + c) % catalog:04d}"
+                              for c in range(courses - len(retake))]
+            retake = []
+            for c, code in enumerate(codes):
+                letter, numeric = GRADES[(s + semester * 3 + c) % len(GRADES)]
+                rows.append((nim, code, semester, letter, numeric, 90))
+                if numeric < 1.0:
+                    retake.append(code)  # Failed: taken again next semester
+    storage.grades.add_many(rows)
+    return nims
+
+
+def run(generator: TranscriptGenerator, nims) -> tuple:
+    pages = 0
+    start = time.perf_counter()
+    for nim in nims:
+        pdf, _ = generator.render(nim, 'pdf')
+        pages += len(re.findall(rb"/Type /Page\b", pdf))
+    elapsed = time.perf_counter() - start
+    
+    tracemalloc.start()
+    generator.render(nims[0], 'pdf')
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, pages, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--semesters", type=int, default=14)
+    parser.add_argument("--courses", type=int, default=12, help="courses per semester")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        previous = use_database(os.path.join(tmp, "bench.db"))
+        try:
+            init_database(verbose=False)
+            nims = build(args.students, args.semesters, args.courses)
+            results = {}
+            for name, streaming in (("Whole story", False), ("Streaming story", True)):
+                generator = TranscriptGenerator(tmp, streaming=streaming)
+                generator.render(nims[0], 'pdf')  # Load ReportLab and fonts outside the timing
+                results[name] = run(generator, nims)
+        finally:
+            use_database(*previous)
+    
+    print(f"Transcripts: {args.students} x {args.semesters} semesters x {args.courses} courses")
+    for name, (elapsed, pages, peak) in results.items():
+        print(f"{name + ':':17} {elapsed / args.students * 1000:7.1f} ms/transcript  "
+              f"{pages / args.students:4.1f} pages  peak {peak / 1024:7.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Worker cold-start benchmark
+
+Times a fresh interpreter doing what a worker does on boot (import app,
+create_app()) and compares it with the same start plus an eager import of
+the ReportLab stack. Also fails if serving a JSON request pulls ReportLab in.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER_START = """
+import app
+app.create_app({'DATABASE_FILE': %(db)r, 'TRANSCRIPT_DIR': %(out)r})
+"""
+
+EAGER_PDF = "import reportlab.platypus, reportlab.lib.styles\n"
+
+JSON_ONLY = """
+import sys
+import app
+from database import init_database, populate_sample_data
+flask_app = app.create_app({'DATABASE_FILE': %(db)r, 'TRANSCRIPT_DIR': %(out)r})
+init_database(verbose=False)
+populate_sample_data(verbose=False)
+flask_app.test_client().get('/api/transcript/21001')
+sys.exit(1 if 'reportlab' in sys.modules else 0)
+"""
+
+
+def time_script(script: str, runs: int) -> float:
+    """Median wall time in ms of running script in a fresh interpreter"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script], cwd=APP_DIR, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=15)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        params = {'db': os.path.join(tmp, "bench.db"), 'out': os.path.join(tmp, "pdf")}
+        
+        lazy = time_script(WORKER_START % params, args.runs)
+        eager = time_script(EAGER_PDF + WORKER_START % params, args.runs)
+        json_only = subprocess.run([sys.executable, "-c", JSON_ONLY % params], cwd=APP_DIR)
+    
+    print(f"Worker start (PDF stack lazy):  {lazy:8.1f} ms")
+    print(f"Worker start (PDF stack eager): {eager:8.1f} ms")
+    print(f"Saved per cold start:           {eager - lazy:8.1f} ms")
+    
+    if json_only.returncode != 0:
+        print("FAIL: serving /api/transcript imported ReportLab")
+        sys.exit(1)
+    print("OK: JSON endpoints never import ReportLab")
+
+
+if __name__ == "__main__":
+    main()
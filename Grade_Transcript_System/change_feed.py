@@ -0,0 +1,239 @@
+"""
+Change Feed - In-process broker pushing grade changes to subscribers (Server-Sent Events)
+"""
+import asyncio
+import json
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+# Sent in place of events a subscriber missed because it fell behind
+RESYNC = {'type': 'resync'}
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 15.0
+
+
+class Subscription:
+    """
+    One client's filtered view of the feed, read from a bounded queue
+    
+    A subscriber that falls more than queue_size events behind loses them
+    and gets RESYNC instead, telling the client to re-fetch once.
+    """
+    
+    def __init__(self, broker: 'ChangeBroker', nim: Optional[str], course_code: Optional[str],
+                 queue_size: int):
+        self.broker = broker
+        self.nim = nim
+        self.course_code = course_code
+        self.dropped = 0
+        self._queue = self._make_queue(queue_size)
+        self._overflowed = False
+        self._state_lock = threading.Lock()  # Publishers and the reader both touch _overflowed
+    
+    def _make_queue(self, size: int):
+        return queue.Queue(size)
+    
+    def matches(self, event: dict) -> bool:
+        return ((self.nim is None or event['nim'] == self.nim) and
+                (self.course_code is None or event['course_code'] == self.course_code))
+    
+    def offer(self, event: dict) -> None:
+        """Queue an event without blocking the publisher (publisher's thread)"""
+        with self._state_lock:
+            if self._overflowed:
+                self.dropped += 1
+                return
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self._overflow()
+    
+    def _overflow(self) -> None:
+        self._overflowed = True
+        self.dropped += 1
+        while True:
+            try:
+                self._queue.get_nowait()  # Nothing queued matters once a resync is due
+            except queue.Empty:
+                break
+        self._queue.put_nowait(RESYNC)
+    
+    def _take(self, event: dict) -> dict:
+        if event is RESYNC:
+            with self._state_lock:
+                self._overflowed = False
+        return event
+    
+    def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event (or RESYNC), or None if none arrived within timeout"""
+        try:
+            return self._take(self._queue.get(timeout=timeout))
+        except queue.Empty:
+            return None
+    
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """Subscription read by a coroutine; events are handed to its event loop"""
+    
+    def __init__(self, broker: 'ChangeBroker', nim: Optional[str], course_code: Optional[str],
+                 queue_size: int, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._size = queue_size
+        super().__init__(broker, nim, course_code, queue_size)
+    
+    def _make_queue(self, size: int):
+        return asyncio.Queue()  # Bounded in _put, which runs on the loop
+    
+    def offer(self, event: dict) -> None:
+        self._loop.call_soon_threadsafe(self._put, event)
+    
+    def _put(self, event: dict) -> None:
+        if self._overflowed:
+            self.dropped += 1
+        elif self._queue.qsize() >= self._size:
+            self._overflowed = True
+            self.dropped += 1
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESYNC)
+        else:
+            self._queue.put_nowait(event)
+    
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        try:
+            return self._take(await asyncio.wait_for(self._queue.get(), timeout))
+        except asyncio.TimeoutError:
+            return None
+
+
+class ChangeBroker:
+    """
+    Fan grade changes out to subscribers filtered by student and/or course
+    
+    Register publish() as a GradeManager change listener. Subscribers are
+    indexed by NIM and course code, so publishing touches only the matching
+    ones. Every event gets an increasing id and the last history_size events
+    are kept, so a reconnecting client can resume from its Last-Event-ID.
+    The broker lives in one process: clients see changes made through the
+    same worker.
+    """
+    
+    def __init__(self, queue_size: int = 256, history_size: int = 1000):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._all: set = set()
+        self._by_nim: Dict[str, set] = {}
+        self._by_course: Dict[str, set] = {}
+        self._history = deque(maxlen=history_size)
+        self._next_id = 1
+        self.published = 0
+    
+    def publish(self, change: dict) -> dict:
+        """Stamp a grade change event with an id and deliver it to matching subscribers"""
+        
+        with self._lock:
+            event = {
+                'id': self._next_id,
+                'type': 'grade',
+                'nim': change['nim'],
+                'course_code': change['course_code'],
+                'semester': change['semester'],
+                'letter_grade': change['letter_grade'],
+                'numeric_grade': change['numeric_grade'],
+                'updated': change.get('updated', False),
+                'published_at': datetime.now().isoformat(timespec='seconds')
+            }
+            self._next_id += 1
+            self.published += 1
+            self._history.append(event)
+            targets = (self._all | self._by_nim.get(event['nim'], set()) |
+                       self._by_course.get(event['course_code'], set()))
+        
+        for subscription in targets:
+            if subscription.matches(event):
+                subscription.offer(event)
+        return event
+    
+    def subscribe(self, nim: Optional[str] = None, course_code: Optional[str] = None,
+                  last_event_id: Optional[int] = None) -> Subscription:
+        """Subscribe from a thread (e.g. a WSGI streaming response)"""
+        return self._register(Subscription(self, nim, course_code, self.queue_size), last_event_id)
+    
+    def subscribe_async(self, nim: Optional[str] = None, course_code: Optional[str] = None,
+                        last_event_id: Optional[int] = None) -> AsyncSubscription:
+        """Subscribe from a coroutine running on the current event loop"""
+        subscription = AsyncSubscription(self, nim, course_code, self.queue_size,
+                                         asyncio.get_running_loop())
+        return self._register(subscription, last_event_id)
+    
+    def _register(self, subscription: Subscription, last_event_id: Optional[int]) -> Subscription:
+        with self._lock:
+            if subscription.nim is not None:
+                self._by_nim.setdefault(subscription.nim, set()).add(subscription)
+            elif subscription.course_code is not None:
+                self._by_course.setdefault(subscription.course_code, set()).add(subscription)
+            else:
+                self._all.add(subscription)
+            
+            if last_event_id is not None:
+                if last_event_id >= self._next_id or (
+                        self._history and self._history[0]['id'] > last_event_id + 1):
+                    subscription.offer(RESYNC)  # Missed events are gone (or from before a restart)
+                else:
+                    for event in self._history:
+                        if event['id'] > last_event_id and subscription.matches(event):
+                            subscription.offer(event)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription.nim is not None:
+                index, key = self._by_nim, subscription.nim
+            elif subscription.course_code is not None:
+                index, key = self._by_course, subscription.course_code
+            else:
+                self._all.discard(subscription)
+                return
+            subscribers = index.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del index[key]
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            subscribers = len(self._all) + sum(len(s) for s in self._by_nim.values()) + \
+                sum(len(s) for s in self._by_course.values())
+            return {'published': self.published, 'subscribers': subscribers}
+
+
+def format_sse(event: dict) -> str:
+    """One Server-Sent Events message for an event (or RESYNC)"""
+    if event is RESYNC:
+        return "event: resync\ndata: {}\n\n"
+    return f"id: {event['id']}\nevent: grade\ndata: {json.dumps(event)}\n\n"
+
+
+def stream_events(subscription: Subscription, heartbeat: float = HEARTBEAT_SECONDS) -> Iterator[str]:
+    """SSE text for a WSGI streaming response; unsubscribes when the client goes away"""
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            event = subscription.get(timeout=heartbeat)
+            yield ": keep-alive\n\n" if event is None else format_sse(event)
+    finally:
+        subscription.close()
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
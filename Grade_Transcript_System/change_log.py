@@ -0,0 +1,182 @@
+"""
+Change Log - Incremental reads of grade changes for downstream consumers (CDC)
+"""
+import heapq
+from typing import Dict, List, Optional, Union
+from database import active_shard, shard_router, use_shard
+from repositories import get_storage
+
+# Changes returned per read unless the caller asks for fewer or more
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+
+# Offset: a change_id, or with shards one change_id per shard ("12.0.7")
+Offset = Union[int, str]
+
+
+class ChangeLog:
+    """
+    Consumer API over grade_change_log
+    
+    Every grade insert, update and delete is logged with an increasing
+    change_id in the same transaction as the write, so a committed grade is
+    always in the log and ids are never seen out of order. Consumers (e.g.
+    finance, alumni, ministry reporting) read batches after their committed
+    offset and commit the batch's next_offset once processed: delivery is
+    at-least-once, and a consumer that crashes re-reads from its last commit.
+    
+    With shards each shard keeps its own log and consumer offsets. Reads
+    merge the shards' logs (each in change_id order, together by changed_at,
+    every change tagged with its shard index), and offsets are composite:
+    one change_id per shard, in shard order, joined with dots. 0 means the
+    start of every shard. Inside use_shard() the API works on that shard
+    alone, with plain change_id offsets.
+    """
+    
+    @staticmethod
+    def read(since: Offset = 0, limit: int = DEFAULT_BATCH_SIZE) -> Dict:
+        """
+        Changes after an offset
+        
+        Returns:
+            Dict: changes (oldest first), next_offset (the offset after the
+                last change returned, or since if none) and has_more
+        
+        Raises:
+            ValueError: If the offset is malformed
+        """
+        
+        limit = max(1, min(int(limit), MAX_BATCH_SIZE))
+        shards = ChangeLog._shards()
+        offsets = ChangeLog._parse_offset(since, len(shards))
+        
+        logs = []
+        for index, (shard_file, offset) in enumerate(zip(shards, offsets)):
+            with use_shard(shard_file):
+                changes = get_storage().changes.list_since(offset, limit + 1)
+            if len(shards) > 1:
+                for change in changes:
+                    change['shard'] = index
+            logs.append(changes)
+        
+        merged = heapq.merge(*logs, key=lambda change: change['changed_at']) if len(logs) > 1 else logs[0]
+        changes = []
+        next_offsets = list(offsets)
+        for change in merged:
+            if len(changes) == limit:
+                break
+            changes.append(change)
+            next_offsets[change.get('shard', 0)] = change['change_id']
+        return {
+            'changes': changes,
+            'next_offset': ChangeLog._format_offset(next_offsets),
+            'has_more': sum(len(log) for log in logs) > len(changes)
+        }
+    
+    @staticmethod
+    def poll(consumer: str, limit: int = DEFAULT_BATCH_SIZE) -> Dict:
+        """Next batch after the consumer's committed offset (0 for a new consumer)"""
+        
+        ChangeLog._check_name(consumer)
+        offsets = []
+        for shard_file in ChangeLog._shards():
+            with use_shard(shard_file):
+                offsets.append(get_storage().changes.get_offset(consumer) or 0)
+        offset = ChangeLog._format_offset(offsets)
+        batch = ChangeLog.read(offset, limit)
+        batch['consumer'] = consumer
+        batch['offset'] = offset
+        return batch
+    
+    @staticmethod
+    def commit(consumer: str, offset: Offset) -> Dict:
+        """
+        Record that a consumer processed every change up to offset
+        
+        Lower offsets are allowed, to replay changes.
+        
+        Raises:
+            ValueError: If the offset is malformed, negative or beyond the
+                newest change (of any shard)
+        """
+        
+        ChangeLog._check_name(consumer)
+        shards = ChangeLog._shards()
+        offsets = ChangeLog._parse_offset(offset, len(shards))
+        latest = ChangeLog._latest_ids(shards)
+        for index, (shard_offset, shard_latest) in enumerate(zip(offsets, latest)):
+            if shard_offset > shard_latest:
+                where = f" on shard {index}" if len(shards) > 1 else ""
+                raise ValueError(f"Offset must be between 0 and {shard_latest}{where}")
+        
+        for shard_file, shard_offset in zip(shards, offsets):
+            with use_shard(shard_file):
+                get_storage().changes.set_offset(consumer, shard_offset)
+        return {'consumer': consumer, 'last_change_id': ChangeLog._format_offset(offsets),
+                'lag': sum(latest) - sum(offsets)}
+    
+    @staticmethod
+    def consumers() -> List[Dict]:
+        """Every consumer with its committed offset and how many changes it is behind"""
+        
+        shards = ChangeLog._shards()
+        latest = ChangeLog._latest_ids(shards)
+        merged = {}
+        for index, shard_file in enumerate(shards):
+            with use_shard(shard_file):
+                shard_consumers = get_storage().changes.list_consumers()
+            for consumer in shard_consumers:
+                entry = merged.setdefault(consumer['consumer'], {'offsets': [0] * len(shards),
+                                                                 'updated_at': consumer['updated_at']})
+                entry['offsets'][index] = consumer['last_change_id']
+                entry['updated_at'] = max(entry['updated_at'], consumer['updated_at'])
+        
+        return [{'consumer': name,
+                 'last_change_id': ChangeLog._format_offset(merged[name]['offsets']),
+                 'updated_at': merged[name]['updated_at'],
+                 'lag': sum(latest) - sum(merged[name]['offsets'])} for name in sorted(merged)]
+    
+    @staticmethod
+    def latest_offset() -> Offset:
+        """Offset of the newest change, e.g. to start reading only new changes"""
+        return ChangeLog._format_offset(ChangeLog._latest_ids(ChangeLog._shards()))
+    
+    @staticmethod
+    def _shards() -> List[Optional[str]]:
+        """Shard files the API spans: the active one, every shard, or [None] unsharded"""
+        router = shard_router()
+        if active_shard() is not None or router is None:
+            return [active_shard()]
+        return router.shard_files
+    
+    @staticmethod
+    def _latest_ids(shards: List[Optional[str]]) -> List[int]:
+        latest = []
+        for shard_file in shards:
+            with use_shard(shard_file):
+                latest.append(get_storage().changes.latest_id())
+        return latest
+    
+    @staticmethod
+    def _parse_offset(offset: Offset, shard_count: int) -> List[int]:
+        parts = str(offset).strip().split('.')
+        try:
+            offsets = [int(part) for part in parts]
+        except ValueError:
+            raise ValueError(f"Offset {offset!r} is not a change_id or dot-separated change_ids")
+        if offsets == [0]:
+            offsets = [0] * shard_count
+        if len(offsets) != shard_count:
+            raise ValueError(f"Offset {offset!r} needs one change_id per shard ({shard_count})")
+        if any(part < 0 for part in offsets):
+            raise ValueError("Offset must not be negative")
+        return offsets
+    
+    @staticmethod
+    def _format_offset(offsets: List[int]) -> Offset:
+        return offsets[0] if len(offsets) == 1 else '.'.join(str(part) for part in offsets)
+    
+    @staticmethod
+    def _check_name(consumer: Optional[str]) -> None:
+        if not consumer or not str(consumer).strip():
+            raise ValueError("Consumer name is required")
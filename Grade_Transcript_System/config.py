@@ -0,0 +1,56 @@
+"""
+Application Configuration - Defaults, overridable through environment variables
+"""
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Config:
+    """Default settings for create_app()"""
+    
+    SECRET_KEY = os.environ.get('TRANSCRIPT_SECRET_KEY', 'your-secret-key-here')
+    
+    # Database (absolute paths so all workers share one file)
+    DATABASE_FILE = os.environ.get('TRANSCRIPT_DB', os.path.join(BASE_DIR, 'transcript_system.db'))
+    SNAPSHOT_FILE = os.environ.get('TRANSCRIPT_SNAPSHOT_DB',
+                                   os.path.join(BASE_DIR, 'transcript_system_snapshot.db'))
+    # Reports refresh a snapshot older than this many seconds (0 = only when missing)
+    SNAPSHOT_MAX_AGE_SECONDS = float(os.environ.get('TRANSCRIPT_SNAPSHOT_MAX_AGE', 300))
+    DB_POOL_SIZE = int(os.environ.get('TRANSCRIPT_DB_POOL_SIZE', 8))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('TRANSCRIPT_SQLITE_CACHE_KB', 8192))
+    
+    # Shard files for grades and grade history, comma-separated (empty = all in DATABASE_FILE)
+    SHARD_FILES = [path for path in os.environ.get('TRANSCRIPT_SHARDS', '').split(',') if path]
+    SHARD_KEY = os.environ.get('TRANSCRIPT_SHARD_KEY', 'nim')  # 'nim' or 'batch_year'
+    
+    # Threads running requests under asgi.py (default: one per pooled connection)
+    ASYNC_MAX_WORKERS = int(os.environ.get('TRANSCRIPT_ASYNC_WORKERS', 0)) or None
+    
+    # Group commit: concurrent grade submissions share transactions (see GradeManager.enable_group_commit)
+    GROUP_COMMIT = os.environ.get('TRANSCRIPT_GROUP_COMMIT', '').lower() in ('1', 'true', 'yes')
+    GROUP_COMMIT_MAX_DELAY_MS = float(os.environ.get('TRANSCRIPT_GROUP_COMMIT_DELAY_MS', 0))
+    GROUP_COMMIT_MAX_BATCH = int(os.environ.get('TRANSCRIPT_GROUP_COMMIT_BATCH', 256))
+    
+    # Academic standing rules (see academic_standing.StandingRules)
+    STANDING_PROBATION_IPS = float(os.environ.get('TRANSCRIPT_PROBATION_IPS', 2.0))
+    STANDING_WARNING_FAILED_COURSES = int(os.environ.get('TRANSCRIPT_WARNING_FAILED_COURSES', 3))
+    STANDING_MAX_STUDY_YEARS = int(os.environ.get('TRANSCRIPT_MAX_STUDY_YEARS', 7))
+    
+    # Transcript verification: HMAC key for the QR tokens and the public URL they point to.
+    # No default: with a known key anyone could mint valid tokens, so unset means unsigned
+    SIGNING_KEY = os.environ.get('TRANSCRIPT_SIGNING_KEY')
+    VERIFY_BASE_URL = os.environ.get('TRANSCRIPT_VERIFY_URL', 'http://localhost:5000')
+    
+    # Hot backups (flask backup-db / restore-db)
+    BACKUP_DIR = os.environ.get('TRANSCRIPT_BACKUP_DIR', os.path.join(BASE_DIR, 'backups'))
+    BACKUP_KEEP = int(os.environ.get('TRANSCRIPT_BACKUP_KEEP', 48))
+    BACKUP_COMPRESS = os.environ.get('TRANSCRIPT_BACKUP_COMPRESS', '1').lower() in ('1', 'true', 'yes')
+    BACKUP_PAGES_PER_STEP = int(os.environ.get('TRANSCRIPT_BACKUP_PAGES', 256))
+    
+    # Integrity checks (flask check-integrity): rows per read and pause between reads
+    INTEGRITY_CHUNK_SIZE = int(os.environ.get('TRANSCRIPT_INTEGRITY_CHUNK_SIZE', 1000))
+    INTEGRITY_PAUSE_MS = float(os.environ.get('TRANSCRIPT_INTEGRITY_PAUSE_MS', 0))
+    
+    # Generated PDFs
+    TRANSCRIPT_DIR = os.environ.get('TRANSCRIPT_DIR', os.path.join(BASE_DIR, 'transcripts'))
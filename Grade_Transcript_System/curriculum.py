@@ -0,0 +1,242 @@
+"""
+Curriculum - Prerequisite graph per program study, course eligibility and remaining SKS
+"""
+from heapq import heapify, heappop, heappush
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Tuple
+from grade_manager import GradeManager
+from grade_calculator import GradeCalculator
+from records import GradeRecord
+from repositories import get_storage
+
+# Typical SKS load of an S1 programme, used when a curriculum doesn't set one
+DEFAULT_GRADUATION_SKS = 144
+
+
+class CurriculumGraph:
+    """
+    A program's curriculum compiled for fast eligibility checks
+    
+    Courses are numbered in topological order (every course after its
+    prerequisites) and each course gets two bitmasks: its direct
+    prerequisites and their transitive closure. A student's passed courses
+    become one bitmask too, so "may take X" is a single AND and the
+    outstanding prerequisite chain is the closure minus what was passed.
+    """
+    
+    def __init__(self, program_study: str, graduation_sks: int,
+                 courses: Iterable[Tuple[str, Optional[int], bool]],
+                 prerequisites: Iterable[Tuple[str, str]], course_sks: Dict[str, int]):
+        courses = list(courses)
+        codes = {code for code, _, _ in courses}
+        edges = {code: set() for code in codes}
+        for code, prerequisite in prerequisites:
+            if code not in codes or prerequisite not in codes:
+                raise ValueError(f"Prerequisite {prerequisite} -> {code} is not in the curriculum")
+            if code == prerequisite:
+                raise ValueError(f"Course {code} can't be its own prerequisite")
+            edges[code].add(prerequisite)
+        
+        self.program_study = program_study
+        self.graduation_sks = graduation_sks
+        self.order = self._topological_order(edges, {code: semester for code, semester, _ in courses})
+        self.index = {code: i for i, code in enumerate(self.order)}
+        self.semester = {code: semester for code, semester, _ in courses}
+        self.required = {code for code, _, required in courses if required}
+        self.sks = [course_sks.get(code, 0) for code in self.order]
+        self.prerequisites = {code: sorted(edges[code], key=self.index.get) for code in self.order}
+        
+        self.direct_masks = []
+        self.closure_masks = []
+        for code in self.order:
+            direct = 0
+            closure = 0
+            for prerequisite in edges[code]:
+                bit = self.index[prerequisite]
+                direct |= 1 << bit
+                closure |= (1 << bit) | self.closure_masks[bit]  # Earlier in order, already built
+            self.direct_masks.append(direct)
+            self.closure_masks.append(closure)
+        
+        self.required_mask = sum(1 << self.index[code] for code in self.required)
+    
+    @staticmethod
+    def _topological_order(edges: Dict[str, set], semester: Dict[str, Optional[int]]) -> List[str]:
+        """Kahn's algorithm, taking ready courses by suggested semester then code"""
+        
+        dependents = {code: [] for code in edges}
+        waiting = {}
+        for code, prerequisites in edges.items():
+            waiting[code] = len(prerequisites)
+            for prerequisite in prerequisites:
+                dependents[prerequisite].append(code)
+        
+        ready = [(semester.get(code) or 0, code) for code, count in waiting.items() if count == 0]
+        heapify(ready)
+        order = []
+        while ready:
+            _, code = heappop(ready)
+            order.append(code)
+            for dependent in dependents[code]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    heappush(ready, (semester.get(dependent) or 0, dependent))
+        
+        if len(order) != len(edges):
+            cycle = sorted(code for code, count in waiting.items() if count > 0)
+            raise ValueError(f"Prerequisites form a cycle among: {', '.join(cycle)}")
+        return order
+    
+    def passed_mask(self, passed_codes: Iterable[str]) -> int:
+        mask = 0
+        for code in passed_codes:
+            bit = self.index.get(code)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+    
+    def codes(self, mask: int) -> List[str]:
+        """Course codes of the set bits, in topological order"""
+        codes = []
+        while mask:
+            low = mask & -mask
+            codes.append(self.order[low.bit_length() - 1])
+            mask ^= low
+        return codes
+    
+    def evaluate(self, nim: str, best: Dict[str, GradeRecord]) -> Dict:
+        """
+        Eligibility and progress of one student
+        
+        Args:
+            best: The student's best grade per course (repeated courses keep the highest)
+        """
+        
+        passed = [code for code, record in best.items() if GradeManager.is_passed(record.numeric_grade)]
+        earned_sks = sum(best[code].sks for code in passed)
+        mask = self.passed_mask(passed)
+        
+        eligible = []
+        blocked = {}
+        for bit, code in enumerate(self.order):
+            if mask >> bit & 1:
+                continue
+            if self.direct_masks[bit] & ~mask == 0:
+                eligible.append(code)
+            else:
+                blocked[code] = self.codes(self.closure_masks[bit] & ~mask)
+        
+        remaining_required = self.required_mask & ~mask
+        
+        return {
+            'nim': nim,
+            'program_study': self.program_study,
+            'graduation_sks': self.graduation_sks,
+            'earned_sks': earned_sks,
+            'remaining_sks': max(0, self.graduation_sks - earned_sks),
+            'eligible': eligible,
+            'blocked': blocked,
+            'remaining_required': self.codes(remaining_required)
+        }
+    
+    def to_dict(self) -> Dict:
+        return {
+            'program_study': self.program_study,
+            'graduation_sks': self.graduation_sks,
+            'courses': [{
+                'course_code': code,
+                'sks': self.sks[bit],
+                'semester': self.semester[code],
+                'required': code in self.required,
+                'prerequisites': self.prerequisites[code]
+            } for bit, code in enumerate(self.order)]
+        }
+
+
+class Curriculum:
+    """Curriculum definition and eligibility checks, per student or for the whole student body"""
+    
+    @staticmethod
+    def set_curriculum(program_study: str, courses: List[Dict],
+                       graduation_sks: int = DEFAULT_GRADUATION_SKS) -> CurriculumGraph:
+        """
+        Replace a program's curriculum
+        
+        Args:
+            courses: Rows with course_code and optional semester (suggested),
+                required (default True) and prerequisites (course codes)
+        
+        Raises:
+            ValueError: For unknown courses, prerequisites outside the
+                curriculum or prerequisite cycles; nothing is stored then
+        """
+        
+        catalogue = {course['course_code']: course['sks'] for course in get_storage().courses.list_all()}
+        rows = []
+        edges = []
+        for course in courses:
+            code = course['course_code']
+            if code not in catalogue:
+                raise ValueError(f"Course {code} not found")
+            semester = course.get('semester')
+            rows.append((code, int(semester) if semester is not None else None,
+                         bool(course.get('required', True))))
+            edges.extend((code, prerequisite) for prerequisite in course.get('prerequisites', []))
+        
+        if len({code for code, _, _ in rows}) != len(rows):
+            raise ValueError("A course is listed more than once")
+        
+        graph = CurriculumGraph(program_study, int(graduation_sks), rows, edges, catalogue)
+        get_storage().curricula.replace(program_study, graph.graduation_sks, rows, edges)
+        return graph
+    
+    @staticmethod
+    def get_graph(program_study: str) -> Optional[CurriculumGraph]:
+        """Compile a program's stored curriculum, or None if it has none"""
+        
+        storage = get_storage()
+        curriculum = storage.curricula.get(program_study)
+        if curriculum is None:
+            return None
+        catalogue = {course['course_code']: course['sks'] for course in storage.courses.list_all()}
+        return CurriculumGraph(program_study, curriculum['graduation_sks'], curriculum['courses'],
+                               curriculum['prerequisites'], catalogue)
+    
+    @staticmethod
+    def check_student(nim: str) -> Optional[Dict]:
+        """Eligible courses and remaining SKS of one student (None if unknown or no curriculum)"""
+        
+        student = GradeManager.get_student_info(nim)
+        if student is None:
+            return None
+        graph = Curriculum.get_graph(student['program_study'])
+        if graph is None:
+            return None
+        records = GradeManager.get_grade_records(nim)
+        return graph.evaluate(nim, GradeCalculator._best_grades_by_course(records))
+    
+    @staticmethod
+    def check_all(program_study: Optional[str] = None) -> List[Dict]:
+        """
+        check_student for every student (optionally one program), e.g. at KRS opening
+        
+        Each curriculum is compiled once and all grades are read in a single
+        streamed pass, so the cost is one query plus a few bit operations per
+        student and course. Students whose program has no curriculum are skipped.
+        """
+        
+        students = [s for s in get_storage().students.list_all()
+                    if program_study is None or s['program_study'] == program_study]
+        graphs = {}
+        for student in students:
+            if student['program_study'] not in graphs:
+                graphs[student['program_study']] = Curriculum.get_graph(student['program_study'])
+        
+        wanted = {s['nim'] for s in students if graphs[s['program_study']] is not None}
+        best_by_nim = {}
+        for nim, records in groupby(GradeManager.iter_all_grade_records(), key=lambda r: r.nim):
+            if nim in wanted:
+                best_by_nim[nim] = GradeCalculator._best_grades_by_course(records)
+        
+        return [graphs[s['program_study']].evaluate(s['nim'], best_by_nim.get(s['nim'], {}))
+                for s in students if s['nim'] in wanted]
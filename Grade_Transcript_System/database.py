@@ -1,34 +1,361 @@
 import sqlite3
 import os
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
 from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
 
-DATABASE_FILE = "transcript_system.db"
+# Resolved next to this module so every worker shares one file regardless of cwd
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-def init_database():
-    """Initialize database with all required tables"""
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+DATABASE_FILE = os.path.join(BASE_DIR, "transcript_system.db")
+
+# Read-only copy of DATABASE_FILE used by analytics and batch transcript jobs
+SNAPSHOT_FILE = os.path.join(BASE_DIR, "transcript_system_snapshot.db")
+
+# Seconds after which get_snapshot_connection() refreshes the snapshot (0 = only when missing)
+SNAPSHOT_MAX_AGE = 300.0
+
+# Serializes snapshot refreshes (and the staleness check) so concurrent reports take one copy
+_snapshot_lock = threading.RLock()
+
+# Seconds a connection waits on a locked database before raising
+BUSY_TIMEOUT = 30.0
+
+# SQLite page cache per connection in KiB (None = SQLite default)
+CACHE_SIZE_KB = None
+
+# Set while a reporting job reads from the snapshot instead of the live file
+_use_snapshot = ContextVar("use_snapshot", default=False)
+
+# Open connection that keeps a use_database(":memory:") database alive
+_memory_keeper = None
+
+# Pool of reusable connections used by get_connection() (None = open one per call)
+_pool = None
+
+# Routes students' grades and grade history to shard files (None = everything in DATABASE_FILE)
+_shard_router = None
+
+# Shard file that get_connection() uses inside use_shard()/student_shard()
+_active_shard = ContextVar("active_shard", default=None)
+
+# Audit trail view; shard connections recreate it as a TEMP view spanning shard and registry
+GRADE_CHANGES_SUMMARY_SQL = '''
+    SELECT 
+        gh.history_id,
+        s.nim,
+        s.name,
+        c.course_name,
+        gh.old_numeric_grade,
+        gh.new_numeric_grade,
+        gh.changed_by,
+        gh.changed_at,
+        gh.reason
+    FROM grade_history gh
+    JOIN grades g ON gh.grade_id = g.grade_id
+    JOIN students s ON g.nim = s.nim
+    JOIN courses c ON g.course_code = c.course_code
+    ORDER BY gh.changed_at DESC
+'''
+
+class _PooledConnection(sqlite3.Connection):
+    """Connection whose close() hands it back to its pool instead of closing"""
     
-    # Students table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS students (
-            nim TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            program_study TEXT NOT NULL,
-            batch_year INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    pool = None
     
-    # Courses table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS courses (
-            course_code TEXT PRIMARY KEY,
-            course_name TEXT NOT NULL,
-            sks INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    def close(self):
+        if self.pool is not None and self.pool.release(self):
+            return
+        super().close()
+
+class ConnectionPool:
+    """
+    Keep up to `size` idle connections to one database for reuse
+    
+    Callers keep the usual get_connection() ... conn.close() pattern; close()
+    rolls back anything left open and parks the connection for the next
+    caller, which saves the open and PRAGMA setup on every request.
+    """
+    
+    def __init__(self, database_file: str, size: int, connect: Callable = None):
+        self.database_file = database_file
+        self.size = size
+        self._connect = connect or _connect
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+    
+    def acquire(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect(self.database_file, factory=_PooledConnection, check_same_thread=False)
+            conn.pool = self
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def release(self, conn) -> bool:
+        """Return a connection to the pool; False if it should really be closed"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return True
+        conn.pool = None
+        return False
+    
+    def close(self):
+        """Close all idle connections and stop pooling"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.pool = None
+            conn.close()
+
+def configure(database_file: str = None, snapshot_file: str = None,
+              pool_size: int = None, cache_size_kb: int = None,
+              shard_files: List[str] = None, shard_key: str = 'nim',
+              snapshot_max_age: float = None):
+    """
+    Apply application configuration to the database layer
+    
+    Args:
+        database_file: Live database path (see use_database)
+        snapshot_file: Reporting snapshot path
+        pool_size: Idle connections kept for reuse (0 disables pooling)
+        cache_size_kb: SQLite page cache per connection
+        shard_files: Files to shard grades and grade history across (see use_shards)
+        shard_key: 'nim' (hash) or 'batch_year'
+        snapshot_max_age: Seconds before a report refreshes the snapshot (0 = only when missing)
+    """
+    global CACHE_SIZE_KB, SNAPSHOT_MAX_AGE
+    if cache_size_kb is not None:
+        CACHE_SIZE_KB = cache_size_kb
+    if snapshot_max_age is not None:
+        SNAPSHOT_MAX_AGE = snapshot_max_age
+    if database_file is not None or snapshot_file is not None:
+        use_database(database_file or DATABASE_FILE, snapshot_file)
+    if pool_size is not None:
+        _set_pool_size(pool_size)
+    if shard_files is not None:
+        use_shards(shard_files, shard_key)
+
+def _set_pool_size(size: int):
+    global _pool
+    if _pool is not None:
+        _pool.close()
+    _pool = ConnectionPool(DATABASE_FILE, size) if size > 0 else None
+    if _shard_router is not None:
+        _shard_router.reset_pools(size)
+
+def use_database(database_file: str, snapshot_file: str = None) -> tuple:
+    """
+    Point every connection at another database, e.g. a per-test temporary file
+    
+    Pass ":memory:" for a private in-memory database shared by all
+    connections of this process until the next use_database() call.
+    
+    Returns:
+        tuple: The previous (database_file, snapshot_file), for restoring
+    """
+    global DATABASE_FILE, SNAPSHOT_FILE, _memory_keeper
+    previous = (DATABASE_FILE, SNAPSHOT_FILE)
+    
+    if _memory_keeper is not None:
+        _memory_keeper.close()
+        _memory_keeper = None
+    
+    if database_file == ":memory:":
+        database_file = f"file:transcript_{uuid.uuid4().hex}?mode=memory&cache=shared"
+        _memory_keeper = _connect(database_file)
+    
+    DATABASE_FILE = database_file
+    if snapshot_file is not None:
+        SNAPSHOT_FILE = snapshot_file
+    
+    # Pooled connections belong to the previous database (shard connections attach it)
+    if _pool is not None:
+        _set_pool_size(_pool.size)
+    elif _shard_router is not None:
+        _shard_router.reset_pools(0)
+    return previous
+
+def _connect(database_file: str, **kwargs):
+    """Open a connection, accepting both file paths and file: URIs"""
+    conn = sqlite3.connect(database_file, timeout=BUSY_TIMEOUT,
+                           uri=database_file.startswith("file:"), **kwargs)
+    if CACHE_SIZE_KB:
+        conn.execute(f"PRAGMA cache_size = -{int(CACHE_SIZE_KB)}")
+    return conn
+
+def _as_uri(database_file: str) -> str:
+    return database_file if database_file.startswith("file:") else Path(database_file).resolve().as_uri()
+
+def _connect_shard(shard_file: str, **kwargs):
+    """
+    Open a shard with the main database attached as 'registry'
+    
+    Unqualified table names resolve to the shard first, so grades and
+    grade_history come from the shard while students, courses and every other
+    table come from the main database, and the repositories' SQL runs unchanged.
+    """
+    conn = _connect(_as_uri(shard_file), **kwargs)
+    conn.execute("ATTACH DATABASE ? AS registry", (_as_uri(DATABASE_FILE),))
+    conn.execute(f"CREATE TEMP VIEW IF NOT EXISTS grade_changes_summary AS {GRADE_CHANGES_SUMMARY_SQL}")
+    return conn
+
+class ShardRouter:
+    """
+    Map each student to the shard file holding their grades and grade history
+    
+    Students, courses and all other tables stay in DATABASE_FILE. With
+    key='nim' a student's shard is a CRC32 hash of the NIM; with
+    key='batch_year' whole cohorts share a shard (batch_year modulo the shard
+    count; students must exist before their grades are stored, and unknown
+    NIMs fall back to the hash).
+    """
+    
+    KEYS = ('nim', 'batch_year')
+    
+    def __init__(self, shard_files: List[str], key: str = 'nim', pool_size: int = 0):
+        if not shard_files:
+            raise ValueError("At least one shard file is required")
+        if key not in self.KEYS:
+            raise ValueError(f"Shard key must be one of {', '.join(self.KEYS)}")
+        self.shard_files = list(shard_files)
+        self.key = key
+        self._batch_years: Dict[str, int] = {}  # batch_year never changes, so never stale
+        self._lock = threading.Lock()
+        self._pools: Dict[str, ConnectionPool] = {}
+        self.reset_pools(pool_size)
+    
+    def shard_for(self, nim: str) -> str:
+        """Shard file holding a student's grades"""
+        if self.key == 'batch_year':
+            batch_year = self._batch_year(nim)
+            if batch_year is not None:
+                return self.shard_files[batch_year % len(self.shard_files)]
+        return self.shard_files[zlib.crc32(nim.encode('utf-8')) % len(self.shard_files)]
+    
+    def _batch_year(self, nim: str) -> Optional[int]:
+        with self._lock:
+            if nim in self._batch_years:
+                return self._batch_years[nim]
+        conn = _connect(DATABASE_FILE)
+        try:
+            row = conn.execute("SELECT batch_year FROM students WHERE nim = ?", (nim,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        with self._lock:
+            self._batch_years[nim] = row[0]
+        return row[0]
+    
+    def group(self, items: Iterable, nim_of: Callable) -> Dict[str, list]:
+        """Split items by the shard of nim_of(item), keeping their order"""
+        groups: Dict[str, list] = {}
+        for item in items:
+            groups.setdefault(self.shard_for(nim_of(item)), []).append(item)
+        return groups
+    
+    def connect(self, shard_file: str):
+        pool = self._pools.get(shard_file)
+        if pool is not None:
+            return pool.acquire()
+        conn = _connect_shard(shard_file)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def reset_pools(self, size: int) -> None:
+        """Drop pooled shard connections (e.g. after the main database changed)"""
+        for pool in self._pools.values():
+            pool.close()
+        self._pools = {shard_file: ConnectionPool(shard_file, size, _connect_shard)
+                       for shard_file in self.shard_files} if size > 0 else {}
+    
+    def close(self) -> None:
+        self.reset_pools(0)
+
+def use_shards(shard_files: Optional[List[str]], key: str = 'nim') -> Optional[ShardRouter]:
+    """
+    Store grades and grade history in shard files instead of DATABASE_FILE
+    
+    Pass None or an empty list to go back to a single database. Run
+    init_database() afterwards to create the shard schema.
+    
+    Returns:
+        ShardRouter: The router now in use, or None when unsharded
+    """
+    global _shard_router
+    if _shard_router is not None:
+        _shard_router.close()
+        _shard_router = None
+    if shard_files:
+        _shard_router = ShardRouter(shard_files, key, _pool.size if _pool is not None else 0)
+    return _shard_router
+
+def shard_router() -> Optional[ShardRouter]:
+    return _shard_router
+
+def active_shard() -> Optional[str]:
+    """Shard file get_connection() uses right now, or None"""
+    return _active_shard.get()
+
+@contextmanager
+def use_shard(shard_file: Optional[str]):
+    """Route connections made inside the block to one shard (None = DATABASE_FILE)"""
+    token = _active_shard.set(shard_file)
+    try:
+        yield
+    finally:
+        _active_shard.reset(token)
+
+def student_shard(nim: str):
+    """
+    Route connections made inside the block to a student's shard
+    
+    Example:
+        with student_shard(nim):
+            records = get_storage().grades.list_records_for_student(nim)
+    """
+    return use_shard(_shard_router.shard_for(nim) if _shard_router is not None else None)
+
+def for_each_shard(function: Callable, *args) -> list:
+    """
+    Run function(*args) once per shard, in parallel, inside use_shard()
+    
+    Unsharded, function runs once against DATABASE_FILE. The caller's context
+    (e.g. reporting_snapshot()) carries over to every call.
+    
+    Returns:
+        list: Each call's result, in shard order
+    """
+    router = _shard_router
+    if router is None:
+        return [function(*args)]
+    
+    def run(shard_file):
+        with use_shard(shard_file):
+            return function(*args)
+    
+    with ThreadPoolExecutor(len(router.shard_files), thread_name_prefix='shard') as executor:
+        futures = [executor.submit(copy_context().run, run, shard_file)
+                   for shard_file in router.shard_files]
+        return [future.result() for future in futures]
+
+def _create_grade_tables(cursor):
+    """Tables for grades and what records their changes (per shard when sharded)"""
     
     # Grades table
     cursor.execute('''
@@ -64,37 +391,374 @@ def init_database():
         )
     ''')
     
-    # Views for audit trail
+    # Change-data-capture log: one row per grade insert/update/delete, written by
+    # triggers in the same transaction as the change, read incrementally by consumers
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS grade_change_log (
+            change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            operation TEXT NOT NULL CHECK (operation IN ('insert', 'update', 'delete')),
+            grade_id INTEGER NOT NULL,
+            nim TEXT NOT NULL,
+            course_code TEXT NOT NULL,
+            semester INTEGER NOT NULL,
+            letter_grade TEXT,
+            numeric_grade REAL,
+            presence_percentage REAL,
+            old_letter_grade TEXT,
+            old_numeric_grade REAL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS grades_log_insert AFTER INSERT ON grades
+        BEGIN
+            INSERT INTO grade_change_log (operation, grade_id, nim, course_code, semester,
+                                          letter_grade, numeric_grade, presence_percentage)
+            VALUES ('insert', NEW.grade_id, NEW.nim, NEW.course_code, NEW.semester,
+                    NEW.letter_grade, NEW.numeric_grade, NEW.presence_percentage);
+        END
+    ''')
     cursor.execute('''
-        CREATE VIEW IF NOT EXISTS grade_changes_summary AS
-        SELECT 
-            gh.history_id,
-            s.nim,
-            s.name,
-            c.course_name,
-            gh.old_numeric_grade,
-            gh.new_numeric_grade,
-            gh.changed_by,
-            gh.changed_at,
-            gh.reason
-        FROM grade_history gh
-        JOIN grades g ON gh.grade_id = g.grade_id
-        JOIN students s ON g.nim = s.nim
-        JOIN courses c ON g.course_code = c.course_code
-        ORDER BY gh.changed_at DESC
+        CREATE TRIGGER IF NOT EXISTS grades_log_update
+        AFTER UPDATE OF letter_grade, numeric_grade, presence_percentage ON grades
+        BEGIN
+            INSERT INTO grade_change_log (operation, grade_id, nim, course_code, semester,
+                                          letter_grade, numeric_grade, presence_percentage,
+                                          old_letter_grade, old_numeric_grade)
+            VALUES ('update', NEW.grade_id, NEW.nim, NEW.course_code, NEW.semester,
+                    NEW.letter_grade, NEW.numeric_grade, NEW.presence_percentage,
+                    OLD.letter_grade, OLD.numeric_grade);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS grades_log_delete AFTER DELETE ON grades
+        BEGIN
+            INSERT INTO grade_change_log (operation, grade_id, nim, course_code, semester,
+                                          old_letter_grade, old_numeric_grade)
+            VALUES ('delete', OLD.grade_id, OLD.nim, OLD.course_code, OLD.semester,
+                    OLD.letter_grade, OLD.numeric_grade);
+        END
     ''')
     
+    # Per-consumer read positions in grade_change_log
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_consumers (
+            consumer TEXT PRIMARY KEY,
+            last_change_id INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def init_database(verbose: bool = True):
+    """Initialize database with all required tables"""
+    conn = _connect(DATABASE_FILE)
+    cursor = conn.cursor()
+    
+    # WAL lets readers (reports, snapshot backups) run alongside the writer
+    cursor.execute("PRAGMA journal_mode=WAL")
+    
+    # Students table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS students (
+            nim TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            program_study TEXT NOT NULL,
+            batch_year INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Courses table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS courses (
+            course_code TEXT PRIMARY KEY,
+            course_name TEXT NOT NULL,
+            sks INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Grades, audit trail and change log (also created in every shard)
+    _create_grade_tables(cursor)
+    
+    # Grading scales per program study ('*' = institution default)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS grading_scales (
+            program_study TEXT NOT NULL,
+            letter_grade TEXT NOT NULL,
+            numeric_grade REAL NOT NULL,
+            min_score REAL NOT NULL,
+            PRIMARY KEY (program_study, letter_grade)
+        )
+    ''')
+    
+    # Bumped on every scale change so each worker knows when its cached tables are stale
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS grading_scale_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO grading_scale_version (id, version) VALUES (1, 0)")
+    
+    # Weighted assessment components per course (weights sum to 100)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS course_components (
+            course_code TEXT NOT NULL,
+            component TEXT NOT NULL,
+            weight REAL NOT NULL,
+            PRIMARY KEY (course_code, component),
+            FOREIGN KEY (course_code) REFERENCES courses(course_code)
+        )
+    ''')
+    
+    # Raw 0-100 component scores per student and class
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS component_scores (
+            course_code TEXT NOT NULL,
+            semester INTEGER NOT NULL,
+            nim TEXT NOT NULL,
+            component TEXT NOT NULL,
+            score REAL NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (course_code, semester, nim, component),
+            FOREIGN KEY (nim) REFERENCES students(nim)
+        )
+    ''')
+    
+    # Curriculum per program study and its prerequisite graph
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS curricula (
+            program_study TEXT PRIMARY KEY,
+            graduation_sks INTEGER NOT NULL
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS curriculum_courses (
+            program_study TEXT NOT NULL,
+            course_code TEXT NOT NULL,
+            semester INTEGER,
+            required INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (program_study, course_code),
+            FOREIGN KEY (program_study) REFERENCES curricula(program_study),
+            FOREIGN KEY (course_code) REFERENCES courses(course_code)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS course_prerequisites (
+            program_study TEXT NOT NULL,
+            course_code TEXT NOT NULL,
+            prerequisite_code TEXT NOT NULL,
+            PRIMARY KEY (program_study, course_code, prerequisite_code)
+        )
+    ''')
+    
+    # Latest academic standing per student and its change history
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS academic_standing (
+            nim TEXT PRIMARY KEY,
+            standing TEXT NOT NULL,
+            reasons TEXT NOT NULL,
+            ips REAL,
+            ipk REAL,
+            failed_courses INTEGER NOT NULL,
+            last_semester INTEGER,
+            evaluated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (nim) REFERENCES students(nim)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS academic_standing_history (
+            history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nim TEXT NOT NULL,
+            old_standing TEXT,
+            new_standing TEXT NOT NULL,
+            reasons TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (nim) REFERENCES students(nim)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_standing_history_nim
+        ON academic_standing_history (nim, changed_at)
+    ''')
+    
+    # Immutable transcript versions frozen at semester close
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transcript_snapshots (
+            snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nim TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            closed_semester INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            content BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(nim, version),
+            FOREIGN KEY (nim) REFERENCES students(nim)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transcript_snapshots_hash
+        ON transcript_snapshots (content_hash)
+    ''')
+    
+    # Views for audit trail
+    cursor.execute(f"CREATE VIEW IF NOT EXISTS grade_changes_summary AS {GRADE_CHANGES_SUMMARY_SQL}")
+    
     conn.commit()
     conn.close()
-    print("Database initialized successfully!")
+    
+    if _shard_router is not None:
+        for shard_file in _shard_router.shard_files:
+            conn = _connect(_as_uri(shard_file))
+            conn.execute("PRAGMA journal_mode=WAL")
+            _create_grade_tables(conn.cursor())
+            conn.commit()
+            conn.close()
+    
+    if verbose:
+        print("Database initialized successfully!")
 
 def get_connection():
-    """Get a database connection"""
-    conn = sqlite3.connect(DATABASE_FILE)
+    """Get a database connection (to the active shard inside use_shard()/student_shard())"""
+    shard_file = _active_shard.get()
+    if shard_file is not None and _shard_router is not None:
+        return _shard_router.connect(shard_file)
+    if _pool is not None:
+        return _pool.acquire()
+    conn = _connect(DATABASE_FILE)
     conn.row_factory = sqlite3.Row
     return conn
 
-def populate_sample_data():
+def refresh_snapshot(snapshot_file: str = None) -> str:
+    """
+    Copy the live database into the read-only reporting snapshot
+    
+    Uses SQLite's online backup API in a single step, which in WAL mode only
+    holds a read transaction on the live file, so grade entry keeps writing
+    while the copy is taken. The copy is written to a uniquely named file
+    next to the target and then swapped in, so open snapshot readers keep
+    their old, consistent view and workers refreshing at the same time never
+    share a half-written copy.
+    
+    Returns:
+        str: Path to the refreshed snapshot
+    """
+    target = snapshot_file or SNAPSHOT_FILE
+    
+    with _snapshot_lock:
+        fd, staging = tempfile.mkstemp(prefix=os.path.basename(target) + ".",
+                                       suffix=".tmp", dir=os.path.dirname(os.path.abspath(target)))
+        os.close(fd)
+        try:
+            source = _connect(DATABASE_FILE)
+            destination = sqlite3.connect(staging)
+            try:
+                source.backup(destination)
+                # The copy inherits WAL mode; a rollback journal lets mode=ro readers open it
+                destination.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                destination.close()
+                source.close()
+            # mkstemp files are private; the snapshot is shared with report readers
+            os.chmod(staging, 0o644)
+            os.replace(staging, target)
+        except BaseException:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+    return target
+
+def get_snapshot_connection(snapshot_file: str = None):
+    """
+    Get a read-only connection to the reporting snapshot
+    
+    The snapshot is taken first if it is missing or older than
+    SNAPSHOT_MAX_AGE seconds, so reports never read data older than that
+    even when no SnapshotRefresher is running.
+    """
+    target = snapshot_file or SNAPSHOT_FILE
+    with _snapshot_lock:
+        if not os.path.exists(target) or (
+                SNAPSHOT_MAX_AGE and time.time() - os.path.getmtime(target) > SNAPSHOT_MAX_AGE):
+            refresh_snapshot(target)
+    
+    uri = Path(target).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def get_read_connection():
+    """
+    Get a connection for read-only queries, honouring reporting_snapshot()
+    
+    The snapshot copies DATABASE_FILE only, so inside a shard block reads go
+    to the live shard.
+    """
+    if _active_shard.get() is not None:
+        return get_connection()
+    if _use_snapshot.get():
+        return get_snapshot_connection()
+    return get_connection()
+
+def read_source() -> str:
+    """Database file that get_read_connection() reads from right now"""
+    shard_file = _active_shard.get()
+    if shard_file is not None:
+        return shard_file
+    return SNAPSHOT_FILE if _use_snapshot.get() else DATABASE_FILE
+
+@contextmanager
+def reporting_snapshot():
+    """
+    Route read queries made inside the block to the reporting snapshot
+    
+    Example:
+        with reporting_snapshot():
+            transcripts = GradeCalculator.get_batch_transcripts(nims)
+    """
+    token = _use_snapshot.set(True)
+    try:
+        yield
+    finally:
+        _use_snapshot.reset(token)
+
+class SnapshotRefresher:
+    """Refresh the reporting snapshot on a fixed interval in a background thread"""
+    
+    def __init__(self, interval_seconds: float = 300.0, snapshot_file: str = None):
+        self.interval_seconds = interval_seconds
+        self.snapshot_file = snapshot_file
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Take a fresh snapshot and keep refreshing it until stop() is called"""
+        if self._thread is not None:
+            return
+        refresh_snapshot(self.snapshot_file)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="snapshot-refresher", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the background refresh"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                refresh_snapshot(self.snapshot_file)
+            except sqlite3.Error as e:
+                print(f"Snapshot refresh failed: {e}")
+
+def populate_sample_data(verbose: bool = True):
     """Populate sample data for testing"""
     conn = get_connection()
     cursor = conn.cursor()
@@ -102,6 +766,7 @@ def populate_sample_data():
     # Check if data already exists
     cursor.execute("SELECT COUNT(*) FROM students")
     if cursor.fetchone()[0] > 0:
+        conn.close()
         return  # Data already exists
     
     # Sample students
@@ -138,14 +803,25 @@ def populate_sample_data():
         ("21003", "NET101", 1, "C", 2.0, 77),
     ]
     
+    if _shard_router is None:
+        _insert_grades(cursor, sample_grades)
+    conn.commit()
+    conn.close()
+    
+    if _shard_router is not None:
+        for shard_file, rows in _shard_router.group(sample_grades, lambda row: row[0]).items():
+            conn = _shard_router.connect(shard_file)
+            _insert_grades(conn.cursor(), rows)
+            conn.commit()
+            conn.close()
+    if verbose:
+        print("Sample data populated successfully!")
+
+def _insert_grades(cursor, grades):
     cursor.executemany("""
         INSERT INTO grades (nim, course_code, semester, letter_grade, numeric_grade, presence_percentage)
         VALUES (?, ?, ?, ?, ?, ?)
-    """, sample_grades)
-    
-    conn.commit()
-    conn.close()
-    print("Sample data populated successfully!")
+    """, grades)
 
 if __name__ == "__main__":
     init_database()
@@ -1,9 +1,15 @@
 """
 GPA/IPK Calculator - Calculate semester GPA (IPS) and cumulative GPA (IPK)
 """
-from database import get_connection
+from database import get_connection, reporting_snapshot, read_source, for_each_shard, active_shard, shard_router
+from contextlib import nullcontext
+from itertools import groupby
 from grade_manager import GradeManager
-from typing import Tuple, Optional, List, Dict
+from records import GradeRecord
+from repositories import get_storage
+from single_flight import SingleFlight
+import transcript_snapshots
+from typing import Tuple, Optional, List, Dict, Iterable, Iterator
 
 class GradeCalculator:
     """Calculate academic performance metrics"""
@@ -16,6 +22,23 @@ class GradeCalculator:
         'Kurang': 0.0
     }
     
+    # Concurrent requests for the same student share one computation (e.g. right
+    # after grades are released); see flight_metrics()
+    _ipk_flight = SingleFlight('calculate_ipk')
+    _transcript_flight = SingleFlight('get_transcript')
+    
+    @staticmethod
+    def _flight_key(nim: str) -> tuple:
+        # Reads from another database or storage must not share a result, and a
+        # caller after a grade write must not join a computation started before it
+        return (nim, id(get_storage()), read_source(), GradeManager.write_generation(nim))
+    
+    @staticmethod
+    def flight_metrics() -> Dict[str, Dict]:
+        """Call, execution and coalescing counts of the single-flight layers"""
+        return {flight.name: flight.metrics()
+                for flight in (GradeCalculator._transcript_flight, GradeCalculator._ipk_flight)}
+    
     @staticmethod
     def calculate_ips(nim: str, semester: int) -> float:
         """
@@ -30,27 +53,29 @@ class GradeCalculator:
         Args:
             nim: Student ID
             semester: Semester number
-            
+        
         Returns:
             float: IPS value (0.0 - 4.0)
         """
         
-        grades_data = GradeManager.get_all_grades_for_student(nim, semester)
+        records = GradeManager.get_grade_records(nim, semester)
+        return GradeCalculator._ips_from_records(records)
+    
+    @staticmethod
+    def _ips_from_records(records: List[GradeRecord]) -> float:
+        """IPS over already-loaded grade records of one semester"""
         
-        if not grades_data:
+        if not records:
             return 0.0  # No grades in this semester
         
         total_weighted_grade = 0.0
         total_sks = 0
         
-        for grade in grades_data:
+        for grade in records:
             # Only count passed courses (nilai >= D = 1.0)
-            if GradeManager.is_passed(grade['numeric_grade']):
-                sks = grade['sks']
-                numeric_grade = grade['numeric_grade']
-                
-                total_weighted_grade += (sks * numeric_grade)
-                total_sks += sks
+            if GradeManager.is_passed(grade.numeric_grade):
+                total_weighted_grade += (grade.sks * grade.numeric_grade)
+                total_sks += grade.sks
         
         if total_sks == 0:
             return 0.0
@@ -71,40 +96,47 @@ class GradeCalculator:
         
         Args:
             nim: Student ID
-            
+        
         Returns:
             float: IPK value (0.0 - 4.0)
         """
         
-        grades_data = GradeManager.get_all_grades_for_student(nim)
-        
-        if not grades_data:
-            return 0.0  # Semester 1 belum ada nilai
+        return GradeCalculator._ipk_flight.do(GradeCalculator._flight_key(nim),
+                                              GradeCalculator._compute_ipk, nim)
+    
+    @staticmethod
+    def _compute_ipk(nim: str) -> float:
+        records = GradeManager.get_grade_records(nim)
+        return GradeCalculator._ipk_from_records(records)
+    
+    @staticmethod
+    def _best_grades_by_course(records: List[GradeRecord]) -> Dict[str, GradeRecord]:
+        """Keep only the highest grade per course (repeated courses)"""
         
-        # Handle repeated courses - keep only the highest grade per course
         course_grades = {}
-        for grade in grades_data:
-            course_code = grade['course_code']
-            
-            if course_code not in course_grades:
-                course_grades[course_code] = grade
-            else:
-                # If course exists, keep the one with higher grade
-                if grade['numeric_grade'] > course_grades[course_code]['numeric_grade']:
-                    course_grades[course_code] = grade
+        for grade in records:
+            best = course_grades.get(grade.course_code)
+            if best is None or grade.numeric_grade > best.numeric_grade:
+                course_grades[grade.course_code] = grade
+        
+        return course_grades
+    
+    @staticmethod
+    def _ipk_from_records(records: List[GradeRecord]) -> float:
+        """IPK over a student's already-loaded grade records"""
+        
+        if not records:
+            return 0.0  # Semester 1 belum ada nilai
         
         total_weighted_grade = 0.0
         total_sks = 0
         
         # Calculate IPK using only the highest grade per course
-        for course_code, grade in course_grades.items():
+        for grade in GradeCalculator._best_grades_by_course(records).values():
             # Only count passed courses (nilai >= D = 1.0)
-            if GradeManager.is_passed(grade['numeric_grade']):
-                sks = grade['sks']
-                numeric_grade = grade['numeric_grade']
-                
-                total_weighted_grade += (sks * numeric_grade)
-                total_sks += sks
+            if GradeManager.is_passed(grade.numeric_grade):
+                total_weighted_grade += (grade.sks * grade.numeric_grade)
+                total_sks += grade.sks
         
         if total_sks == 0:
             return 0.0
@@ -117,40 +149,68 @@ class GradeCalculator:
         """
         Get complete academic record for a student
         
+        Semesters up to the student's latest semester-close snapshot are
+        served from that frozen snapshot; only the semesters after it are
+        computed from the live grades (IPK covers both).
+        
         Returns:
-            Dict: Complete transcript with all semesters, courses, grades, and metrics
+            Dict: Complete transcript with all semesters, courses, grades, and metrics.
+                Courses are GradeRecords; the API serializes them with to_dict().
+                'snapshot' describes the frozen version used, or is None.
+                Concurrent callers may get the same object: don't modify it.
         """
         
+        return GradeCalculator._transcript_flight.do(GradeCalculator._flight_key(nim),
+                                                     GradeCalculator._compute_transcript, nim)
+    
+    @staticmethod
+    def _compute_transcript(nim: str) -> Dict:
         # Get student info
         student = GradeManager.get_student_info(nim)
         if not student:
             return {}
         
-        # Get all grades
-        all_grades = GradeManager.get_all_grades_for_student(nim)
+        snapshot = get_storage().snapshots.latest(nim)
+        if snapshot is None:
+            all_grades = GradeManager.get_grade_records(nim)
+            transcript = GradeCalculator._transcript_from_records(student, all_grades)
+            transcript['snapshot'] = None
+            return transcript
+        
+        # Frozen semesters from the snapshot, live delta for the open ones
+        frozen = transcript_snapshots.decode(snapshot['content_hash'], snapshot['content'])
+        frozen_grades = [grade for semester_data in frozen['semesters'] for grade in semester_data['courses']]
+        delta_grades = GradeManager.get_grade_records(nim, after_semester=snapshot['closed_semester'])
+        
+        transcript = GradeCalculator._transcript_from_records(
+            student, frozen_grades + delta_grades,
+            frozen['semesters'] + GradeCalculator._semesters_from_records(delta_grades))
+        transcript['snapshot'] = GradeCalculator._snapshot_info(snapshot)
+        return transcript
+    
+    @staticmethod
+    def _semesters_from_records(records: List[GradeRecord]) -> List[Dict]:
+        """Per-semester IPS, passed SKS and courses, in semester order"""
         
         # Organize by semester
         transcript_by_semester = {}
-        for grade in all_grades:
-            semester = grade['semester']
+        for grade in records:
+            semester = grade.semester
             if semester not in transcript_by_semester:
                 transcript_by_semester[semester] = []
             transcript_by_semester[semester].append(grade)
         
         # Calculate metrics for each semester
         semesters_data = []
-        total_sks_all = 0
-        
         for semester in sorted(transcript_by_semester.keys()):
             grades = transcript_by_semester[semester]
             
             # Calculate semester total SKS (passed courses only)
-            semester_sks = sum(g['sks'] for g in grades 
-                              if GradeManager.is_passed(g['numeric_grade']))
-            total_sks_all += semester_sks
+            semester_sks = sum(g.sks for g in grades 
+                              if GradeManager.is_passed(g.numeric_grade))
             
             # Calculate IPS for this semester
-            ips = GradeCalculator.calculate_ips(nim, semester)
+            ips = GradeCalculator._ips_from_records(grades)
             
             semesters_data.append({
                 'semester': semester,
@@ -159,8 +219,18 @@ class GradeCalculator:
                 'courses': grades
             })
         
+        return semesters_data
+    
+    @staticmethod
+    def _transcript_from_records(student: dict, all_grades: List[GradeRecord],
+                                 semesters_data: Optional[List[Dict]] = None) -> Dict:
+        """Transcript from already-loaded records (semesters computed from them unless given)"""
+        
+        if semesters_data is None:
+            semesters_data = GradeCalculator._semesters_from_records(all_grades)
+        
         # Calculate IPK
-        ipk = GradeCalculator.calculate_ipk(nim)
+        ipk = GradeCalculator._ipk_from_records(all_grades)
         
         # Determine graduation predicate
         predicate = GradeCalculator.get_graduation_predicate(ipk)
@@ -169,7 +239,7 @@ class GradeCalculator:
         transcript = {
             'student': dict(student),
             'semesters': semesters_data,
-            'total_sks': total_sks_all,
+            'total_sks': sum(semester_data['total_sks'] for semester_data in semesters_data),
             'ipk': ipk,
             'graduation_predicate': predicate,
             'number_of_semesters': len(semesters_data)
@@ -177,6 +247,151 @@ class GradeCalculator:
         
         return transcript
     
+    @staticmethod
+    def _snapshot_info(snapshot: dict) -> Dict:
+        return {
+            'version': snapshot['version'],
+            'closed_semester': snapshot['closed_semester'],
+            'content_hash': snapshot['content_hash'],
+            'created_at': snapshot['created_at']
+        }
+    
+    @staticmethod
+    def close_semester(semester: int, nims: Optional[List[str]] = None) -> Dict:
+        """
+        Freeze transcripts up to and including a semester as new snapshot versions
+        
+        All grades are read in one streamed pass (one per shard, in
+        parallel, when sharded); with nims, only those students' grades are
+        loaded, in one lookup per shard. A student whose frozen content is
+        identical to their latest snapshot for the same semester gets no new
+        version, so closing again only stores what changed. Students without
+        grades up to the semester are skipped.
+        
+        Args:
+            semester: Last semester to freeze
+            nims: Only these students (default: everyone)
+        
+        Returns:
+            Dict: semester, snapshots (stored) and unchanged
+        """
+        
+        storage = get_storage()
+        latest = storage.snapshots.latest_hashes()
+        if nims is not None:
+            students = sorted(storage.students.get_many(nims).values(), key=lambda student: student['nim'])
+            records = GradeManager.get_grade_records_for_students([student['nim'] for student in students])
+            frozen = [GradeCalculator._freeze_students(
+                semester, ((student, records.get(student['nim'], [])) for student in students), latest)]
+        else:
+            frozen = for_each_shard(GradeCalculator._freeze_transcripts, semester,
+                                    storage.students.list_all(), latest)
+        rows = [row for shard_rows, _ in frozen for row in shard_rows]
+        storage.snapshots.add_many(rows)
+        return {'semester': semester, 'snapshots': len(rows),
+                'unchanged': sum(unchanged for _, unchanged in frozen)}
+    
+    @staticmethod
+    def _freeze_transcripts(semester: int, students: List[Dict],
+                            latest: Dict[str, Tuple[int, str]]) -> Tuple[List[tuple], int]:
+        """Snapshot rows for students whose grades are in the current database or shard"""
+        
+        return GradeCalculator._freeze_students(semester, GradeCalculator._with_streamed_records(students),
+                                                latest)
+    
+    @staticmethod
+    def _with_streamed_records(students: List[Dict]) -> Iterator[Tuple[Dict, List[GradeRecord]]]:
+        """Pair each student with their grade records from the streamed pass over all grades"""
+        
+        # Students and grades are both ordered by NIM: merge them without holding all grades
+        groups = groupby(GradeManager.iter_all_grade_records(), key=lambda r: r.nim)
+        pending = next(groups, None)
+        for student in students:
+            while pending is not None and pending[0] < student['nim']:
+                pending = next(groups, None)
+            records = []
+            if pending is not None and pending[0] == student['nim']:
+                records = list(pending[1])
+                pending = next(groups, None)
+            yield student, records
+    
+    @staticmethod
+    def _freeze_students(semester: int, students: Iterable[Tuple[Dict, List[GradeRecord]]],
+                         latest: Dict[str, Tuple[int, str]]) -> Tuple[List[tuple], int]:
+        """Snapshot rows for (student, grade records) pairs whose content changed"""
+        
+        rows = []
+        unchanged = 0
+        for student, records in students:
+            records = [r for r in records if r.semester <= semester]
+            if not records:
+                continue
+            
+            content_hash, content = transcript_snapshots.encode(
+                GradeCalculator._transcript_from_records(student, records))
+            if latest.get(student['nim']) == (semester, content_hash):
+                unchanged += 1
+                continue
+            rows.append((student['nim'], semester, content_hash, content))
+        return rows, unchanged
+    
+    @staticmethod
+    def get_transcript_version(nim: str, version: int) -> Dict:
+        """
+        A frozen transcript exactly as it was snapshotted
+        
+        Returns:
+            Dict: Transcript like get_transcript() (empty if the version doesn't exist)
+        """
+        
+        snapshot = get_storage().snapshots.get(nim, version)
+        if snapshot is None:
+            return {}
+        transcript = transcript_snapshots.decode(snapshot['content_hash'], snapshot['content'])
+        transcript['snapshot'] = GradeCalculator._snapshot_info(snapshot)
+        return transcript
+    
+    @staticmethod
+    def list_transcript_versions(nim: str) -> List[Dict]:
+        """A student's snapshot versions (no content), newest first"""
+        return get_storage().snapshots.list_versions(nim)
+    
+    @staticmethod
+    def get_batch_transcripts(nims: List[str], use_snapshot: bool = True) -> Dict[str, Dict]:
+        """
+        Get transcripts for many students in one reporting run
+        
+        Args:
+            nims: Student IDs
+            use_snapshot: Read from the reporting snapshot so the run never
+                contends with grade entry on the live database
+        
+        Returns:
+            Dict: Transcript per NIM (students without data are skipped)
+        
+        When grades are sharded, each shard's students are fetched in
+        parallel (the reporting snapshot covers the main database only).
+        """
+        
+        router = shard_router()
+        by_shard = router.group(nims, lambda nim: nim) if router else {None: list(nims)}
+        
+        def fetch():
+            transcripts = {}
+            for nim in by_shard.get(active_shard(), []):
+                transcript = GradeCalculator.get_transcript(nim)
+                if transcript:
+                    transcripts[nim] = transcript
+            return transcripts
+        
+        transcripts = {}
+        with reporting_snapshot() if use_snapshot else nullcontext():
+            for shard_transcripts in for_each_shard(fetch):
+                transcripts.update(shard_transcripts)
+        
+        # Input order, as before sharding
+        return {nim: transcripts[nim] for nim in nims if nim in transcripts}
+    
     @staticmethod
     def get_graduation_predicate(ipk: float) -> str:
         """
@@ -205,12 +420,12 @@ class GradeCalculator:
     def get_semester_summary(nim: str, semester: int) -> Dict:
         """Get summary for a specific semester"""
         
-        grades = GradeManager.get_all_grades_for_student(nim, semester)
-        ips = GradeCalculator.calculate_ips(nim, semester)
+        grades = GradeManager.get_grade_records(nim, semester)
+        ips = GradeCalculator._ips_from_records(grades)
         
-        total_sks = sum(g['sks'] for g in grades)
-        passed_sks = sum(g['sks'] for g in grades if GradeManager.is_passed(g['numeric_grade']))
-        failed_count = sum(1 for g in grades if not GradeManager.is_passed(g['numeric_grade']))
+        total_sks = sum(g.sks for g in grades)
+        passed_sks = sum(g.sks for g in grades if GradeManager.is_passed(g.numeric_grade))
+        failed_count = sum(1 for g in grades if not GradeManager.is_passed(g.numeric_grade))
         
         return {
             'semester': semester,
@@ -219,14 +434,14 @@ class GradeCalculator:
             'total_sks': total_sks,
             'passed_sks': passed_sks,
             'failed_courses': failed_count,
-            'average_grade': round(sum(g['numeric_grade'] for g in grades) / len(grades), 2) if grades else 0.0
+            'average_grade': round(sum(g.numeric_grade for g in grades) / len(grades), 2) if grades else 0.0
         }
     
     @staticmethod
     def get_performance_statistics(nim: str) -> Dict:
         """Get detailed performance statistics for a student"""
         
-        all_grades = GradeManager.get_all_grades_for_student(nim)
+        all_grades = GradeManager.get_grade_records(nim)
         
         if not all_grades:
             return {
@@ -238,10 +453,10 @@ class GradeCalculator:
                 'average_grade': 0.0
             }
         
-        passed_count = sum(1 for g in all_grades if GradeManager.is_passed(g['numeric_grade']))
-        passed_sks = sum(g['sks'] for g in all_grades if GradeManager.is_passed(g['numeric_grade']))
-        total_sks = sum(g['sks'] for g in all_grades)
-        average_grade = round(sum(g['numeric_grade'] for g in all_grades) / len(all_grades), 2)
+        passed_count = sum(1 for g in all_grades if GradeManager.is_passed(g.numeric_grade))
+        passed_sks = sum(g.sks for g in all_grades if GradeManager.is_passed(g.numeric_grade))
+        total_sks = sum(g.sks for g in all_grades)
+        average_grade = round(sum(g.numeric_grade for g in all_grades) / len(all_grades), 2)
         
         return {
             'total_courses': len(all_grades),
@@ -0,0 +1,176 @@
+"""
+Grade Components - Weighted assessment components aggregated into final grades
+"""
+from grade_manager import GradeManager
+from grading_scale import GradingScaleRegistry
+from repositories import get_storage
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class GradeComponents:
+    """
+    Per-course component weights (e.g. tugas 30, UTS 30, UAS 40) and raw
+    component scores, turned into final scores and letter grades per class
+    
+    A class is computed in one pass: its weights and all of its scores are
+    loaded with one query each, laid out as one score row per student in
+    component order, and reduced with the weight vector. Components without a
+    score count as 0 and are reported as missing.
+    """
+    
+    @staticmethod
+    def set_weights(course_code: str, weights: Dict[str, float]) -> Dict[str, float]:
+        """
+        Replace a course's component weights
+        
+        Raises:
+            ValueError: If the course is unknown, a weight is not positive or
+                the weights don't sum to 100
+        """
+        
+        if get_storage().courses.get(course_code) is None:
+            raise ValueError(f"Course {course_code} not found")
+        if not weights:
+            raise ValueError("At least one component is required")
+        weights = {str(component): float(weight) for component, weight in weights.items()}
+        if any(weight <= 0 for weight in weights.values()):
+            raise ValueError("Component weights must be positive")
+        if abs(sum(weights.values()) - 100.0) > 1e-6:
+            raise ValueError(f"Component weights must sum to 100, not {sum(weights.values())}")
+        
+        get_storage().components.set_weights(course_code, weights)
+        return weights
+    
+    @staticmethod
+    def get_weights(course_code: str) -> Dict[str, float]:
+        """Get a course's {component: weight}"""
+        return get_storage().components.get_weights(course_code)
+    
+    @staticmethod
+    def record_scores(course_code: str, semester: int,
+                      scores: Iterable[Tuple[str, str, float]]) -> int:
+        """
+        Store raw (nim, component, score) rows for one class
+        
+        Returns:
+            int: Number of scores stored
+        
+        Raises:
+            ValueError: If a component isn't defined for the course or a score
+                is outside 0-100; nothing is stored then
+        """
+        
+        weights = GradeComponents.get_weights(course_code)
+        if not weights:
+            raise ValueError(f"Course {course_code} has no components")
+        
+        rows = []
+        for nim, component, score in scores:
+            if component not in weights:
+                raise ValueError(f"Unknown component '{component}' for {course_code}")
+            score = float(score)
+            if not (0 <= score <= 100):
+                raise ValueError(f"Nilai {component} untuk {nim} harus antara 0-100.")
+            rows.append((nim, component, score))
+        
+        get_storage().components.save_scores(course_code, semester, rows)
+        return len(rows)
+    
+    @staticmethod
+    def compute_class(course_code: str, semester: int) -> List[Dict]:
+        """
+        Final score and letter grade of every student with component scores
+        
+        Returns:
+            List[Dict]: Per student (NIM order): nim, final_score, letter_grade
+                (student's program scale) and missing components
+        """
+        
+        weights = GradeComponents.get_weights(course_code)
+        if not weights:
+            raise ValueError(f"Course {course_code} has no components")
+        
+        storage = get_storage()
+        components = list(weights)
+        column = {component: index for index, component in enumerate(components)}
+        weight_vector = [weights[component] / 100.0 for component in components]
+        
+        # Score matrix: one row per student, one column per component (None = missing)
+        nims = []
+        matrix = []
+        row = None
+        for nim, component, score in storage.components.list_scores(course_code, semester):
+            if not nims or nims[-1] != nim:
+                nims.append(nim)
+                row = [None] * len(components)
+                matrix.append(row)
+            if component in column:
+                row[column[component]] = score
+        
+        finals = [round(sum(w * s for w, s in zip(weight_vector, scores) if s is not None), 2)
+                  for scores in matrix]
+        
+        # Letters per program scale, converting each program's scores as one batch
+        students = storage.students.get_many(nims)
+        by_program = {}
+        for index, nim in enumerate(nims):
+            program_study = students[nim]['program_study'] if nim in students else None
+            by_program.setdefault(program_study, []).append(index)
+        
+        letters = [None] * len(nims)
+        for program_study, indexes in by_program.items():
+            scale = GradingScaleRegistry.get_scale(program_study)
+            for index, letter in zip(indexes, scale.convert_scores(finals[i] for i in indexes)):
+                letters[index] = letter
+        
+        return [{
+            'nim': nim,
+            'final_score': final,
+            'letter_grade': letter,
+            'missing': [components[i] for i, score in enumerate(scores) if score is None]
+        } for nim, final, letter, scores in zip(nims, finals, letters, matrix)]
+    
+    @staticmethod
+    def finalize_class(course_code: str, semester: int,
+                       presence: Optional[Dict[str, float]] = None, allow_missing: bool = False) -> Dict:
+        """
+        Compute a class's final grades and store them in the grades table
+        
+        Grades go through GradeManager.bulk_input_grades, so they get the same
+        validation as input_grade and are stored in one transaction. A
+        student still missing a component score is not stored (it would
+        count as 0) unless allow_missing is set.
+        
+        Args:
+            presence: Attendance percentage per NIM (default 75 like input_grade)
+            allow_missing: Store incomplete rows with missing components as 0
+        
+        Returns:
+            Dict: Computed rows plus the success/message of storing each
+        """
+        
+        presence = presence or {}
+        computed = GradeComponents.compute_class(course_code, semester)
+        complete = [row for row in computed if allow_missing or not row['missing']]
+        results = GradeManager.bulk_input_grades([{
+            'nim': row['nim'],
+            'course_code': course_code,
+            'semester': semester,
+            'score': row['final_score'],
+            'presence_percentage': presence.get(row['nim'], 75.0)
+        } for row in complete])
+        
+        for row, (success, message) in zip(complete, results):
+            row['success'] = success
+            row['message'] = message
+        for row in computed:
+            if 'success' not in row:
+                row['success'] = False
+                row['message'] = f"Nilai komponen belum lengkap: {', '.join(row['missing'])}"
+        
+        return {
+            'course_code': course_code,
+            'semester': semester,
+            'stored': sum(1 for success, _ in results if success),
+            'results': computed
+        }
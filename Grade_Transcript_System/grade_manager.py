@@ -1,27 +1,34 @@
 """
 Grade Management System - Input, validation, and conversion of academic grades
 """
-from database import get_connection
+from repositories import get_storage
+from records import GradeRecord
+from database import active_shard, shard_router, student_shard, use_shard
+from grading_scale import DEFAULT_SCALE, GradingScaleRegistry
+from group_commit import GroupCommitWriter, WriterClosedError
 from datetime import datetime
-from typing import Tuple, Optional
+from heapq import merge
+from threading import Lock
+from weakref import WeakMethod
+from typing import Tuple, Optional, List, Callable, Iterator, Dict
 
-# Grade conversion table
-GRADE_CONVERSION = {
-    'A': 4.0,
-    'B': 3.0,
-    'C': 2.0,
-    'D': 1.0,
-    'E': 0.0
-}
+# Default grade conversion table (per-program scales: see grading_scale.py)
+GRADE_CONVERSION = {letter: numeric for letter, numeric, _ in DEFAULT_SCALE}
 
 # Reverse conversion
-NUMERIC_TO_GRADE = {
-    4.0: 'A',
-    3.0: 'B',
-    2.0: 'C',
-    1.0: 'D',
-    0.0: 'E'
-}
+NUMERIC_TO_GRADE = {numeric: letter for letter, numeric, _ in DEFAULT_SCALE}
+
+# Callbacks notified after a grade is stored, or WeakMethods of them (see GradeManager.add_change_listener)
+_change_listeners = []
+
+# Stored grade writes per stripe of students (see GradeManager.write_generation):
+# fixed size, so it never grows with the number of students written
+_GENERATION_STRIPES = 4096
+_write_generations: List[int] = [0] * _GENERATION_STRIPES
+_generation_lock = Lock()
+
+# Writer thread sharing transactions among concurrent input_grade() calls (None = off)
+_group_writer = None
 
 class GradeManager:
     """Manages grade input, validation, and conversion"""
@@ -31,13 +38,14 @@ class GradeManager:
     
     @staticmethod
     def validate_input(nim: str, course_code: str, letter_grade: str, 
-                      presence_percentage: float, semester: int) -> Tuple[bool, str]:
+                      presence_percentage: float, semester: int,
+                      program_study: Optional[str] = None) -> Tuple[bool, str]:
         """
         Validate grade input with business rules
         
         Business Rules:
         - Nilai tidak bisa diinput jika presensi < 75%
-        - Huruf grade harus A-E
+        - Huruf grade harus ada di skala nilai program studi (default A-E)
         - Presence harus 0-100
         - Semester harus positif
         """
@@ -47,8 +55,9 @@ class GradeManager:
             return False, f"Presence {presence_percentage}% kurang dari 75%. Nilai tidak bisa diinput."
         
         # Check grade validity
-        if letter_grade not in GRADE_CONVERSION:
-            return False, f"Huruf grade '{letter_grade}' tidak valid. Harus A, B, C, D, atau E."
+        scale = GradingScaleRegistry.get_scale(program_study)
+        if not scale.is_valid(letter_grade):
+            return False, f"Huruf grade '{letter_grade}' tidak valid. Harus {scale.describe_letters()}."
         
         # Check presence range
         if not (0 <= presence_percentage <= 100):
@@ -61,14 +70,19 @@ class GradeManager:
         return True, "Validation passed"
     
     @staticmethod
-    def convert_letter_to_numeric(letter_grade: str) -> float:
+    def convert_letter_to_numeric(letter_grade: str, program_study: Optional[str] = None) -> float:
         """Convert letter grade to numeric value"""
-        return GRADE_CONVERSION.get(letter_grade, 0.0)
+        return GradingScaleRegistry.get_scale(program_study).numeric(letter_grade)
     
     @staticmethod
-    def convert_numeric_to_letter(numeric_grade: float) -> str:
+    def convert_numeric_to_letter(numeric_grade: float, program_study: Optional[str] = None) -> str:
         """Convert numeric grade back to letter"""
-        return NUMERIC_TO_GRADE.get(numeric_grade, 'E')
+        return GradingScaleRegistry.get_scale(program_study).letter_for_numeric(numeric_grade)
+    
+    @staticmethod
+    def convert_score_to_letter(score: float, program_study: Optional[str] = None) -> str:
+        """Convert a raw 0-100 score to a letter grade"""
+        return GradingScaleRegistry.get_scale(program_study).letter_for_score(score)
     
     @staticmethod
     def input_grade(nim: str, course_code: str, semester: int, 
@@ -80,136 +94,280 @@ class GradeManager:
             Tuple[bool, str]: (success, message)
         """
         
+        # Grade against the student's program scale
+        storage = get_storage()
+        student = storage.students.get(nim)
+        program_study = student['program_study'] if student else None
+        
         # Validate input
         is_valid, validation_msg = GradeManager.validate_input(
-            nim, course_code, letter_grade, presence_percentage, semester
+            nim, course_code, letter_grade, presence_percentage, semester, program_study
         )
         
         if not is_valid:
             return False, validation_msg
         
         # Convert letter to numeric
-        numeric_grade = GradeManager.convert_letter_to_numeric(letter_grade)
+        numeric_grade = GradeManager.convert_letter_to_numeric(letter_grade, program_study)
         
         # Insert or update grade
-        conn = get_connection()
-        cursor = conn.cursor()
-        
+        grade = (nim, course_code, semester, letter_grade, numeric_grade, presence_percentage)
+        writer = _group_writer  # Read once: disable_group_commit() may run meanwhile
         try:
-            # Check if grade already exists
-            cursor.execute("""
-                SELECT grade_id FROM grades 
-                WHERE nim = ? AND course_code = ? AND semester = ?
-            """, (nim, course_code, semester))
+            with student_shard(nim):
+                if writer is not None:
+                    try:
+                        updated = writer.save(storage, grade)
+                    except WriterClosedError:
+                        writer = None  # Closed since it was read: store directly
+                if writer is None:
+                    updated = storage.grades.save(*grade)
+        except Exception as e:
+            return False, f"Error: {str(e)}"
+        
+        GradeManager._notify_change({
+            'nim': nim,
+            'course_code': course_code,
+            'semester': semester,
+            'letter_grade': letter_grade,
+            'numeric_grade': numeric_grade,
+            'updated': updated
+        })
+        
+        if updated:
+            return True, f"Grade updated: {letter_grade} ({numeric_grade})"
+        return True, f"Grade inserted: {letter_grade} ({numeric_grade})"
+    
+    @staticmethod
+    def bulk_input_grades(rows: List[Dict]) -> List[Tuple[bool, str]]:
+        """
+        Input many grades at once, e.g. a class list or a semester-close import
+        
+        Each row has nim, course_code, semester, optional presence_percentage
+        (default 75) and either letter_grade or a raw 0-100 score, converted
+        with the student's program scale. Rows are validated like
+        input_grade(); the valid ones are stored in a single transaction
+        (one per shard when grades are sharded). A malformed row fails on its
+        own and never rejects the batch.
+        
+        Returns:
+            List[Tuple[bool, str]]: (success, message) per row, in input order
+        """
+        
+        storage = get_storage()
+        results = [None] * len(rows)
+        parsed = []
+        for index, row in enumerate(rows):
+            try:
+                parsed.append((index, str(row['nim']), str(row['course_code']), int(row['semester']),
+                               float(row.get('presence_percentage', 75.0)), row))
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                results[index] = (False, f"Baris tidak valid: {e}")
+        
+        students = storage.students.get_many(nim for _, nim, _, _, _, _ in parsed)
+        programs = {nim: student['program_study'] for nim, student in students.items()}
+        accepted = []
+        
+        for index, nim, course_code, semester, presence, row in parsed:
+            scale = GradingScaleRegistry.get_scale(programs.get(nim))
             
-            existing = cursor.fetchone()
+            letter_grade = row.get('letter_grade')
+            if letter_grade is not None:
+                letter_grade = str(letter_grade)
+            else:
+                try:
+                    letter_grade = scale.letter_for_score(float(row['score']))
+                except (KeyError, TypeError, ValueError) as e:
+                    results[index] = (False, f"Nilai mentah tidak valid: {e}")
+                    continue
             
-            if existing:
-                # Update existing grade
-                grade_id = existing['grade_id']
-                
-                # Get old values for audit trail
-                cursor.execute("""
-                    SELECT letter_grade, numeric_grade FROM grades 
-                    WHERE grade_id = ?
-                """, (grade_id,))
-                old_values = cursor.fetchone()
-                
-                # Update grade
-                cursor.execute("""
-                    UPDATE grades 
-                    SET letter_grade = ?, numeric_grade = ?, 
-                        presence_percentage = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE grade_id = ?
-                """, (letter_grade, numeric_grade, presence_percentage, grade_id))
-                
-                # Record in audit trail
-                cursor.execute("""
-                    INSERT INTO grade_history 
-                    (grade_id, old_letter_grade, old_numeric_grade, 
-                     new_letter_grade, new_numeric_grade, changed_by, changed_at, reason)
-                    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
-                """, (grade_id, old_values['letter_grade'], old_values['numeric_grade'],
-                      letter_grade, numeric_grade, 'system', 'Grade updated'))
-                
-                conn.commit()
-                return True, f"Grade updated: {letter_grade} ({numeric_grade})"
+            is_valid, validation_msg = GradeManager.validate_input(
+                nim, course_code, letter_grade, presence, semester, programs.get(nim)
+            )
+            if not is_valid:
+                results[index] = (False, validation_msg)
+                continue
             
-            else:
-                # Insert new grade
-                cursor.execute("""
-                    INSERT INTO grades 
-                    (nim, course_code, semester, letter_grade, numeric_grade, presence_percentage)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (nim, course_code, semester, letter_grade, numeric_grade, presence_percentage))
-                
-                conn.commit()
-                return True, f"Grade inserted: {letter_grade} ({numeric_grade})"
+            accepted.append((index, (nim, course_code, semester, letter_grade,
+                                     scale.numeric(letter_grade), presence)))
         
-        except Exception as e:
-            conn.rollback()
-            return False, f"Error: {str(e)}"
+        router = shard_router()
+        groups = router.group(accepted, lambda item: item[1][0]) if router else {None: accepted}
+        stored = []
+        for shard_file, group in groups.items():
+            try:
+                with use_shard(shard_file):
+                    updated = storage.grades.save_many([grade for _, grade in group])
+            except Exception as e:
+                for index, _ in group:
+                    results[index] = (False, f"Error: {str(e)}")
+                continue
+            stored.extend(zip(group, updated))
         
-        finally:
-            conn.close()
+        for (index, grade), was_updated in sorted(stored, key=lambda item: item[0][0]):
+            nim, course_code, semester, letter_grade, numeric_grade, _ = grade
+            GradeManager._notify_change({
+                'nim': nim,
+                'course_code': course_code,
+                'semester': semester,
+                'letter_grade': letter_grade,
+                'numeric_grade': numeric_grade,
+                'updated': was_updated
+            })
+            action = "updated" if was_updated else "inserted"
+            results[index] = (True, f"Grade {action}: {letter_grade} ({numeric_grade})")
+        
+        return results
     
     @staticmethod
-    def get_grade(nim: str, course_code: str, semester: int) -> Optional[dict]:
-        """Get a specific grade"""
-        conn = get_connection()
-        cursor = conn.cursor()
+    def enable_group_commit(max_delay: float = 0.0, max_batch: int = 256) -> GroupCommitWriter:
+        """
+        Store input_grade() calls through one writer thread in shared transactions
         
-        cursor.execute("""
-            SELECT g.*, c.sks, c.course_name
-            FROM grades g
-            JOIN courses c ON g.course_code = c.course_code
-            WHERE g.nim = ? AND g.course_code = ? AND g.semester = ?
-        """, (nim, course_code, semester))
+        Submissions arriving while a commit is in progress are committed
+        together in the next one (at most max_batch rows; see
+        GroupCommitWriter for max_delay); each call still returns its own
+        result. Meant for a grading deadline, when many lecturers submit at
+        once.
+        """
+        global _group_writer
+        GradeManager.disable_group_commit()
+        _group_writer = GroupCommitWriter(max_delay, max_batch)
+        return _group_writer
+    
+    @staticmethod
+    def disable_group_commit() -> None:
+        """Store queued grades, stop the writer thread and commit per call again"""
+        global _group_writer
+        writer, _group_writer = _group_writer, None
+        if writer is not None:
+            writer.close()
+    
+    @staticmethod
+    def group_commit_metrics() -> Optional[dict]:
+        """Writes, commits and group sizes of the group commit writer, or None if off"""
+        return _group_writer.metrics() if _group_writer is not None else None
+    
+    @staticmethod
+    def add_change_listener(listener: Callable[[dict], None], weak: bool = False) -> None:
+        """
+        Call listener(event) after every stored grade
+        
+        The event has nim, course_code, semester, letter_grade, numeric_grade
+        and updated (False for a new grade). Listeners run after the grade is
+        committed; their errors are reported but never fail the input.
         
-        result = cursor.fetchone()
-        conn.close()
+        Args:
+            listener: Callback; adding the same one again has no effect
+            weak: Hold a bound method weakly, so it is dropped once its object
+                (e.g. an app's ChangeBroker) is garbage collected
+        """
+        if listener not in GradeManager._live_listeners():
+            _change_listeners.append(WeakMethod(listener) if weak else listener)
+    
+    @staticmethod
+    def remove_change_listener(listener: Callable[[dict], None]) -> None:
+        """Stop notifying a listener added with add_change_listener"""
+        for entry in list(_change_listeners):
+            if (entry() if isinstance(entry, WeakMethod) else entry) == listener:
+                _change_listeners.remove(entry)
+    
+    @staticmethod
+    def _live_listeners() -> List[Callable[[dict], None]]:
+        """Registered listeners, dropping weak ones whose object is gone"""
+        listeners = []
+        for entry in list(_change_listeners):
+            listener = entry() if isinstance(entry, WeakMethod) else entry
+            if listener is None:
+                if entry in _change_listeners:
+                    _change_listeners.remove(entry)
+            else:
+                listeners.append(listener)
+        return listeners
+    
+    @staticmethod
+    def write_generation(nim: str) -> int:
+        """
+        Number of grade writes stored in this process for a student's stripe
         
-        return dict(result) if result else None
+        Bumped after each write commits and before the change listeners
+        run, so a computation keyed by it (GradeCalculator's single-flight
+        keys) started before a write is never shared with callers after it.
+        Students share a counter with others of their stripe: a write to one
+        only ever starts extra computations for the rest, never stale ones.
+        """
+        return _write_generations[hash(nim) % _GENERATION_STRIPES]
+    
+    @staticmethod
+    def _notify_change(event: dict) -> None:
+        with _generation_lock:
+            _write_generations[hash(event['nim']) % _GENERATION_STRIPES] += 1
+        for listener in GradeManager._live_listeners():
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Grade change listener failed: {e}")
+    
+    @staticmethod
+    def get_grade(nim: str, course_code: str, semester: int) -> Optional[dict]:
+        """Get a specific grade"""
+        with student_shard(nim):
+            return get_storage().grades.find(nim, course_code, semester)
     
     @staticmethod
     def get_all_grades_for_student(nim: str, semester: Optional[int] = None) -> list:
         """Get all grades for a student, optionally filtered by semester"""
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        if semester:
-            cursor.execute("""
-                SELECT g.*, c.sks, c.course_name
-                FROM grades g
-                JOIN courses c ON g.course_code = c.course_code
-                WHERE g.nim = ? AND g.semester = ?
-                ORDER BY g.semester, g.course_code
-            """, (nim, semester))
-        else:
-            cursor.execute("""
-                SELECT g.*, c.sks, c.course_name
-                FROM grades g
-                JOIN courses c ON g.course_code = c.course_code
-                WHERE g.nim = ?
-                ORDER BY g.semester, g.course_code
-            """, (nim,))
-        
-        results = cursor.fetchall()
-        conn.close()
+        with student_shard(nim):
+            return get_storage().grades.list_for_student(nim, semester)
+    
+    @staticmethod
+    def get_grade_records(nim: str, semester: Optional[int] = None,
+                          after_semester: Optional[int] = None) -> List[GradeRecord]:
+        """Get a student's grades as compact records for calculations and transcripts"""
+        with student_shard(nim):
+            return get_storage().grades.list_records_for_student(nim, semester, after_semester)
+    
+    @staticmethod
+    def get_grade_records_for_students(nims: List[str]) -> Dict[str, List[GradeRecord]]:
+        """Get several students' grade records, one lookup per shard, keyed by NIM"""
+        router = shard_router()
+        if router is None or active_shard() is not None:
+            return get_storage().grades.list_records_for_students(nims)
+        records = {}
+        for shard_file, shard_nims in router.group(nims, lambda nim: nim).items():
+            with use_shard(shard_file):
+                records.update(get_storage().grades.list_records_for_students(shard_nims))
+        return records
+    
+    @staticmethod
+    def iter_all_grade_records() -> Iterator[GradeRecord]:
+        """
+        Stream every student's grade records, grouped by NIM, for cohort-wide jobs
         
-        return [dict(row) for row in results]
+        When sharded, the shards' ordered streams are merged (inside a
+        use_shard() block, only that shard is read).
+        """
+        router = shard_router()
+        if router is None or active_shard() is not None:
+            return get_storage().grades.iter_all_records()
+        streams = [GradeManager._iter_shard_records(shard_file) for shard_file in router.shard_files]
+        return merge(*streams, key=lambda r: (r.nim, r.semester, r.course_code))
+    
+    @staticmethod
+    def _iter_shard_records(shard_file: str) -> Iterator[GradeRecord]:
+        # Open the shard's cursor inside use_shard(), then stream outside it: the
+        # shard must not stay active in the caller's context between yields
+        with use_shard(shard_file):
+            records = get_storage().grades.iter_all_records()
+            first = next(records, None)
+        if first is not None:
+            yield first
+            yield from records
     
     @staticmethod
     def get_student_info(nim: str) -> Optional[dict]:
         """Get student information"""
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM students WHERE nim = ?", (nim,))
-        result = cursor.fetchone()
-        conn.close()
-        
-        return dict(result) if result else None
+        return get_storage().students.get(nim)
     
     @staticmethod
     def is_passed(numeric_grade: float) -> bool:
@@ -222,19 +380,8 @@ class GradeManager:
     @staticmethod
     def get_grade_history(nim: str) -> list:
         """Get audit trail for a student"""
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM grade_changes_summary
-            WHERE nim = ?
-            ORDER BY changed_at DESC
-        """, (nim,))
-        
-        results = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in results]
+        with student_shard(nim):
+            return get_storage().history.list_for_student(nim)
 
 
 if __name__ == "__main__":
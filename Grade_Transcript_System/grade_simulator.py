@@ -0,0 +1,148 @@
+"""
+What-If Simulator - Project IPS/IPK for planned or retaken grades
+"""
+from grade_manager import GradeManager
+from grade_calculator import GradeCalculator
+from records import GradeRecord
+from grading_scale import GradingScaleRegistry
+from repositories import get_storage
+from typing import Dict, List, Optional
+
+
+class GradeSimulator:
+    """
+    Evaluate hypothetical grades against one student's loaded grade state
+    
+    The student's grades are loaded once and reduced to running totals
+    (best grade per course for IPK, per-semester sums for IPS). Each scenario
+    only adjusts the totals for the courses it touches, applying the same
+    rules as calculate_ipk: repeated courses keep the highest grade and only
+    passed courses (>= D) count.
+    """
+    
+    def __init__(self, nim: str, records: Optional[List[GradeRecord]] = None):
+        self.nim = nim
+        self.records = records if records is not None else GradeManager.get_grade_records(nim)
+        self._course_sks = {r.course_code: r.sks for r in self.records}
+        self._catalogue_sks = {}
+        self.scale = GradingScaleRegistry.get_scale_for_student(nim)
+        
+        # IPK state: every attempt per course and the totals over each course's best passed grade
+        self._attempts = {}
+        for r in self.records:
+            self._attempts.setdefault(r.course_code, {})[r.semester] = r.numeric_grade
+        self._weighted = 0.0
+        self._sks = 0
+        for code, record in GradeCalculator._best_grades_by_course(self.records).items():
+            if GradeManager.is_passed(record.numeric_grade):
+                self._weighted += record.sks * record.numeric_grade
+                self._sks += record.sks
+        
+        # IPS state: each semester's grades and passed totals
+        self._semester_grades = {}
+        self._semester_totals = {}
+        for r in self.records:
+            self._semester_grades.setdefault(r.semester, {})[r.course_code] = r.numeric_grade
+            weighted, sks = self._semester_totals.get(r.semester, (0.0, 0))
+            if GradeManager.is_passed(r.numeric_grade):
+                weighted += r.sks * r.numeric_grade
+                sks += r.sks
+            self._semester_totals[r.semester] = (weighted, sks)
+        
+        self.next_semester = max(self._semester_grades, default=0) + 1
+        self.current_ipk = GradeCalculator._ipk_from_records(self.records)
+    
+    def simulate(self, hypothetical: List[Dict]) -> Dict:
+        """
+        Project IPS/IPK/predicate if the given grades were recorded
+        
+        Args:
+            hypothetical: Rows with 'course_code' and 'letter_grade', plus
+                optional 'semester' (default: the next semester) and 'sks'
+                (default: the course's SKS)
+        
+        Returns:
+            Dict: Projected IPS per touched semester, IPK and predicate
+        """
+        
+        semester_grades = {}
+        course_changes = {}
+        
+        for row in hypothetical:
+            course_code = row['course_code']
+            letter_grade = row['letter_grade']
+            if not self.scale.is_valid(letter_grade):
+                raise ValueError(f"Huruf grade '{letter_grade}' tidak valid.")
+            numeric_grade = self.scale.numeric(letter_grade)
+            semester = int(row.get('semester') or self.next_semester)
+            sks = int(row['sks']) if row.get('sks') is not None else self._sks_for(course_code)
+            
+            semester_grades.setdefault(semester, {})[course_code] = (numeric_grade, sks)
+            course_changes.setdefault(course_code, {})[semester] = numeric_grade
+        
+        # IPK: re-evaluate only the touched courses, each counted once with its highest grade
+        weighted, sks_total = self._weighted, self._sks
+        for course_code, changes in course_changes.items():
+            attempts = self._attempts.get(course_code, {})
+            if attempts:
+                old_best = max(attempts.values())
+                if GradeManager.is_passed(old_best):
+                    weighted -= self._course_sks[course_code] * old_best
+                    sks_total -= self._course_sks[course_code]
+            
+            new_best = max({**attempts, **changes}.values())
+            if GradeManager.is_passed(new_best):
+                sks = self._course_sks[course_code] if attempts else semester_grades[max(changes)][course_code][1]
+                weighted += sks * new_best
+                sks_total += sks
+        
+        ipk = round(weighted / sks_total, 2) if sks_total else 0.0
+        
+        semesters = []
+        for semester in sorted(semester_grades):
+            semesters.append({
+                'semester': semester,
+                'ips': self._project_ips(semester, semester_grades[semester])
+            })
+        
+        return {
+            'nim': self.nim,
+            'semesters': semesters,
+            'ipk': ipk,
+            'predicate': GradeCalculator.get_graduation_predicate(ipk),
+            'current_ipk': self.current_ipk,
+            'current_predicate': GradeCalculator.get_graduation_predicate(self.current_ipk)
+        }
+    
+    def simulate_many(self, scenarios: List[List[Dict]]) -> List[Dict]:
+        """Evaluate several independent scenarios against the same loaded state"""
+        return [self.simulate(scenario) for scenario in scenarios]
+    
+    def _project_ips(self, semester: int, changes: Dict[str, tuple]) -> float:
+        """IPS of a semester after replacing/adding the given (numeric, sks) grades"""
+        
+        weighted, sks_total = self._semester_totals.get(semester, (0.0, 0))
+        existing = self._semester_grades.get(semester, {})
+        
+        for course_code, (numeric_grade, sks) in changes.items():
+            old = existing.get(course_code)
+            if old is not None and GradeManager.is_passed(old):
+                weighted -= self._course_sks[course_code] * old
+                sks_total -= self._course_sks[course_code]
+            if GradeManager.is_passed(numeric_grade):
+                weighted += sks * numeric_grade
+                sks_total += sks
+        
+        return round(weighted / sks_total, 2) if sks_total else 0.0
+    
+    def _sks_for(self, course_code: str) -> int:
+        """SKS of a course, from the loaded grades or the course catalogue"""
+        
+        if course_code in self._course_sks:
+            return self._course_sks[course_code]
+        if course_code not in self._catalogue_sks:
+            course = get_storage().courses.get(course_code)
+            if course is None:
+                raise ValueError(f"Course {course_code} not found; provide 'sks'")
+            self._catalogue_sks[course_code] = course['sks']
+        return self._catalogue_sks[course_code]
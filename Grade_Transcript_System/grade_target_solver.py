@@ -0,0 +1,204 @@
+"""
+Grade Target Solver - Minimum grades on planned courses needed to reach each graduation predicate
+"""
+from grade_manager import GradeManager
+from grade_calculator import GradeCalculator
+from records import GradeRecord
+from grading_scale import GradingScale, GradingScaleRegistry
+from repositories import get_storage
+from functools import lru_cache, reduce
+from math import ceil, gcd
+from typing import Dict, List, Optional, Tuple
+
+
+class GradeTargetSolver:
+    """
+    For each predicate threshold, find the planned-course grades with the
+    smallest total grade points (Σ SKS × Nilai) that lift the IPK to it
+    
+    Planned courses must be passed, so every grade is at least D. A planned
+    course the student already passed can't drop below its current best
+    (repeated courses keep the highest grade).
+    
+    Instead of enumerating every grade combination, the reachable point totals
+    are built as a bitset, one course at a time over the grade lattice
+    (bit k set = k points reachable). Each threshold is then a scan for the
+    first reachable total that satisfies it, and the grades are recovered by
+    walking the per-course bitsets backwards. Bitsets depend only on the
+    planned courses' SKS and grade floors, so students with the same plan
+    share them.
+    """
+    
+    # Grade points are compared in hundredths so non-integer scales stay exact
+    SCALE = 100
+    
+    @staticmethod
+    def solve(nim: str, planned: List[Dict], records: Optional[List[GradeRecord]] = None,
+              scale: Optional[GradingScale] = None, catalogue: Optional[Dict[str, int]] = None) -> Dict:
+        """
+        Args:
+            nim: Student ID
+            planned: Rows with 'course_code' and optional 'sks' (default: catalogue SKS)
+            records: Already-loaded grade records (loaded from storage if omitted)
+            scale: The student's program scale (looked up if omitted)
+            catalogue: SKS per course code, filled in as courses are looked up
+        
+        Returns:
+            Dict: Current IPK and, per predicate, whether it's reachable and the
+                minimum grade per planned course
+        
+        Raises:
+            ValueError: If a course is planned twice or has no known SKS
+        """
+        
+        planned_codes = {row['course_code'] for row in planned}
+        if len(planned_codes) != len(planned):
+            raise ValueError("Each course may be planned only once")
+        
+        if records is None:
+            records = GradeManager.get_grade_records(nim)
+        
+        best = GradeCalculator._best_grades_by_course(records)
+        
+        # Earned points outside the planned courses
+        base_weighted = 0.0
+        base_sks = 0
+        for code, record in best.items():
+            if code not in planned_codes and GradeManager.is_passed(record.numeric_grade):
+                base_weighted += record.sks * record.numeric_grade
+                base_sks += record.sks
+        
+        # Grade lattice of the student's program scale
+        if scale is None:
+            scale = GradingScaleRegistry.get_scale_for_student(nim)
+        levels = sorted({numeric for _, numeric, _ in scale.entries if GradeManager.is_passed(numeric)})
+        courses = []
+        for row in planned:
+            code = row['course_code']
+            sks = int(row['sks']) if row.get('sks') is not None else GradeTargetSolver._catalogue_sks(code, best, catalogue)
+            floor = max(levels[0], best[code].numeric_grade) if code in best else levels[0]
+            courses.append((code, sks, [v for v in levels if v >= floor]))
+        
+        total_sks = base_sks + sum(sks for _, sks, _ in courses)
+        floor_weighted = base_weighted + sum(sks * options[0] for _, sks, options in courses)
+        
+        # Point increments above each course's floor, reduced by their common divisor
+        increments = [tuple(round(sks * (v - options[0]) * GradeTargetSolver.SCALE) for v in options)
+                      for _, sks, options in courses]
+        unit = reduce(gcd, (i for incs in increments for i in incs), 0) or 1
+        increments = tuple(tuple(i // unit for i in incs) for incs in increments)
+        prefixes = GradeTargetSolver._reachable(increments)
+        step = unit / GradeTargetSolver.SCALE
+        
+        current_ipk = GradeCalculator._ipk_from_records(records)
+        targets = []
+        
+        for predicate, threshold in GradeCalculator.PREDICATE_GRADES.items():
+            if threshold <= 0:
+                continue
+            
+            target = {'predicate': predicate, 'min_ipk': threshold, 'achievable': False,
+                      'projected_ipk': None, 'grades': None}
+            
+            if total_sks:
+                points = GradeTargetSolver._first_meeting(prefixes[-1], floor_weighted, total_sks,
+                                                          step, threshold)
+                if points is not None:
+                    chosen = GradeTargetSolver._recover(prefixes, increments, points)
+                    target['achievable'] = True
+                    target['projected_ipk'] = round((floor_weighted + points * step) / total_sks, 2)
+                    target['grades'] = [{
+                        'course_code': code,
+                        'sks': sks,
+                        'letter_grade': scale.letter_for_numeric(options[index])
+                    } for (code, sks, options), index in zip(courses, chosen)]
+            
+            targets.append(target)
+        
+        return {
+            'nim': nim,
+            'current_ipk': current_ipk,
+            'current_predicate': GradeCalculator.get_graduation_predicate(current_ipk),
+            'planned_sks': sum(sks for _, sks, _ in courses),
+            'targets': targets
+        }
+    
+    @staticmethod
+    def solve_cohort(plans: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+        """
+        Solve for many students; identical plans reuse the same reachability bitsets
+        
+        Students and their grades are loaded in one batch, and each planned
+        course's SKS is looked up once for the whole cohort.
+        """
+        
+        nims = list(plans)
+        students = get_storage().students.get_many(nims)
+        records = GradeManager.get_grade_records_for_students(nims)
+        catalogue = {}
+        return {nim: GradeTargetSolver.solve(
+            nim, planned, records.get(nim, []),
+            GradingScaleRegistry.get_scale(students[nim]['program_study'] if nim in students else None),
+            catalogue) for nim, planned in plans.items()}
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _reachable(increments: Tuple[Tuple[int, ...], ...]) -> Tuple[int, ...]:
+        """Bitsets of reachable point totals after each course (index 0 = no courses)"""
+        
+        prefixes = [1]
+        for options in increments:
+            reach = 0
+            for inc in options:
+                reach |= prefixes[-1] << inc
+            prefixes.append(reach)
+        return tuple(prefixes)
+    
+    @staticmethod
+    def _first_meeting(reach: int, floor_weighted: float, total_sks: int,
+                       step: float, threshold: float) -> Optional[int]:
+        """Smallest reachable total whose rounded IPK meets the threshold, or None"""
+        
+        # IPK is rounded to 2 decimals, so start just below the exact requirement
+        needed = ((threshold - 0.005) * total_sks - floor_weighted) / step
+        points = max(0, ceil(needed) - 1)
+        
+        while True:
+            remaining = reach >> points
+            if not remaining:
+                return None
+            points += (remaining & -remaining).bit_length() - 1
+            if round((floor_weighted + points * step) / total_sks, 2) >= threshold:
+                return points
+            points += 1
+    
+    @staticmethod
+    def _recover(prefixes: Tuple[int, ...], increments: Tuple[Tuple[int, ...], ...],
+                 points: int) -> List[int]:
+        """Walk the bitsets backwards to pick a grade index per course summing to points"""
+        
+        chosen = []
+        for course in range(len(increments) - 1, -1, -1):
+            for index, inc in enumerate(increments[course]):
+                if inc <= points and (prefixes[course] >> (points - inc)) & 1:
+                    chosen.append(index)
+                    points -= inc
+                    break
+        chosen.reverse()
+        return chosen
+    
+    @staticmethod
+    def _catalogue_sks(course_code: str, best: Dict[str, GradeRecord],
+                       catalogue: Optional[Dict[str, int]] = None) -> int:
+        """SKS of a planned course from the student's grades or the course catalogue"""
+        
+        if course_code in best:
+            return best[course_code].sks
+        if catalogue is not None and course_code in catalogue:
+            return catalogue[course_code]
+        course = get_storage().courses.get(course_code)
+        if course is None:
+            raise ValueError(f"Course {course_code} not found; provide 'sks'")
+        if catalogue is not None:
+            catalogue[course_code] = course['sks']
+        return course['sks']
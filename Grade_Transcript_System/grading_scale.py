@@ -0,0 +1,190 @@
+"""
+Grading Scales - Per-program letter grades and raw score conversion
+"""
+from bisect import bisect_right
+from threading import RLock
+from time import monotonic
+from typing import Dict, Iterable, List, Optional, Tuple
+from repositories import get_storage
+import database
+
+# Program key of the institution-wide scale used when a program has none
+DEFAULT_PROGRAM = '*'
+
+# Built-in scale (letter, numeric, minimum raw score) used until one is stored
+DEFAULT_SCALE = (
+    ('A', 4.0, 85.0),
+    ('B', 3.0, 70.0),
+    ('C', 2.0, 55.0),
+    ('D', 1.0, 40.0),
+    ('E', 0.0, 0.0),
+)
+
+
+class GradingScale:
+    """
+    One program's scale compiled into lookup tables
+    
+    Letters map to numeric grades through dicts, and raw scores map to
+    letters by bisecting the sorted minimum scores, so converting a score is
+    O(log letters) with no database access.
+    """
+    
+    def __init__(self, program_study: str, entries: Iterable[Tuple[str, float, float]]):
+        entries = sorted(entries, key=lambda entry: entry[2])
+        if not entries:
+            raise ValueError("A grading scale needs at least one letter grade")
+        if entries[0][2] > 0:
+            raise ValueError("The lowest letter grade must start at score 0")
+        if len({entry[2] for entry in entries}) != len(entries):
+            raise ValueError("Letter grades must have distinct minimum scores")
+        if len({entry[0] for entry in entries}) != len(entries):
+            raise ValueError("Each letter grade may appear only once")
+        
+        self.program_study = program_study
+        self.entries = tuple(reversed(entries))  # Best letter first
+        self.letters = tuple(letter for letter, _, _ in self.entries)
+        self._numeric = {letter: numeric for letter, numeric, _ in entries}
+        self._letter = {}
+        for letter, numeric, _ in entries:
+            self._letter[numeric] = letter  # Highest-scoring letter wins a shared value
+        self._thresholds = [min_score for _, _, min_score in entries]
+        self._threshold_letters = [letter for letter, _, _ in entries]
+        self.lowest_letter = entries[0][0]
+    
+    def is_valid(self, letter_grade: str) -> bool:
+        return letter_grade in self._numeric
+    
+    def numeric(self, letter_grade: str, default: float = 0.0) -> float:
+        """Numeric value of a letter grade"""
+        return self._numeric.get(letter_grade, default)
+    
+    def letter_for_numeric(self, numeric_grade: float) -> str:
+        """Letter grade with exactly this numeric value (lowest letter if none)"""
+        return self._letter.get(numeric_grade, self.lowest_letter)
+    
+    def letter_for_score(self, score: float) -> str:
+        """Letter grade for a raw 0-100 score"""
+        if not (0 <= score <= 100):
+            raise ValueError(f"Nilai mentah {score} harus antara 0-100.")
+        return self._threshold_letters[bisect_right(self._thresholds, score) - 1]
+    
+    def convert_scores(self, scores: Iterable[float]) -> List[str]:
+        """letter_for_score over many scores, with the lookups bound once"""
+        thresholds = self._thresholds
+        letters = self._threshold_letters
+        result = []
+        append = result.append
+        for score in scores:
+            if not (0 <= score <= 100):
+                raise ValueError(f"Nilai mentah {score} harus antara 0-100.")
+            append(letters[bisect_right(thresholds, score) - 1])
+        return result
+    
+    def describe_letters(self) -> str:
+        """Letters for messages, e.g. 'A, B, C, D, atau E'"""
+        if len(self.letters) == 1:
+            return self.letters[0]
+        return f"{', '.join(self.letters[:-1])}, atau {self.letters[-1]}"
+    
+    def to_dict(self) -> Dict:
+        return {
+            'program_study': self.program_study,
+            'entries': [{'letter_grade': letter, 'numeric_grade': numeric, 'min_score': min_score}
+                        for letter, numeric, min_score in self.entries]
+        }
+
+
+class GradingScaleRegistry:
+    """
+    Compiled scales per program, cached in memory
+    
+    A program without its own scale uses the stored default ('*'), or the
+    built-in A-E scale. The cache is dropped when a scale is changed through
+    set_scale(), and every VERSION_CHECK_INTERVAL seconds the stored version
+    counter is compared so other workers' changes are picked up too.
+    """
+    
+    VERSION_CHECK_INTERVAL = 1.0
+    
+    _lock = RLock()
+    _scales: Optional[Dict[str, GradingScale]] = None
+    _source = None
+    _version = None
+    _checked_at = 0.0
+    
+    @staticmethod
+    def get_scale(program_study: Optional[str] = None) -> GradingScale:
+        """Scale for a program study (the default scale if None or not configured)"""
+        
+        scales = GradingScaleRegistry._load()
+        if program_study in scales:
+            return scales[program_study]
+        return scales[DEFAULT_PROGRAM]
+    
+    @staticmethod
+    def get_scale_for_student(nim: str) -> GradingScale:
+        """Scale of the student's program study"""
+        student = get_storage().students.get(nim)
+        return GradingScaleRegistry.get_scale(student['program_study'] if student else None)
+    
+    @staticmethod
+    def set_scale(program_study: str, entries: Iterable[Tuple[str, float, float]]) -> GradingScale:
+        """
+        Store a program's scale as (letter, numeric, min_score) entries
+        
+        Raises:
+            ValueError: If the entries don't form a usable scale
+        """
+        
+        scale = GradingScale(program_study, entries)  # Validate before storing
+        get_storage().scales.replace(program_study, scale.entries)
+        GradingScaleRegistry.invalidate()
+        return scale
+    
+    @staticmethod
+    def remove_scale(program_study: str) -> None:
+        """Drop a program's own scale so it falls back to the default"""
+        get_storage().scales.replace(program_study, ())
+        GradingScaleRegistry.invalidate()
+    
+    @staticmethod
+    def list_scales() -> List[GradingScale]:
+        """Every configured scale, default first"""
+        scales = GradingScaleRegistry._load()
+        return [scales[DEFAULT_PROGRAM]] + [scales[p] for p in sorted(scales) if p != DEFAULT_PROGRAM]
+    
+    @staticmethod
+    def invalidate() -> None:
+        """Forget the compiled scales; the next lookup reloads them"""
+        with GradingScaleRegistry._lock:
+            GradingScaleRegistry._scales = None
+    
+    @staticmethod
+    def _load() -> Dict[str, GradingScale]:
+        cls = GradingScaleRegistry
+        storage = get_storage()
+        source = (storage, database.DATABASE_FILE)  # A switched database has its own scales
+        
+        with cls._lock:
+            if cls._scales is not None and cls._source == source:
+                if monotonic() - cls._checked_at < cls.VERSION_CHECK_INTERVAL:
+                    return cls._scales
+                cls._checked_at = monotonic()
+                if storage.scales.version() == cls._version:
+                    return cls._scales
+            
+            version = storage.scales.version()
+            entries_by_program = {}
+            for program_study, letter, numeric, min_score in storage.scales.list_entries():
+                entries_by_program.setdefault(program_study, []).append((letter, numeric, min_score))
+            
+            scales = {program_study: GradingScale(program_study, entries)
+                      for program_study, entries in entries_by_program.items()}
+            scales.setdefault(DEFAULT_PROGRAM, GradingScale(DEFAULT_PROGRAM, DEFAULT_SCALE))
+            
+            cls._scales = scales
+            cls._source = source
+            cls._version = version
+            cls._checked_at = monotonic()
+            return scales
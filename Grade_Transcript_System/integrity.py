@@ -0,0 +1,263 @@
+"""
+Integrity - Online checks of grades, the audit trail and derived results, in full or from the change log
+"""
+import hashlib
+import time
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from academic_standing import AcademicStanding
+from change_log import ChangeLog
+from database import for_each_shard
+from grade_manager import GradeManager
+from grading_scale import GradingScaleRegistry
+from repositories import get_storage
+
+# Issue kinds, in report order
+ORPHANED_GRADE = 'orphaned_grade'        # Grade of an unknown student or course
+GRADE_MISMATCH = 'grade_mismatch'        # Letter not in the program's scale, or numeric not the letter's value
+ORPHANED_HISTORY = 'orphaned_history'    # Audit row whose grade no longer exists
+STANDING_DRIFT = 'standing_drift'        # Stored standing figures differ from the grades
+SNAPSHOT_CORRUPT = 'snapshot_corrupt'    # Snapshot content doesn't match its hash
+CHECKS = (ORPHANED_GRADE, GRADE_MISMATCH, ORPHANED_HISTORY, STANDING_DRIFT, SNAPSHOT_CORRUPT)
+
+# Change log consumer used by incremental checks
+DEFAULT_CONSUMER = 'integrity-checker'
+
+
+class _Findings:
+    """Counts and (up to max_issues) issues found by one check run or shard"""
+    
+    def __init__(self, max_issues: int):
+        self.max_issues = max_issues
+        self.checked = {'grades': 0, 'history': 0, 'standings': 0, 'snapshots': 0, 'changes': 0}
+        self.counts = {check: 0 for check in CHECKS}
+        self.issues = []
+        self.nims = set()  # Students whose grades changed (incremental runs)
+    
+    def add(self, check: str, detail: str, **key) -> None:
+        self.counts[check] += 1
+        if len(self.issues) < self.max_issues:
+            self.issues.append(dict(check=check, **key, detail=detail))
+    
+    def merge(self, other: '_Findings') -> None:
+        for table, count in other.checked.items():
+            self.checked[table] += count
+        for check, count in other.counts.items():
+            self.counts[check] += count
+        self.issues.extend(other.issues[:self.max_issues - len(self.issues)])
+        self.nims |= other.nims
+    
+    def report(self, mode: str, started: float) -> Dict:
+        return {
+            'mode': mode,
+            'ok': not any(self.counts.values()),
+            'checked': self.checked,
+            'counts': self.counts,
+            'issues': sorted(self.issues, key=lambda issue: CHECKS.index(issue['check'])),
+            'truncated': sum(self.counts.values()) > len(self.issues),
+            'seconds': round(time.monotonic() - started, 3)
+        }
+
+
+class IntegrityChecker:
+    """
+    Find data the schema doesn't prevent: foreign keys are not enforced,
+    so nothing stops a grade for an unknown student or course
+    
+    Every table is read in keyset pages of chunk_size rows, and the grades
+    behind stored standings chunk_size students at a time, each its own
+    short read, so a check runs against the live database without holding
+    a snapshot open: writers never wait for it, and with a pause between
+    pages it leaves the disk to grade entry. Grade tables are checked on
+    every shard in parallel.
+    
+    scan() checks everything. scan_changes() re-checks only the grades
+    written since its last run, read from the change log as the consumer
+    DEFAULT_CONSUMER, and commits the offset after each batch; run it often
+    (cron) and scan() rarely.
+    
+    Stored academic standings are compared with figures recomputed from the
+    grades, so a grade changed after the last evaluation also shows as
+    standing drift until AcademicStanding.evaluate_all() runs again.
+    """
+    
+    def __init__(self, chunk_size: int = 1000, pause: float = 0.0, max_issues: int = 1000):
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.max_issues = max_issues
+    
+    def scan(self) -> Dict:
+        """
+        Check every grade, audit row, stored standing and transcript snapshot
+        
+        Returns:
+            Dict: mode, ok, checked (rows per table), counts (per check),
+                issues (check, key columns and detail), truncated, seconds
+        """
+        
+        started = time.monotonic()
+        findings = _Findings(self.max_issues)
+        for shard_findings in for_each_shard(self._scan_grade_tables):
+            findings.merge(shard_findings)
+        self._check_standings(findings)
+        self._check_snapshots(findings)
+        return findings.report('full', started)
+    
+    def scan_changes(self, consumer: str = DEFAULT_CONSUMER) -> Dict:
+        """
+        Check the grades changed since this consumer's last run, their audit
+        rows and their students' stored standings
+        
+        Returns:
+            Dict: As scan(), with mode 'incremental'
+        """
+        
+        started = time.monotonic()
+        findings = _Findings(self.max_issues)
+        for shard_findings in for_each_shard(self._scan_shard_changes, consumer):
+            findings.merge(shard_findings)
+        self._check_standings(findings, sorted(findings.nims))
+        return findings.report('incremental', started)
+    
+    # ===================== GRADE TABLES (per shard) =====================
+    
+    def _scan_grade_tables(self) -> _Findings:
+        storage = get_storage()
+        findings = _Findings(self.max_issues)
+        for grade in self._pages(storage.grades.scan, 'grade_id'):
+            self._check_grade(grade, findings)
+        for entry in self._pages(storage.history.scan, 'history_id'):
+            self._check_history(entry, findings)
+        return findings
+    
+    def _scan_shard_changes(self, consumer: str) -> _Findings:
+        storage = get_storage()
+        findings = _Findings(self.max_issues)
+        while True:
+            batch = ChangeLog.poll(consumer, self.chunk_size)
+            changes = batch['changes']
+            if not changes:
+                break
+            
+            written = {c['grade_id'] for c in changes if c['operation'] != 'delete'}
+            deleted = {c['grade_id'] for c in changes if c['operation'] == 'delete'}
+            for grade in self._pages(storage.grades.scan, 'grade_id', written):
+                self._check_grade(grade, findings)
+            for entry in self._pages(storage.history.scan, 'history_id', deleted):
+                self._check_history(entry, findings)
+            findings.checked['changes'] += len(changes)
+            findings.nims.update(c['nim'] for c in changes)
+            
+            ChangeLog.commit(consumer, batch['next_offset'])
+            if not batch['has_more']:
+                break
+            self._rest()
+        return findings
+    
+    @staticmethod
+    def _check_grade(grade: dict, findings: _Findings) -> None:
+        findings.checked['grades'] += 1
+        key = {'grade_id': grade['grade_id'], 'nim': grade['nim'], 'course_code': grade['course_code'],
+               'semester': grade['semester']}
+        
+        if grade['program_study'] is None:
+            findings.add(ORPHANED_GRADE, f"Mahasiswa {grade['nim']} tidak terdaftar", **key)
+        if not grade['course_exists']:
+            findings.add(ORPHANED_GRADE, f"Mata kuliah {grade['course_code']} tidak terdaftar", **key)
+        
+        # Programs without their own scale use the default (grading_scale.DEFAULT_SCALE unless stored)
+        scale = GradingScaleRegistry.get_scale(grade['program_study'])
+        letter, numeric = grade['letter_grade'], grade['numeric_grade']
+        if not scale.is_valid(letter):
+            findings.add(GRADE_MISMATCH, f"Nilai huruf {letter} tidak ada di skala {scale.program_study}",
+                         **key)
+        elif numeric is None or abs(numeric - scale.numeric(letter)) > 1e-9:
+            findings.add(GRADE_MISMATCH, f"Nilai {letter} tercatat {numeric}, seharusnya "
+                                         f"{scale.numeric(letter)}", **key)
+    
+    @staticmethod
+    def _check_history(entry: dict, findings: _Findings) -> None:
+        findings.checked['history'] += 1
+        if not entry['grade_exists']:
+            findings.add(ORPHANED_HISTORY, f"Nilai {entry['grade_id']} tidak ada lagi",
+                         history_id=entry['history_id'], grade_id=entry['grade_id'])
+    
+    # ===================== DERIVED RESULTS (main database) =====================
+    
+    def _check_standings(self, findings: _Findings, nims: Optional[List[str]] = None) -> None:
+        """Compare stored standings with the grades (every student, or only nims), chunk_size students per read"""
+        
+        standings = get_storage().standings
+        if nims is None:
+            current = standings.list_current()
+        else:
+            current = {}
+            for nim in nims:
+                stored = standings.get(nim)
+                if stored is not None:
+                    current[nim] = stored
+        
+        ordered = sorted(current)
+        for start in range(0, len(ordered), self.chunk_size):
+            if start:
+                self._rest()
+            page = ordered[start:start + self.chunk_size]
+            records = GradeManager.get_grade_records_for_students(page)
+            for nim in page:
+                self._compare_standing(current[nim], records.get(nim, []), findings)
+    
+    @staticmethod
+    def _compare_standing(stored: dict, records: list, findings: _Findings) -> None:
+        findings.checked['standings'] += 1
+        summary = AcademicStanding.summarize(records)
+        computed = {'ips': summary['ips'], 'ipk': summary['ipk'], 'failed_courses': len(summary['failed']),
+                    'last_semester': summary['last_semester']}
+        drifted = [field for field, value in computed.items() if not _same(stored[field], value)]
+        if drifted:
+            findings.add(STANDING_DRIFT, ", ".join(
+                f"{field} tersimpan {stored[field]}, dihitung {computed[field]}" for field in drifted)
+                + f" (dievaluasi {stored['evaluated_at']})", nim=stored['nim'])
+    
+    def _check_snapshots(self, findings: _Findings) -> None:
+        for snapshot in self._pages(get_storage().snapshots.scan, 'snapshot_id'):
+            findings.checked['snapshots'] += 1
+            key = {'snapshot_id': snapshot['snapshot_id'], 'nim': snapshot['nim'],
+                   'version': snapshot['version']}
+            try:
+                content_hash = hashlib.sha256(zlib.decompress(snapshot['content'])).hexdigest()
+            except zlib.error as e:
+                findings.add(SNAPSHOT_CORRUPT, f"Isi snapshot tidak dapat dibaca: {e}", **key)
+                continue
+            if content_hash != snapshot['content_hash']:
+                findings.add(SNAPSHOT_CORRUPT, "Hash isi snapshot tidak cocok", **key)
+    
+    # ===================== PAGING =====================
+    
+    def _pages(self, fetch: Callable[..., List[dict]], id_field: str,
+               ids: Optional[Iterable[int]] = None) -> Iterator[dict]:
+        """Rows of fetch(after_id, limit[, ids]) page by page, resting between pages"""
+        
+        if ids is not None:
+            ids = list(ids)
+            if not ids:
+                return
+        after = 0
+        while True:
+            rows = fetch(after, self.chunk_size) if ids is None else fetch(after, self.chunk_size, ids)
+            yield from rows
+            if len(rows) < self.chunk_size:
+                return
+            after = rows[-1][id_field]
+            self._rest()
+    
+    def _rest(self) -> None:
+        if self.pause > 0:
+            time.sleep(self.pause)
+
+
+def _same(stored, computed) -> bool:
+    if stored is None or computed is None:
+        return stored is None and computed is None
+    if isinstance(computed, float):
+        return abs(float(stored) - computed) < 1e-6
+    return stored == computed
@@ -0,0 +1,202 @@
+"""
+Cohort Ranking - IPK rank and percentile within program study and batch year
+"""
+from bisect import bisect_left, bisect_right, insort
+from itertools import count, groupby
+from threading import RLock
+from typing import Dict, List, Optional, Tuple
+from change_log import ChangeLog
+from grade_manager import GradeManager
+from grade_calculator import GradeCalculator
+from repositories import get_storage
+
+# Sorts after any NIM, for finding the end of a run of equal IPKs
+_LAST_NIM = chr(0x10FFFF)
+
+
+class CohortRankingIndex:
+    """
+    Sorted IPK index per cohort (program_study, batch_year)
+    
+    Each cohort keeps a list of (-ipk, nim) in ascending order, so the best
+    IPK comes first and rank, top-K and percentile are bisect lookups. Every
+    registered student is ranked, those without grades at IPK 0.
+    
+    The index lives in this process's memory, so it follows the grade change
+    log rather than local writes: before answering, a query reads the changes
+    logged since the index last looked (by any worker or process) and
+    recomputes and moves only those students, plus any students registered
+    since. Every worker's index therefore reflects every committed grade,
+    and rankings never need to be rebuilt from scratch.
+    
+    The log and the grades are read without holding the index lock, which
+    only guards moving entries, so lookups never queue behind database I/O.
+    Each recomputation takes a ticket before it reads, and a result is
+    dropped if a later-ticketed one for the same student was already
+    applied: concurrent updates can't bring back older grades.
+    """
+    
+    def __init__(self):
+        self._cohorts: Dict[Tuple[str, int], List[Tuple[float, str]]] = {}
+        self._entries: Dict[str, Tuple[Tuple[str, int], float]] = {}
+        self._lock = RLock()
+        self._built = False
+        self._offset = 0  # Change log offset the index reflects
+        self._tickets = count()
+        self._applied: Dict[str, int] = {}  # Ticket of each student's entry
+        self._build_ticket = 0
+    
+    def build(self) -> None:
+        """Load every student and compute their IPK in a single pass over all grades"""
+        
+        # Changes logged while the grades are read are applied again by catch_up()
+        offset = ChangeLog.latest_offset()
+        ticket = next(self._tickets)
+        ipks = {}
+        for nim, records in groupby(GradeManager.iter_all_grade_records(), key=lambda r: r.nim):
+            ipks[nim] = GradeCalculator._ipk_from_records(list(records))
+        
+        cohorts = {}
+        entries = {}
+        for student in get_storage().students.list_all():
+            cohort = (student['program_study'], student['batch_year'])
+            ipk = ipks.get(student['nim'], 0.0)
+            cohorts.setdefault(cohort, []).append((-ipk, student['nim']))
+            entries[student['nim']] = (cohort, ipk)
+        
+        for ranking in cohorts.values():
+            ranking.sort()
+        
+        with self._lock:
+            self._cohorts = cohorts
+            self._entries = entries
+            self._offset = offset
+            self._applied = {}
+            self._build_ticket = ticket
+            self._built = True
+    
+    def ensure_built(self) -> None:
+        """Build the index on first use, then apply the changes logged since"""
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build()
+        self.catch_up()
+    
+    def catch_up(self) -> int:
+        """
+        Update the students whose grades changed, and add the students
+        registered, since the index last read the change log
+        
+        Returns:
+            int: Number of students updated
+        """
+        
+        with self._lock:
+            if not self._built:
+                return 0
+            offset = self._offset
+            indexed = len(self._entries)
+        
+        nims = set()
+        next_offset = offset
+        while True:
+            batch = ChangeLog.read(next_offset)
+            nims.update(change['nim'] for change in batch['changes'])
+            next_offset = batch['next_offset']
+            if not batch['has_more']:
+                break
+        
+        students = get_storage().students
+        if students.count() != indexed:
+            registered = [student['nim'] for student in students.list_all()]
+            with self._lock:
+                nims.update(nim for nim in registered if nim not in self._entries)
+        
+        self._refresh(nims)
+        with self._lock:
+            # A concurrent catch-up that got further keeps its offset
+            if self._offset == offset:
+                self._offset = next_offset
+        return len(nims)
+    
+    def update(self, nim: str) -> None:
+        """Recompute one student's IPK and move them to their new position"""
+        if self._built:  # Otherwise built lazily with current data on first query
+            self._refresh([nim])
+    
+    def _refresh(self, nims) -> None:
+        """Recompute students' IPKs from one batch read, then move them under the lock"""
+        
+        if not nims:
+            return
+        ticket = next(self._tickets)
+        nims = sorted(nims)
+        students = get_storage().students.get_many(nims)
+        records = GradeManager.get_grade_records_for_students(nims)
+        ipks = {nim: GradeCalculator._ipk_from_records(records.get(nim, [])) for nim in nims}
+        
+        with self._lock:
+            for nim in nims:
+                if ticket < max(self._applied.get(nim, 0), self._build_ticket):
+                    continue  # Read before data already applied
+                self._applied[nim] = ticket
+                self._remove(nim)
+                student = students.get(nim)
+                if student is None:
+                    continue
+                cohort = (student['program_study'], student['batch_year'])
+                insort(self._cohorts.setdefault(cohort, []), (-ipks[nim], nim))
+                self._entries[nim] = (cohort, ipks[nim])
+    
+    def top(self, program_study: str, batch_year: int, k: int = 10) -> List[Dict]:
+        """Best k students of a cohort (ties share a rank)"""
+        
+        self.ensure_built()
+        with self._lock:
+            ranking = self._cohorts.get((program_study, batch_year), [])
+            result = []
+            for neg_ipk, nim in ranking[:max(k, 0)]:
+                result.append({
+                    'nim': nim,
+                    'ipk': -neg_ipk,
+                    'rank': bisect_left(ranking, (neg_ipk,)) + 1
+                })
+            return result
+    
+    def rank_of(self, nim: str) -> Optional[Dict]:
+        """Rank and percentile of a student within their cohort, or None if unknown"""
+        
+        self.ensure_built()
+        with self._lock:
+            entry = self._entries.get(nim)
+            if entry is None:
+                return None
+            
+            cohort, ipk = entry
+            ranking = self._cohorts[cohort]
+            total = len(ranking)
+            better = bisect_left(ranking, (-ipk,))
+            equal = bisect_right(ranking, (-ipk, _LAST_NIM)) - better
+            below = total - better - equal
+            
+            return {
+                'nim': nim,
+                'program_study': cohort[0],
+                'batch_year': cohort[1],
+                'ipk': ipk,
+                'rank': better + 1,
+                'cohort_size': total,
+                # Percentile rank: share below, counting ties as half
+                'percentile': round((below + 0.5 * equal) / total * 100, 2)
+            }
+    
+    def _remove(self, nim: str) -> None:
+        entry = self._entries.pop(nim, None)
+        if entry is None:
+            return
+        cohort, ipk = entry
+        ranking = self._cohorts[cohort]
+        position = bisect_left(ranking, (-ipk, nim))
+        if position < len(ranking) and ranking[position] == (-ipk, nim):
+            del ranking[position]
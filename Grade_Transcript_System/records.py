@@ -0,0 +1,49 @@
+"""
+Grade Records - Compact in-memory representation of grade rows
+"""
+from typing import Optional
+
+
+class GradeRecord:
+    """
+    One grade joined with its course, holding only what calculations and
+    transcripts need (no timestamps). __slots__ keeps per-row memory small
+    when whole cohorts are loaded; convert with to_dict() at the JSON boundary.
+    """
+    
+    __slots__ = ('grade_id', 'nim', 'course_code', 'course_name', 'semester',
+                 'letter_grade', 'numeric_grade', 'sks', 'presence_percentage')
+    
+    # Column order used by repositories when selecting rows for GradeRecord(*row)
+    COLUMNS = __slots__
+    
+    def __init__(self, grade_id: Optional[int], nim: str, course_code: str, course_name: str,
+                 semester: int, letter_grade: str, numeric_grade: float, sks: int,
+                 presence_percentage: float = 75.0):
+        self.grade_id = grade_id
+        self.nim = nim
+        self.course_code = course_code
+        self.course_name = course_name
+        self.semester = semester
+        self.letter_grade = letter_grade
+        self.numeric_grade = numeric_grade
+        self.sks = sks
+        self.presence_percentage = presence_percentage
+    
+    @classmethod
+    def from_dict(cls, row: dict) -> 'GradeRecord':
+        """Build a record from a joined grade row (extra keys are ignored)"""
+        return cls(*(row.get(column) for column in cls.COLUMNS))
+    
+    def to_dict(self) -> dict:
+        """Plain dict for JSON responses"""
+        return {column: getattr(self, column) for column in self.__slots__}
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, GradeRecord):
+            return NotImplemented
+        return all(getattr(self, column) == getattr(other, column) for column in self.__slots__)
+    
+    def __repr__(self) -> str:
+        return (f"GradeRecord({self.nim!r}, {self.course_code!r}, semester={self.semester}, "
+                f"{self.letter_grade!r}, sks={self.sks})")
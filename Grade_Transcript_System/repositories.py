@@ -0,0 +1,1509 @@
+"""
+Storage Repositories - Data access for students, courses, grades, grade history,
+grading scales, assessment components, curricula, academic standing,
+transcript snapshots and the grade change log
+
+Business logic talks to the repository interfaces through get_storage().
+SQLiteStorage is the default; InMemoryStorage holds preloaded data for tests
+and benchmarks so calculators and generators run without touching disk.
+"""
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from database import get_connection, get_read_connection
+from records import GradeRecord
+
+
+class StudentRepository(ABC):
+    """Student records"""
+    
+    @abstractmethod
+    def get(self, nim: str) -> Optional[dict]:
+        """Get one student, or None"""
+    
+    @abstractmethod
+    def get_many(self, nims: Iterable[str]) -> Dict[str, dict]:
+        """Get several students in one lookup, keyed by NIM (unknown NIMs are left out)"""
+    
+    @abstractmethod
+    def list_all(self) -> List[dict]:
+        """Get all students ordered by NIM"""
+    
+    @abstractmethod
+    def count(self) -> int:
+        """Number of students"""
+    
+    @abstractmethod
+    def add_many(self, students: Iterable[Tuple[str, str, str, int]]) -> None:
+        """Add (nim, name, program_study, batch_year) rows"""
+
+
+class CourseRepository(ABC):
+    """Course catalogue"""
+    
+    @abstractmethod
+    def get(self, course_code: str) -> Optional[dict]:
+        """Get one course, or None"""
+    
+    @abstractmethod
+    def list_all(self) -> List[dict]:
+        """Get all courses ordered by course code"""
+    
+    @abstractmethod
+    def add_many(self, courses: Iterable[Tuple[str, str, int]]) -> None:
+        """Add (course_code, course_name, sks) rows"""
+
+
+class GradeRepository(ABC):
+    """Grades joined with their course SKS and name"""
+    
+    @abstractmethod
+    def find(self, nim: str, course_code: str, semester: int) -> Optional[dict]:
+        """Get one grade, or None"""
+    
+    @abstractmethod
+    def list_for_student(self, nim: str, semester: Optional[int] = None) -> List[dict]:
+        """Get a student's grades ordered by semester and course code"""
+    
+    @abstractmethod
+    def list_records_for_student(self, nim: str, semester: Optional[int] = None,
+                                 after_semester: Optional[int] = None) -> List[GradeRecord]:
+        """Same rows as list_for_student, as compact GradeRecords (optionally only semesters > after_semester)"""
+    
+    @abstractmethod
+    def list_records_for_students(self, nims: Iterable[str]) -> Dict[str, List[GradeRecord]]:
+        """Grade records of several students in one lookup, keyed by NIM (students without grades are left out)"""
+    
+    @abstractmethod
+    def iter_all_records(self) -> Iterator[GradeRecord]:
+        """Stream all grade records ordered by NIM, semester and course code"""
+    
+    @abstractmethod
+    def save(self, nim: str, course_code: str, semester: int, letter_grade: str,
+             numeric_grade: float, presence_percentage: float) -> bool:
+        """
+        Insert a grade, or update it and record the change in the audit trail
+        
+        Returns:
+            bool: True if an existing grade was updated
+        """
+    
+    @abstractmethod
+    def save_many(self, grades: Iterable[Tuple[str, str, int, str, float, float]]) -> List[bool]:
+        """
+        save() for many (nim, course_code, semester, letter, numeric, presence)
+        rows as one transaction: either every row is stored or none is
+        
+        Returns:
+            List[bool]: Per row, True if an existing grade was updated
+        """
+    
+    @abstractmethod
+    def save_each(self, grades: Iterable[Tuple[str, str, int, str, float, float]]) -> List[Union[bool, Exception]]:
+        """
+        save() for many rows in one transaction, each succeeding or failing
+        on its own (group commit of independent submissions)
+        
+        Returns:
+            List: Per row, True/False as for save(), or the exception that
+                kept that row from being stored
+        """
+    
+    @abstractmethod
+    def add_many(self, grades: Iterable[Tuple[str, str, int, str, float, float]]) -> None:
+        """Bulk insert (nim, course_code, semester, letter, numeric, presence) rows"""
+    
+    @abstractmethod
+    def scan(self, after_grade_id: int, limit: int,
+             grade_ids: Optional[Iterable[int]] = None) -> List[dict]:
+        """
+        Get up to limit grade rows with grade_id > after_grade_id (optionally
+        only the given ids), oldest first, without requiring the student or
+        course to exist: each row has program_study (None if the student is
+        missing) and course_exists
+        """
+
+
+class HistoryRepository(ABC):
+    """Grade change audit trail"""
+    
+    @abstractmethod
+    def list_for_student(self, nim: str) -> List[dict]:
+        """Get a student's grade changes, newest first"""
+    
+    @abstractmethod
+    def scan(self, after_history_id: int, limit: int,
+             grade_ids: Optional[Iterable[int]] = None) -> List[dict]:
+        """
+        Get up to limit (history_id, grade_id, changed_at, grade_exists) rows
+        with history_id > after_history_id (optionally only for the given
+        grades), oldest first
+        """
+
+
+class GradingScaleRepository(ABC):
+    """Letter grade scales per program study"""
+    
+    @abstractmethod
+    def list_entries(self) -> List[Tuple[str, str, float, float]]:
+        """Get every (program_study, letter, numeric, min_score) entry"""
+    
+    @abstractmethod
+    def replace(self, program_study: str, entries: Iterable[Tuple[str, float, float]]) -> None:
+        """Replace a program's scale with (letter, numeric, min_score) entries (empty = remove it)"""
+    
+    @abstractmethod
+    def version(self) -> int:
+        """Counter that changes whenever any scale changes"""
+
+
+class ComponentRepository(ABC):
+    """Assessment component weights and raw component scores"""
+    
+    @abstractmethod
+    def get_weights(self, course_code: str) -> Dict[str, float]:
+        """Get a course's {component: weight}"""
+    
+    @abstractmethod
+    def set_weights(self, course_code: str, weights: Dict[str, float]) -> None:
+        """Replace a course's component weights"""
+    
+    @abstractmethod
+    def save_scores(self, course_code: str, semester: int,
+                    scores: Iterable[Tuple[str, str, float]]) -> None:
+        """Insert or overwrite (nim, component, score) rows of one class in one transaction"""
+    
+    @abstractmethod
+    def list_scores(self, course_code: str, semester: int) -> List[Tuple[str, str, float]]:
+        """Get every (nim, component, score) of one class ordered by NIM"""
+
+
+class CurriculumRepository(ABC):
+    """Curriculum courses and prerequisites per program study"""
+    
+    @abstractmethod
+    def get(self, program_study: str) -> Optional[dict]:
+        """
+        Get a program's curriculum, or None
+        
+        Returns:
+            dict: graduation_sks, courses as (course_code, semester, required)
+                and prerequisites as (course_code, prerequisite_code)
+        """
+    
+    @abstractmethod
+    def replace(self, program_study: str, graduation_sks: int,
+                courses: Iterable[Tuple[str, Optional[int], bool]],
+                prerequisites: Iterable[Tuple[str, str]]) -> None:
+        """Replace a program's whole curriculum in one transaction"""
+
+
+class StandingRepository(ABC):
+    """Academic standing per student and its change history"""
+    
+    @abstractmethod
+    def get(self, nim: str) -> Optional[dict]:
+        """Get a student's latest standing, or None"""
+    
+    @abstractmethod
+    def list_current(self) -> Dict[str, dict]:
+        """Get every student's latest standing, keyed by NIM"""
+    
+    @abstractmethod
+    def save_evaluation(self, standings: Iterable[dict], changes: Iterable[dict]) -> None:
+        """
+        Store an evaluation run in one transaction
+        
+        Args:
+            standings: Rows (nim, standing, reasons, ips, ipk, failed_courses,
+                last_semester) replacing each student's current standing
+            changes: Rows (nim, old_standing, new_standing, reasons) for the history
+        """
+    
+    @abstractmethod
+    def list_history(self, nim: str) -> List[dict]:
+        """Get a student's standing changes, newest first"""
+
+
+class TranscriptSnapshotRepository(ABC):
+    """Immutable, versioned transcript snapshots (compressed content plus its hash)"""
+    
+    @abstractmethod
+    def latest(self, nim: str) -> Optional[dict]:
+        """Get a student's newest snapshot row (with content), or None"""
+    
+    @abstractmethod
+    def get(self, nim: str, version: int) -> Optional[dict]:
+        """Get one snapshot version (with content), or None"""
+    
+    @abstractmethod
+    def list_versions(self, nim: str) -> List[dict]:
+        """Get a student's snapshot versions without content, newest first"""
+    
+    @abstractmethod
+    def find_by_hash(self, content_hash: str) -> Optional[dict]:
+        """Get the newest snapshot (with content) with this content hash, or None"""
+    
+    @abstractmethod
+    def latest_hashes(self) -> Dict[str, Tuple[int, str]]:
+        """Get (closed_semester, content_hash) of every student's newest snapshot"""
+    
+    @abstractmethod
+    def scan(self, after_snapshot_id: int, limit: int) -> List[dict]:
+        """Get up to limit snapshot rows (with content) with snapshot_id > after_snapshot_id, oldest first"""
+    
+    @abstractmethod
+    def add_many(self, snapshots: Iterable[Tuple[str, int, str, bytes]]) -> int:
+        """
+        Append (nim, closed_semester, content_hash, content) snapshots in one
+        transaction, each as the student's next version
+        
+        Returns:
+            int: Number of snapshots stored
+        """
+
+
+class ChangeLogRepository(ABC):
+    """Change-data-capture log of grade writes and per-consumer read offsets"""
+    
+    @abstractmethod
+    def list_since(self, after_change_id: int, limit: int) -> List[dict]:
+        """Get up to limit changes with change_id > after_change_id, oldest first"""
+    
+    @abstractmethod
+    def latest_id(self) -> int:
+        """Get the newest change_id (0 if the log is empty)"""
+    
+    @abstractmethod
+    def get_offset(self, consumer: str) -> Optional[int]:
+        """Get a consumer's last processed change_id, or None if it never committed"""
+    
+    @abstractmethod
+    def set_offset(self, consumer: str, change_id: int) -> None:
+        """Store a consumer's last processed change_id"""
+    
+    @abstractmethod
+    def list_consumers(self) -> List[dict]:
+        """Get every consumer with its last_change_id and updated_at"""
+
+
+class Storage:
+    """Bundle of the repositories the business logic needs"""
+    
+    def __init__(self, students: StudentRepository, courses: CourseRepository,
+                 grades: GradeRepository, history: HistoryRepository,
+                 scales: GradingScaleRepository, components: ComponentRepository,
+                 curricula: CurriculumRepository, standings: StandingRepository,
+                 snapshots: TranscriptSnapshotRepository, changes: ChangeLogRepository):
+        self.students = students
+        self.courses = courses
+        self.grades = grades
+        self.history = history
+        self.scales = scales
+        self.components = components
+        self.curricula = curricula
+        self.standings = standings
+        self.snapshots = snapshots
+        self.changes = changes
+
+
+# ===================== SQLITE =====================
+
+def _scan(query: str, id_column: str, after_id: int, limit: int,
+          ids: Optional[Iterable[int]] = None, order_by: Optional[str] = None) -> List[dict]:
+    """One keyset page of query (whose WHERE takes after_id), optionally restricted to id_column IN ids"""
+    order_by = order_by or id_column
+    conn = get_read_connection()
+    try:
+        if ids is None:
+            cursor = conn.execute(f"{query} ORDER BY {order_by} LIMIT ?", (after_id, limit))
+            return [dict(row) for row in cursor]
+        
+        ids = sorted(set(ids))
+        rows = []
+        # Stay under SQLite's bound parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor = conn.execute(
+                f"{query} AND {id_column} IN ({', '.join('?' * len(chunk))}) ORDER BY {order_by} LIMIT ?",
+                [after_id, *chunk, limit])
+            rows.extend(dict(row) for row in cursor)
+        key = order_by.split('.')[-1]
+        rows.sort(key=lambda row: row[key])
+        return rows[:limit]
+    finally:
+        conn.close()
+
+class SQLiteStudentRepository(StudentRepository):
+    
+    def get(self, nim: str) -> Optional[dict]:
+        conn = get_read_connection()
+        try:
+            row = conn.execute("SELECT * FROM students WHERE nim = ?", (nim,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+    
+    def get_many(self, nims: Iterable[str]) -> Dict[str, dict]:
+        nims = list(set(nims))
+        students = {}
+        conn = get_read_connection()
+        try:
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(nims), 500):
+                chunk = nims[start:start + 500]
+                cursor = conn.execute(
+                    f"SELECT * FROM students WHERE nim IN ({', '.join('?' * len(chunk))})", chunk)
+                for row in cursor:
+                    students[row['nim']] = dict(row)
+            return students
+        finally:
+            conn.close()
+    
+    def list_all(self) -> List[dict]:
+        conn = get_read_connection()
+        try:
+            return [dict(row) for row in conn.execute("SELECT * FROM students ORDER BY nim")]
+        finally:
+            conn.close()
+    
+    def count(self) -> int:
+        conn = get_read_connection()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+        finally:
+            conn.close()
+    
+    def add_many(self, students: Iterable[Tuple[str, str, str, int]]) -> None:
+        conn = get_connection()
+        try:
+            conn.executemany("""
+                INSERT INTO students (nim, name, program_study, batch_year)
+                VALUES (?, ?, ?, ?)
+            """, students)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class SQLiteCourseRepository(CourseRepository):
+    
+    def get(self, course_code: str) -> Optional[dict]:
+        conn = get_read_connection()
+        try:
+            row = conn.execute("SELECT * FROM courses WHERE course_code = ?", (course_code,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+    
+    def list_all(self) -> List[dict]:
+        conn = get_read_connection()
+        try:
+            return [dict(row) for row in conn.execute("SELECT * FROM courses ORDER BY course_code")]
+        finally:
+            conn.close()
+    
+    def add_many(self, courses: Iterable[Tuple[str, str, int]]) -> None:
+        conn = get_connection()
+        try:
+            conn.executemany("""
+                INSERT INTO courses (course_code, course_name, sks)
+                VALUES (?, ?, ?)
+            """, courses)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class SQLiteGradeRepository(GradeRepository):
+    
+    def find(self, nim: str, course_code: str, semester: int) -> Optional[dict]:
+        conn = get_read_connection()
+        try:
+            row = conn.execute("""
+                SELECT g.*, c.sks, c.course_name
+                FROM grades g
+                JOIN courses c ON g.course_code = c.course_code
+                WHERE g.nim = ? AND g.course_code = ? AND g.semester = ?
+            """, (nim, course_code, semester)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+    
+    def list_for_student(self, nim: str, semester: Optional[int] = None) -> List[dict]:
+        conn = get_read_connection()
+        try:
+            if semester:
+                cursor = conn.execute("""
+                    SELECT g.*, c.sks, c.course_name
+                    FROM grades g
+                    JOIN courses c ON g.course_code = c.course_code
+                    WHERE g.nim = ? AND g.semester = ?
+                    ORDER BY g.semester, g.course_code
+                """, (nim, semester))
+            else:
+                cursor = conn.execute("""
+                    SELECT g.*, c.sks, c.course_name
+                    FROM grades g
+                    JOIN courses c ON g.course_code = c.course_code
+                    WHERE g.nim = ?
+                    ORDER BY g.semester, g.course_code
+                """, (nim,))
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def list_records_for_student(self, nim: str, semester: Optional[int] = None,
+                                 after_semester: Optional[int] = None) -> List[GradeRecord]:
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            query = """
+                SELECT g.grade_id, g.nim, g.course_code, c.course_name, g.semester,
+                       g.letter_grade, g.numeric_grade, c.sks, g.presence_percentage
+                FROM grades g
+                JOIN courses c ON g.course_code = c.course_code
+                WHERE g.nim = ?
+            """
+            params = [nim]
+            if semester:
+                query += " AND g.semester = ?"
+                params.append(semester)
+            if after_semester is not None:
+                query += " AND g.semester > ?"
+                params.append(after_semester)
+            cursor.execute(query + " ORDER BY g.semester, g.course_code", params)
+            return [GradeRecord(*row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def list_records_for_students(self, nims: Iterable[str]) -> Dict[str, List[GradeRecord]]:
+        nims = sorted(set(nims))
+        records: Dict[str, List[GradeRecord]] = {}
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(nims), 500):
+                chunk = nims[start:start + 500]
+                cursor.execute(f"""
+                    SELECT g.grade_id, g.nim, g.course_code, c.course_name, g.semester,
+                           g.letter_grade, g.numeric_grade, c.sks, g.presence_percentage
+                    FROM grades g
+                    JOIN courses c ON g.course_code = c.course_code
+                    WHERE g.nim IN ({', '.join('?' * len(chunk))})
+                    ORDER BY g.nim, g.semester, g.course_code
+                """, chunk)
+                for row in cursor.fetchall():
+                    records.setdefault(row[1], []).append(GradeRecord(*row))
+            return records
+        finally:
+            conn.close()
+    
+    def iter_all_records(self) -> Iterator[GradeRecord]:
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute("""
+                SELECT g.grade_id, g.nim, g.course_code, c.course_name, g.semester,
+                       g.letter_grade, g.numeric_grade, c.sks, g.presence_percentage
+                FROM grades g
+                JOIN courses c ON g.course_code = c.course_code
+                ORDER BY g.nim, g.semester, g.course_code
+            """)
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    yield GradeRecord(*row)
+        finally:
+            conn.close()
+    
+    def save(self, nim: str, course_code: str, semester: int, letter_grade: str,
+             numeric_grade: float, presence_percentage: float) -> bool:
+        return self.save_many([(nim, course_code, semester, letter_grade,
+                                numeric_grade, presence_percentage)])[0]
+    
+    def save_many(self, grades: Iterable[Tuple[str, str, int, str, float, float]]) -> List[bool]:
+        conn = get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            updated = [self._save_row(cursor, *row) for row in grades]
+            conn.commit()
+            return updated
+        
+        except Exception:
+            conn.rollback()
+            raise
+        
+        finally:
+            conn.close()
+    
+    def save_each(self, grades: Iterable[Tuple[str, str, int, str, float, float]]) -> List[Union[bool, Exception]]:
+        conn = get_connection()
+        cursor = conn.cursor()
+        results = []
+        
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for row in grades:
+                # A failing row rolls back to its savepoint; the others still commit
+                cursor.execute("SAVEPOINT grade_row")
+                try:
+                    results.append(self._save_row(cursor, *row))
+                except sqlite3.Error as e:
+                    cursor.execute("ROLLBACK TO grade_row")
+                    results.append(e)
+                cursor.execute("RELEASE grade_row")
+            conn.commit()
+            return results
+        
+        except Exception:
+            conn.rollback()
+            raise
+        
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _save_row(cursor, nim, course_code, semester, letter_grade, numeric_grade, presence_percentage) -> bool:
+        # Check if grade already exists
+        cursor.execute("""
+            SELECT grade_id, letter_grade, numeric_grade FROM grades
+            WHERE nim = ? AND course_code = ? AND semester = ?
+        """, (nim, course_code, semester))
+        
+        existing = cursor.fetchone()
+        
+        if existing:
+            # Update existing grade
+            cursor.execute("""
+                UPDATE grades
+                SET letter_grade = ?, numeric_grade = ?,
+                    presence_percentage = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE grade_id = ?
+            """, (letter_grade, numeric_grade, presence_percentage, existing['grade_id']))
+            
+            # Record in audit trail
+            cursor.execute("""
+                INSERT INTO grade_history
+                (grade_id, old_letter_grade, old_numeric_grade,
+                 new_letter_grade, new_numeric_grade, changed_by, changed_at, reason)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+            """, (existing['grade_id'], existing['letter_grade'], existing['numeric_grade'],
+                  letter_grade, numeric_grade, 'system', 'Grade updated'))
+        else:
+            # Insert new grade
+            cursor.execute("""
+                INSERT INTO grades
+                (nim, course_code, semester, letter_grade, numeric_grade, presence_percentage)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (nim, course_code, semester, letter_grade, numeric_grade, presence_percentage))
+        
+        return existing is not None
+    
+    def add_many(self, grades: Iterable[Tuple[str, str, int, str, float, float]]) -> None:
+        conn = get_connection()
+        try:
+            conn.executemany("""
+                INSERT INTO grades (nim, course_code, semester, letter_grade, numeric_grade, presence_percentage)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, grades)
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def scan(self, after_grade_id: int, limit: int,
+             grade_ids: Optional[Iterable[int]] = None) -> List[dict]:
+        query = """
+            SELECT g.grade_id, g.nim, g.course_code, g.semester, g.letter_grade, g.numeric_grade,
+                   s.program_study, c.course_code IS NOT NULL AS course_exists
+            FROM grades g
+            LEFT JOIN students s ON g.nim = s.nim
+            LEFT JOIN courses c ON g.course_code = c.course_code
+            WHERE g.grade_id > ?
+        """
+        return _scan(query, "g.grade_id", after_grade_id, limit, grade_ids)
+
+
+class SQLiteHistoryRepository(HistoryRepository):
+    
+    def list_for_student(self, nim: str) -> List[dict]:
+        conn = get_read_connection()
+        try:
+            cursor = conn.execute("""
+                SELECT * FROM grade_changes_summary
+                WHERE nim = ?
+                ORDER BY changed_at DESC
+            """, (nim,))
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def scan(self, after_history_id: int, limit: int,
+             grade_ids: Optional[Iterable[int]] = None) -> List[dict]:
+        query = """
+            SELECT gh.history_id, gh.grade_id, gh.changed_at, g.grade_id IS NOT NULL AS grade_exists
+            FROM grade_history gh
+            LEFT JOIN grades g ON gh.grade_id = g.grade_id
+            WHERE gh.history_id > ?
+        """
+        return _scan(query, "gh.grade_id", after_history_id, limit, grade_ids,
+                     order_by="gh.history_id")
+
+
+class SQLiteGradingScaleRepository(GradingScaleRepository):
+    
+    def list_entries(self) -> List[Tuple[str, str, float, float]]:
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute("""
+                SELECT program_study, letter_grade, numeric_grade, min_score
+                FROM grading_scales
+                ORDER BY program_study, min_score DESC
+            """)
+            return cursor.fetchall()
+        finally:
+            conn.close()
+    
+    def replace(self, program_study: str, entries: Iterable[Tuple[str, float, float]]) -> None:
+        conn = get_connection()
+        try:
+            conn.execute("DELETE FROM grading_scales WHERE program_study = ?", (program_study,))
+            conn.executemany("""
+                INSERT INTO grading_scales (program_study, letter_grade, numeric_grade, min_score)
+                VALUES (?, ?, ?, ?)
+            """, [(program_study, letter, numeric, min_score) for letter, numeric, min_score in entries])
+            conn.execute("UPDATE grading_scale_version SET version = version + 1 WHERE id = 1")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def version(self) -> int:
+        conn = get_connection()
+        try:
+            row = conn.execute("SELECT version FROM grading_scale_version WHERE id = 1").fetchone()
+            return row[0] if row else 0
+        finally:
+            conn.close()
+
+
+class SQLiteComponentRepository(ComponentRepository):
+    
+    def get_weights(self, course_code: str) -> Dict[str, float]:
+        conn = get_read_connection()
+        try:
+            cursor = conn.execute("""
+                SELECT component, weight FROM course_components
+                WHERE course_code = ?
+                ORDER BY component
+            """, (course_code,))
+            return {row['component']: row['weight'] for row in cursor}
+        finally:
+            conn.close()
+    
+    def set_weights(self, course_code: str, weights: Dict[str, float]) -> None:
+        conn = get_connection()
+        try:
+            conn.execute("DELETE FROM course_components WHERE course_code = ?", (course_code,))
+            conn.executemany("""
+                INSERT INTO course_components (course_code, component, weight)
+                VALUES (?, ?, ?)
+            """, [(course_code, component, weight) for component, weight in weights.items()])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def save_scores(self, course_code: str, semester: int,
+                    scores: Iterable[Tuple[str, str, float]]) -> None:
+        conn = get_connection()
+        try:
+            conn.executemany("""
+                INSERT INTO component_scores (course_code, semester, nim, component, score)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (course_code, semester, nim, component)
+                DO UPDATE SET score = excluded.score, updated_at = CURRENT_TIMESTAMP
+            """, [(course_code, semester, nim, component, score) for nim, component, score in scores])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def list_scores(self, course_code: str, semester: int) -> List[Tuple[str, str, float]]:
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute("""
+                SELECT nim, component, score FROM component_scores
+                WHERE course_code = ? AND semester = ?
+                ORDER BY nim
+            """, (course_code, semester))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+
+class SQLiteCurriculumRepository(CurriculumRepository):
+    
+    def get(self, program_study: str) -> Optional[dict]:
+        conn = get_read_connection()
+        try:
+            row = conn.execute("SELECT graduation_sks FROM curricula WHERE program_study = ?",
+                               (program_study,)).fetchone()
+            if row is None:
+                return None
+            
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            courses = [(code, semester, bool(required)) for code, semester, required in cursor.execute("""
+                SELECT course_code, semester, required FROM curriculum_courses
+                WHERE program_study = ?
+                ORDER BY course_code
+            """, (program_study,))]
+            prerequisites = cursor.execute("""
+                SELECT course_code, prerequisite_code FROM course_prerequisites
+                WHERE program_study = ?
+                ORDER BY course_code, prerequisite_code
+            """, (program_study,)).fetchall()
+            
+            return {'graduation_sks': row['graduation_sks'], 'courses': courses,
+                    'prerequisites': prerequisites}
+        finally:
+            conn.close()
+    
+    def replace(self, program_study: str, graduation_sks: int,
+                courses: Iterable[Tuple[str, Optional[int], bool]],
+                prerequisites: Iterable[Tuple[str, str]]) -> None:
+        conn = get_connection()
+        try:
+            for table in ('course_prerequisites', 'curriculum_courses', 'curricula'):
+                conn.execute(f"DELETE FROM {table} WHERE program_study = ?", (program_study,))
+            conn.execute("INSERT INTO curricula (program_study, graduation_sks) VALUES (?, ?)",
+                         (program_study, graduation_sks))
+            conn.executemany("""
+                INSERT INTO curriculum_courses (program_study, course_code, semester, required)
+                VALUES (?, ?, ?, ?)
+            """, [(program_study, code, semester, int(required)) for code, semester, required in courses])
+            conn.executemany("""
+                INSERT INTO course_prerequisites (program_study, course_code, prerequisite_code)
+                VALUES (?, ?, ?)
+            """, [(program_study, code, prerequisite) for code, prerequisite in prerequisites])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+class SQLiteStandingRepository(StandingRepository):
+    
+    def get(self, nim: str) -> Optional[dict]:
+        conn = get_read_connection()
+        try:
+            row = conn.execute("SELECT * FROM academic_standing WHERE nim = ?", (nim,)).fetchone()
+            if row is None:
+                return None
+            standing = dict(row)
+            standing['reasons'] = json.loads(standing['reasons'])
+            return standing
+        finally:
+            conn.close()
+    
+    def list_current(self) -> Dict[str, dict]:
+        conn = get_read_connection()
+        try:
+            standings = {}
+            for row in conn.execute("SELECT * FROM academic_standing"):
+                standing = dict(row)
+                standing['reasons'] = json.loads(standing['reasons'])
+                standings[standing['nim']] = standing
+            return standings
+        finally:
+            conn.close()
+    
+    def save_evaluation(self, standings: Iterable[dict], changes: Iterable[dict]) -> None:
+        conn = get_connection()
+        try:
+            conn.executemany("""
+                INSERT OR REPLACE INTO academic_standing
+                (nim, standing, reasons, ips, ipk, failed_courses, last_semester, evaluated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, [(s['nim'], s['standing'], json.dumps(s['reasons']), s['ips'], s['ipk'],
+                   s['failed_courses'], s['last_semester']) for s in standings])
+            conn.executemany("""
+                INSERT INTO academic_standing_history (nim, old_standing, new_standing, reasons)
+                VALUES (?, ?, ?, ?)
+            """, [(c['nim'], c['old_standing'], c['new_standing'], json.dumps(c['reasons']))
+                  for c in changes])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def list_history(self, nim: str) -> List[dict]:
+        conn = get_read_connection()
+        try:
+            cursor = conn.execute("""
+                SELECT * FROM academic_standing_history
+                WHERE nim = ?
+                ORDER BY changed_at DESC, history_id DESC
+            """, (nim,))
+            history = [dict(row) for row in cursor]
+            for change in history:
+                change['reasons'] = json.loads(change['reasons'])
+            return history
+        finally:
+            conn.close()
+
+
+class SQLiteTranscriptSnapshotRepository(TranscriptSnapshotRepository):
+    
+    def latest(self, nim: str) -> Optional[dict]:
+        conn = get_read_connection()
+        try:
+            row = conn.execute("""
+                SELECT * FROM transcript_snapshots
+                WHERE nim = ?
+                ORDER BY version DESC LIMIT 1
+            """, (nim,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+    
+    def get(self, nim: str, version: int) -> Optional[dict]:
+        conn = get_read_connection()
+        try:
+            row = conn.execute("SELECT * FROM transcript_snapshots WHERE nim = ? AND version = ?",
+                               (nim, version)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+    
+    def list_versions(self, nim: str) -> List[dict]:
+        conn = get_read_connection()
+        try:
+            cursor = conn.execute("""
+                SELECT snapshot_id, nim, version, closed_semester, content_hash, created_at
+                FROM transcript_snapshots
+                WHERE nim = ?
+                ORDER BY version DESC
+            """, (nim,))
+            return [dict(row) for row in cursor]
+        finally:
+            conn.close()
+    
+    def find_by_hash(self, content_hash: str) -> Optional[dict]:
+        conn = get_read_connection()
+        try:
+            row = conn.execute("""
+                SELECT * FROM transcript_snapshots
+                WHERE content_hash = ?
+                ORDER BY snapshot_id DESC LIMIT 1
+            """, (content_hash,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+    
+    def latest_hashes(self) -> Dict[str, Tuple[int, str]]:
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute("""
+                SELECT s.nim, s.closed_semester, s.content_hash
+                FROM transcript_snapshots s
+                JOIN (SELECT nim, MAX(version) AS version FROM transcript_snapshots GROUP BY nim) newest
+                  ON s.nim = newest.nim AND s.version = newest.version
+            """)
+            return {nim: (closed_semester, content_hash) for nim, closed_semester, content_hash in cursor}
+        finally:
+            conn.close()
+    
+    def scan(self, after_snapshot_id: int, limit: int) -> List[dict]:
+        return _scan("SELECT * FROM transcript_snapshots WHERE snapshot_id > ?", "snapshot_id",
+                     after_snapshot_id, limit)
+    
+    def add_many(self, snapshots: Iterable[Tuple[str, int, str, bytes]]) -> int:
+        conn = get_connection()
+        try:
+            count = 0
+            for nim, closed_semester, content_hash, content in snapshots:
+                # Version assigned inside the write transaction so concurrent closes can't collide
+                conn.execute("""
+                    INSERT INTO transcript_snapshots (nim, version, closed_semester, content_hash, content)
+                    SELECT ?, COALESCE(MAX(version), 0) + 1, ?, ?, ?
+                    FROM transcript_snapshots WHERE nim = ?
+                """, (nim, closed_semester, content_hash, content, nim))
+                count += 1
+            conn.commit()
+            return count
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+class SQLiteChangeLogRepository(ChangeLogRepository):
+    """Reads the log the grades triggers write (see database.init_database)"""
+    
+    def list_since(self, after_change_id: int, limit: int) -> List[dict]:
+        conn = get_read_connection()
+        try:
+            cursor = conn.execute("""
+                SELECT * FROM grade_change_log
+                WHERE change_id > ?
+                ORDER BY change_id
+                LIMIT ?
+            """, (after_change_id, limit))
+            return [dict(row) for row in cursor]
+        finally:
+            conn.close()
+    
+    def latest_id(self) -> int:
+        conn = get_read_connection()
+        try:
+            return conn.execute("SELECT COALESCE(MAX(change_id), 0) FROM grade_change_log").fetchone()[0]
+        finally:
+            conn.close()
+    
+    def get_offset(self, consumer: str) -> Optional[int]:
+        conn = get_connection()
+        try:
+            row = conn.execute("SELECT last_change_id FROM change_consumers WHERE consumer = ?",
+                               (consumer,)).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+    
+    def set_offset(self, consumer: str, change_id: int) -> None:
+        conn = get_connection()
+        try:
+            conn.execute("""
+                INSERT INTO change_consumers (consumer, last_change_id, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(consumer) DO UPDATE SET
+                    last_change_id = excluded.last_change_id, updated_at = excluded.updated_at
+            """, (consumer, change_id))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def list_consumers(self) -> List[dict]:
+        conn = get_connection()
+        try:
+            cursor = conn.execute("SELECT * FROM change_consumers ORDER BY consumer")
+            return [dict(row) for row in cursor]
+        finally:
+            conn.close()
+
+
+class SQLiteStorage(Storage):
+    """Repositories backed by the configured SQLite database"""
+    
+    def __init__(self):
+        super().__init__(SQLiteStudentRepository(), SQLiteCourseRepository(),
+                         SQLiteGradeRepository(), SQLiteHistoryRepository(),
+                         SQLiteGradingScaleRepository(), SQLiteComponentRepository(),
+                         SQLiteCurriculumRepository(), SQLiteStandingRepository(),
+                         SQLiteTranscriptSnapshotRepository(), SQLiteChangeLogRepository())
+
+
+# ===================== IN-MEMORY =====================
+
+def _timestamp() -> str:
+    """Current UTC time in SQLite's CURRENT_TIMESTAMP format"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class InMemoryStudentRepository(StudentRepository):
+    
+    def __init__(self):
+        self._students = {}
+    
+    def get(self, nim: str) -> Optional[dict]:
+        student = self._students.get(nim)
+        return dict(student) if student else None
+    
+    def get_many(self, nims: Iterable[str]) -> Dict[str, dict]:
+        return {nim: dict(self._students[nim]) for nim in set(nims) if nim in self._students}
+    
+    def list_all(self) -> List[dict]:
+        return [dict(self._students[nim]) for nim in sorted(self._students)]
+    
+    def count(self) -> int:
+        return len(self._students)
+    
+    def add_many(self, students: Iterable[Tuple[str, str, str, int]]) -> None:
+        for nim, name, program_study, batch_year in students:
+            if nim in self._students:
+                raise ValueError(f"Student {nim} already exists")
+            self._students[nim] = {
+                'nim': nim,
+                'name': name,
+                'program_study': program_study,
+                'batch_year': batch_year,
+                'created_at': _timestamp()
+            }
+
+
+class InMemoryCourseRepository(CourseRepository):
+    
+    def __init__(self):
+        self._courses = {}
+    
+    def get(self, course_code: str) -> Optional[dict]:
+        course = self._courses.get(course_code)
+        return dict(course) if course else None
+    
+    def list_all(self) -> List[dict]:
+        return [dict(self._courses[code]) for code in sorted(self._courses)]
+    
+    def add_many(self, courses: Iterable[Tuple[str, str, int]]) -> None:
+        for course_code, course_name, sks in courses:
+            if course_code in self._courses:
+                raise ValueError(f"Course {course_code} already exists")
+            self._courses[course_code] = {
+                'course_code': course_code,
+                'course_name': course_name,
+                'sks': sks,
+                'created_at': _timestamp()
+            }
+
+
+class InMemoryChangeLogRepository(ChangeLogRepository):
+    
+    def __init__(self):
+        self._changes = []
+        self._offsets = {}
+    
+    def record(self, operation: str, grade: dict, old: Optional[dict] = None) -> None:
+        """Append a change (the in-memory counterpart of the grades triggers)"""
+        self._changes.append({
+            'change_id': len(self._changes) + 1,
+            'operation': operation,
+            'grade_id': grade['grade_id'],
+            'nim': grade['nim'],
+            'course_code': grade['course_code'],
+            'semester': grade['semester'],
+            'letter_grade': grade['letter_grade'],
+            'numeric_grade': grade['numeric_grade'],
+            'presence_percentage': grade['presence_percentage'],
+            'old_letter_grade': old['letter_grade'] if old else None,
+            'old_numeric_grade': old['numeric_grade'] if old else None,
+            'changed_at': _timestamp()
+        })
+    
+    def list_since(self, after_change_id: int, limit: int) -> List[dict]:
+        start = max(after_change_id, 0)  # change_id n is at index n - 1
+        return [dict(change) for change in self._changes[start:start + limit]]
+    
+    def latest_id(self) -> int:
+        return len(self._changes)
+    
+    def get_offset(self, consumer: str) -> Optional[int]:
+        offset = self._offsets.get(consumer)
+        return offset['last_change_id'] if offset else None
+    
+    def set_offset(self, consumer: str, change_id: int) -> None:
+        self._offsets[consumer] = {'consumer': consumer, 'last_change_id': change_id,
+                                   'updated_at': _timestamp()}
+    
+    def list_consumers(self) -> List[dict]:
+        return [dict(self._offsets[consumer]) for consumer in sorted(self._offsets)]
+
+
+class InMemoryGradeRepository(GradeRepository):
+    
+    def __init__(self, students: InMemoryStudentRepository, courses: InMemoryCourseRepository,
+                 changes: Optional[InMemoryChangeLogRepository] = None):
+        self._students = students
+        self._courses = courses
+        self._changes = changes or InMemoryChangeLogRepository()
+        self._grades = {}      # (nim, course_code, semester) -> grade row
+        self._by_student = {}  # nim -> set of keys
+        self._history = []
+        self._next_grade_id = 1
+    
+    def _joined(self, grade: dict) -> Optional[dict]:
+        """Grade row with course SKS and name, or None if the course is unknown (inner join)"""
+        course = self._courses._courses.get(grade['course_code'])
+        if course is None:
+            return None
+        row = dict(grade)
+        row['sks'] = course['sks']
+        row['course_name'] = course['course_name']
+        return row
+    
+    def find(self, nim: str, course_code: str, semester: int) -> Optional[dict]:
+        grade = self._grades.get((nim, course_code, semester))
+        return self._joined(grade) if grade else None
+    
+    def list_for_student(self, nim: str, semester: Optional[int] = None) -> List[dict]:
+        keys = sorted(self._by_student.get(nim, ()), key=lambda key: (key[2], key[1]))
+        rows = []
+        for key in keys:
+            if semester and key[2] != semester:
+                continue
+            row = self._joined(self._grades[key])
+            if row is not None:
+                rows.append(row)
+        return rows
+    
+    def list_records_for_student(self, nim: str, semester: Optional[int] = None,
+                                 after_semester: Optional[int] = None) -> List[GradeRecord]:
+        return [GradeRecord.from_dict(row) for row in self.list_for_student(nim, semester)
+                if after_semester is None or row['semester'] > after_semester]
+    
+    def list_records_for_students(self, nims: Iterable[str]) -> Dict[str, List[GradeRecord]]:
+        return {nim: self.list_records_for_student(nim) for nim in set(nims) if self._by_student.get(nim)}
+    
+    def iter_all_records(self) -> Iterator[GradeRecord]:
+        for nim in sorted(self._by_student):
+            yield from self.list_records_for_student(nim)
+    
+    def save(self, nim: str, course_code: str, semester: int, letter_grade: str,
+             numeric_grade: float, presence_percentage: float) -> bool:
+        key = (nim, course_code, semester)
+        existing = self._grades.get(key)
+        
+        if existing:
+            self._history.append({
+                'history_id': len(self._history) + 1,
+                'grade_id': existing['grade_id'],
+                'old_letter_grade': existing['letter_grade'],
+                'old_numeric_grade': existing['numeric_grade'],
+                'new_letter_grade': letter_grade,
+                'new_numeric_grade': numeric_grade,
+                'changed_by': 'system',
+                'changed_at': _timestamp(),
+                'reason': 'Grade updated'
+            })
+            old = dict(existing)
+            existing.update(letter_grade=letter_grade, numeric_grade=numeric_grade,
+                            presence_percentage=presence_percentage, updated_at=_timestamp())
+            self._changes.record('update', existing, old)
+            return True
+        
+        self._insert(nim, course_code, semester, letter_grade, numeric_grade, presence_percentage)
+        return False
+    
+    def save_each(self, grades: Iterable[Tuple[str, str, int, str, float, float]]) -> List[Union[bool, Exception]]:
+        results = []
+        for row in grades:
+            try:
+                results.append(self.save(*row))
+            except Exception as e:
+                results.append(e)
+        return results
+    
+    def save_many(self, grades: Iterable[Tuple[str, str, int, str, float, float]]) -> List[bool]:
+        return [self.save(*row) for row in grades]
+    
+    def add_many(self, grades: Iterable[Tuple[str, str, int, str, float, float]]) -> None:
+        for nim, course_code, semester, letter_grade, numeric_grade, presence in grades:
+            if (nim, course_code, semester) in self._grades:
+                raise ValueError(f"Grade for {nim} {course_code} semester {semester} already exists")
+            self._insert(nim, course_code, semester, letter_grade, numeric_grade, presence)
+    
+    def scan(self, after_grade_id: int, limit: int,
+             grade_ids: Optional[Iterable[int]] = None) -> List[dict]:
+        wanted = set(grade_ids) if grade_ids is not None else None
+        rows = []
+        for grade in sorted(self._grades.values(), key=lambda grade: grade['grade_id']):
+            if grade['grade_id'] <= after_grade_id or (wanted is not None and grade['grade_id'] not in wanted):
+                continue
+            student = self._students.get(grade['nim'])
+            rows.append({
+                'grade_id': grade['grade_id'],
+                'nim': grade['nim'],
+                'course_code': grade['course_code'],
+                'semester': grade['semester'],
+                'letter_grade': grade['letter_grade'],
+                'numeric_grade': grade['numeric_grade'],
+                'program_study': student['program_study'] if student else None,
+                'course_exists': grade['course_code'] in self._courses._courses
+            })
+            if len(rows) == limit:
+                break
+        return rows
+    
+    def _insert(self, nim, course_code, semester, letter_grade, numeric_grade, presence_percentage):
+        key = (nim, course_code, semester)
+        now = _timestamp()
+        self._grades[key] = {
+            'grade_id': self._next_grade_id,
+            'nim': nim,
+            'course_code': course_code,
+            'semester': semester,
+            'letter_grade': letter_grade,
+            'numeric_grade': numeric_grade,
+            'presence_percentage': presence_percentage,
+            'created_at': now,
+            'updated_at': now
+        }
+        self._by_student.setdefault(nim, set()).add(key)
+        self._next_grade_id += 1
+        self._changes.record('insert', self._grades[key])
+
+
+class InMemoryHistoryRepository(HistoryRepository):
+    
+    def __init__(self, students: InMemoryStudentRepository, courses: InMemoryCourseRepository,
+                 grades: InMemoryGradeRepository):
+        self._students = students
+        self._courses = courses
+        self._grades = grades
+    
+    def list_for_student(self, nim: str) -> List[dict]:
+        student = self._students.get(nim)
+        if student is None:
+            return []
+        
+        grades_by_id = {g['grade_id']: g for g in self._grades._grades.values() if g['nim'] == nim}
+        rows = []
+        for entry in self._grades._history:
+            grade = grades_by_id.get(entry['grade_id'])
+            course = self._courses.get(grade['course_code']) if grade else None
+            if course is None:
+                continue
+            rows.append({
+                'history_id': entry['history_id'],
+                'nim': nim,
+                'name': student['name'],
+                'course_name': course['course_name'],
+                'old_numeric_grade': entry['old_numeric_grade'],
+                'new_numeric_grade': entry['new_numeric_grade'],
+                'changed_by': entry['changed_by'],
+                'changed_at': entry['changed_at'],
+                'reason': entry['reason']
+            })
+        
+        rows.sort(key=lambda row: (row['changed_at'], row['history_id']), reverse=True)
+        return rows
+    
+    def scan(self, after_history_id: int, limit: int,
+             grade_ids: Optional[Iterable[int]] = None) -> List[dict]:
+        wanted = set(grade_ids) if grade_ids is not None else None
+        existing = {grade['grade_id'] for grade in self._grades._grades.values()}
+        rows = [{
+            'history_id': entry['history_id'],
+            'grade_id': entry['grade_id'],
+            'changed_at': entry['changed_at'],
+            'grade_exists': entry['grade_id'] in existing
+        } for entry in self._grades._history
+            if entry['history_id'] > after_history_id and (wanted is None or entry['grade_id'] in wanted)]
+        return rows[:limit]
+
+
+class InMemoryGradingScaleRepository(GradingScaleRepository):
+    
+    def __init__(self):
+        self._scales = {}  # program_study -> [(letter, numeric, min_score)]
+        self._version = 0
+    
+    def list_entries(self) -> List[Tuple[str, str, float, float]]:
+        return [(program_study, letter, numeric, min_score)
+                for program_study in sorted(self._scales)
+                for letter, numeric, min_score in sorted(self._scales[program_study],
+                                                         key=lambda entry: -entry[2])]
+    
+    def replace(self, program_study: str, entries: Iterable[Tuple[str, float, float]]) -> None:
+        entries = list(entries)
+        if entries:
+            self._scales[program_study] = entries
+        else:
+            self._scales.pop(program_study, None)
+        self._version += 1
+    
+    def version(self) -> int:
+        return self._version
+
+
+class InMemoryComponentRepository(ComponentRepository):
+    
+    def __init__(self):
+        self._weights = {}  # course_code -> {component: weight}
+        self._scores = {}   # (course_code, semester) -> {(nim, component): score}
+    
+    def get_weights(self, course_code: str) -> Dict[str, float]:
+        return dict(sorted(self._weights.get(course_code, {}).items()))
+    
+    def set_weights(self, course_code: str, weights: Dict[str, float]) -> None:
+        self._weights[course_code] = dict(weights)
+    
+    def save_scores(self, course_code: str, semester: int,
+                    scores: Iterable[Tuple[str, str, float]]) -> None:
+        class_scores = self._scores.setdefault((course_code, semester), {})
+        for nim, component, score in scores:
+            class_scores[(nim, component)] = score
+    
+    def list_scores(self, course_code: str, semester: int) -> List[Tuple[str, str, float]]:
+        class_scores = self._scores.get((course_code, semester), {})
+        return [(nim, component, class_scores[(nim, component)])
+                for nim, component in sorted(class_scores)]
+
+
+class InMemoryCurriculumRepository(CurriculumRepository):
+    
+    def __init__(self):
+        self._curricula = {}
+    
+    def get(self, program_study: str) -> Optional[dict]:
+        curriculum = self._curricula.get(program_study)
+        if curriculum is None:
+            return None
+        return {'graduation_sks': curriculum['graduation_sks'],
+                'courses': sorted(curriculum['courses']),
+                'prerequisites': sorted(curriculum['prerequisites'])}
+    
+    def replace(self, program_study: str, graduation_sks: int,
+                courses: Iterable[Tuple[str, Optional[int], bool]],
+                prerequisites: Iterable[Tuple[str, str]]) -> None:
+        self._curricula[program_study] = {
+            'graduation_sks': graduation_sks,
+            'courses': [(code, semester, bool(required)) for code, semester, required in courses],
+            'prerequisites': list(prerequisites)
+        }
+
+
+class InMemoryStandingRepository(StandingRepository):
+    
+    def __init__(self):
+        self._current = {}
+        self._history = []
+    
+    def get(self, nim: str) -> Optional[dict]:
+        standing = self._current.get(nim)
+        return dict(standing) if standing else None
+    
+    def list_current(self) -> Dict[str, dict]:
+        return {nim: dict(standing) for nim, standing in self._current.items()}
+    
+    def save_evaluation(self, standings: Iterable[dict], changes: Iterable[dict]) -> None:
+        now = _timestamp()
+        for standing in standings:
+            self._current[standing['nim']] = dict(standing, evaluated_at=now)
+        for change in changes:
+            self._history.append(dict(change, history_id=len(self._history) + 1, changed_at=now))
+    
+    def list_history(self, nim: str) -> List[dict]:
+        history = [dict(change) for change in self._history if change['nim'] == nim]
+        history.sort(key=lambda change: (change['changed_at'], change['history_id']), reverse=True)
+        return history
+
+
+class InMemoryTranscriptSnapshotRepository(TranscriptSnapshotRepository):
+    
+    def __init__(self):
+        self._snapshots = {}  # nim -> [snapshot rows, oldest first]
+        self._next_id = 1
+    
+    def latest(self, nim: str) -> Optional[dict]:
+        versions = self._snapshots.get(nim)
+        return dict(versions[-1]) if versions else None
+    
+    def get(self, nim: str, version: int) -> Optional[dict]:
+        versions = self._snapshots.get(nim, [])
+        return dict(versions[version - 1]) if 0 < version <= len(versions) else None
+    
+    def list_versions(self, nim: str) -> List[dict]:
+        return [{key: value for key, value in row.items() if key != 'content'}
+                for row in reversed(self._snapshots.get(nim, []))]
+    
+    def find_by_hash(self, content_hash: str) -> Optional[dict]:
+        matches = [row for versions in self._snapshots.values() for row in versions
+                   if row['content_hash'] == content_hash]
+        return dict(max(matches, key=lambda row: row['snapshot_id'])) if matches else None
+    
+    def latest_hashes(self) -> Dict[str, Tuple[int, str]]:
+        return {nim: (versions[-1]['closed_semester'], versions[-1]['content_hash'])
+                for nim, versions in self._snapshots.items()}
+    
+    def scan(self, after_snapshot_id: int, limit: int) -> List[dict]:
+        rows = sorted((row for versions in self._snapshots.values() for row in versions
+                       if row['snapshot_id'] > after_snapshot_id), key=lambda row: row['snapshot_id'])
+        return [dict(row) for row in rows[:limit]]
+    
+    def add_many(self, snapshots: Iterable[Tuple[str, int, str, bytes]]) -> int:
+        count = 0
+        for nim, closed_semester, content_hash, content in snapshots:
+            versions = self._snapshots.setdefault(nim, [])
+            versions.append({
+                'snapshot_id': self._next_id,
+                'nim': nim,
+                'version': len(versions) + 1,
+                'closed_semester': closed_semester,
+                'content_hash': content_hash,
+                'content': content,
+                'created_at': _timestamp()
+            })
+            self._next_id += 1
+            count += 1
+        return count
+
+
+class InMemoryStorage(Storage):
+    """Repositories holding preloaded data in process memory"""
+    
+    def __init__(self, students: Iterable[Tuple[str, str, str, int]] = (),
+                 courses: Iterable[Tuple[str, str, int]] = (),
+                 grades: Iterable[Tuple[str, str, int, str, float, float]] = ()):
+        student_repo = InMemoryStudentRepository()
+        course_repo = InMemoryCourseRepository()
+        change_log = InMemoryChangeLogRepository()
+        grade_repo = InMemoryGradeRepository(student_repo, course_repo, change_log)
+        super().__init__(student_repo, course_repo, grade_repo,
+                         InMemoryHistoryRepository(student_repo, course_repo, grade_repo),
+                         InMemoryGradingScaleRepository(), InMemoryComponentRepository(),
+                         InMemoryCurriculumRepository(), InMemoryStandingRepository(),
+                         InMemoryTranscriptSnapshotRepository(), change_log)
+        
+        self.students.add_many(students)
+        self.courses.add_many(courses)
+        self.grades.add_many(grades)
+
+
+# ===================== ACTIVE STORAGE =====================
+
+_storage = None
+
+def get_storage() -> Storage:
+    """Get the storage used by GradeManager and the API (SQLite unless replaced)"""
+    global _storage
+    if _storage is None:
+        _storage = SQLiteStorage()
+    return _storage
+
+def set_storage(storage: Optional[Storage]) -> Optional[Storage]:
+    """
+    Replace the active storage, e.g. with an InMemoryStorage in tests
+    
+    Returns:
+        Storage: The previously active storage, so callers can restore it
+    """
+    global _storage
+    previous = _storage
+    _storage = storage
+    return previous
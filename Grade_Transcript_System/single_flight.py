@@ -0,0 +1,95 @@
+"""
+Single Flight - Concurrent calls for the same key share one execution
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent identical computations across threads
+    
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and get the same result (or exception). Nothing is
+    cached: once the call finishes, the next caller computes afresh. Shared
+    results are the same object for every caller, so treat them as read-only.
+    
+    Attributes:
+        calls: do() calls made
+        executions: Calls that ran the function
+        coalesced: Calls answered by another caller's execution
+        errors: Executions that raised
+        max_waiters: Most callers that ever waited on one execution
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_waiters = 0
+    
+    def do(self, key: Hashable, function: Callable, *args) -> Any:
+        """Run function(*args), or wait for the in-flight run with the same key"""
+        
+        with self._lock:
+            self.calls += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self._waiters[key] = 0
+                self.executions += 1
+            else:
+                self.coalesced += 1
+                self._waiters[key] += 1
+                self.max_waiters = max(self.max_waiters, self._waiters[key])
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = function(*args)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                del self._waiters[key]
+            call.done.set()
+    
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                'name': self.name,
+                'calls': self.calls,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'in_flight': len(self._inflight),
+                'max_waiters': self.max_waiters
+            }
+    
+    def reset_metrics(self) -> None:
+        with self._lock:
+            self.calls = self.executions = self.coalesced = self.errors = self.max_waiters = 0
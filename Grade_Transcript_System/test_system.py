@@ -3,22 +3,90 @@ Comprehensive Unit Tests for Grade & Transcript Management System
 Tests cover: Grade validation, IPK calculation, PDF generation, business rules, and edge cases
 """
 import unittest
+import asyncio
+import gc
+import json
 import os
+import re
 import sys
 from datetime import datetime
 import sqlite3
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database import get_connection, init_database, DATABASE_FILE
-from grade_manager import GradeManager
+from database import (get_connection, init_database, populate_sample_data, use_database,
+                      refresh_snapshot, get_snapshot_connection, reporting_snapshot, use_shards,
+                      use_shard)
+from grade_manager import GradeManager, GRADE_CONVERSION, NUMERIC_TO_GRADE
 from grade_calculator import GradeCalculator
 from transcript_generator import TranscriptGenerator
+import transcript_generator
+import grade_manager
+from repositories import InMemoryStorage, set_storage, get_storage
+from records import GradeRecord
+from grade_simulator import GradeSimulator
+from grade_target_solver import GradeTargetSolver
+import itertools
+from ranking import CohortRankingIndex
+from grading_scale import GradingScale, GradingScaleRegistry, DEFAULT_PROGRAM
+from grade_components import GradeComponents
+from curriculum import Curriculum
+from academic_standing import AcademicStanding, StandingRules
+from transcript_verification import TranscriptSigner
+from single_flight import SingleFlight
+from change_feed import ChangeBroker, RESYNC, format_sse, stream_events
+from change_log import ChangeLog
+from group_commit import GroupCommitWriter
+from backup import BackupManager
+from integrity import IntegrityChecker, ORPHANED_GRADE, GRADE_MISMATCH, ORPHANED_HISTORY, \
+    STANDING_DRIFT, SNAPSHOT_CORRUPT
+import database
+from app import create_app
+from asgi import create_asgi_app
 
-class TestGradeValidation(unittest.TestCase):
+
+# ===================== FIXTURES =====================
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    Base for tests that touch the database
+    
+    Every test gets its own private in-memory SQLite database seeded with the
+    sample data, so tests leave nothing behind and can run in parallel
+    (python -m pytest -n auto test_system.py).
+    """
+    
+    SEED_SAMPLE_DATA = True
+    
+    def setUp(self):
+        self.previous_database = use_database(":memory:")
+        init_database(verbose=False)
+        if self.SEED_SAMPLE_DATA:
+            populate_sample_data(verbose=False)
+    
+    def tearDown(self):
+        use_database(*self.previous_database)
+    
+    def seed(self, students=(), courses=(), grades=()):
+        """Bulk insert extra (nim, name, program, batch), (code, name, sks) and grade rows"""
+        storage = get_storage()
+        storage.students.add_many(students)
+        storage.courses.add_many(courses)
+        storage.grades.add_many(grades)
+
+
+class TestGradeValidation(DatabaseTestCase):
     """Test grade input validation and business rules"""
     
+    SEED_SAMPLE_DATA = False
+    
     def test_valid_grade_input(self):
         """Test valid grade input passes validation"""
         is_valid, msg = GradeManager.validate_input("21001", "PBO101", "A", 95, 1)
@@ -58,9 +126,11 @@ class TestGradeValidation(unittest.TestCase):
             self.assertTrue(is_valid, f"Grade {grade} should be valid")
 
 
-class TestGradeConversion(unittest.TestCase):
+class TestGradeConversion(DatabaseTestCase):
     """Test grade conversion between letter and numeric"""
     
+    SEED_SAMPLE_DATA = False
+    
     def test_letter_to_numeric_a(self):
         """Test A grade converts to 4.0"""
         numeric = GradeManager.convert_letter_to_numeric("A")
@@ -125,19 +195,9 @@ class TestBusinessRules(unittest.TestCase):
             self.assertEqual(GradeManager.is_passed(grade), should_pass)
 
 
-class TestIPSCalculation(unittest.TestCase):
+class TestIPSCalculation(DatabaseTestCase):
     """Test IPS (Semester GPA) calculation"""
     
-    @classmethod
-    def setUpClass(cls):
-        """Setup test database with sample data"""
-        # Use test database
-        global DATABASE_FILE
-        test_db = DATABASE_FILE.replace('.db', '_test.db')
-        if os.path.exists(test_db):
-            os.remove(test_db)
-        DATABASE_FILE = test_db
-    
     def test_ips_all_a_grades(self):
         """Test: Mahasiswa dengan nilai sempurna (semua A)"""
         # This test uses existing sample data where 21001 has mostly A's in sem 1
@@ -176,7 +236,7 @@ class TestIPSCalculation(unittest.TestCase):
             self.assertEqual(calculated_ips, expected_ips)
 
 
-class TestIPKCalculation(unittest.TestCase):
+class TestIPKCalculation(DatabaseTestCase):
     """Test IPK (Cumulative GPA) calculation"""
     
     def test_ipk_all_semesters(self):
@@ -249,7 +309,7 @@ class TestGraduationPredicate(unittest.TestCase):
         self.assertEqual(predicate, "Kurang")
 
 
-class TestTranscriptGeneration(unittest.TestCase):
+class TestTranscriptGeneration(DatabaseTestCase):
     """Test transcript data retrieval"""
     
     def test_transcript_retrieval(self):
@@ -286,7 +346,7 @@ class TestTranscriptGeneration(unittest.TestCase):
         self.assertEqual(transcript, {})
 
 
-class TestPerformanceStatistics(unittest.TestCase):
+class TestPerformanceStatistics(DatabaseTestCase):
     """Test performance statistics calculation"""
     
     def test_performance_stats_structure(self):
@@ -316,13 +376,18 @@ class TestPerformanceStatistics(unittest.TestCase):
         self.assertEqual(stats['passed_courses'], 0)
 
 
-class TestPDFGeneration(unittest.TestCase):
+class TestPDFGeneration(DatabaseTestCase):
     """Test PDF transcript generation"""
     
-    @classmethod
-    def setUpClass(cls):
-        """Setup PDF generator"""
-        cls.generator = TranscriptGenerator()
+    def setUp(self):
+        """Setup PDF generator writing to a private directory"""
+        super().setUp()
+        self.output_dir = tempfile.mkdtemp()
+        self.generator = TranscriptGenerator(output_dir=self.output_dir)
+    
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+        super().tearDown()
     
     def test_pdf_generation_creates_file(self):
         """Test PDF generation creates a file"""
@@ -346,9 +411,87 @@ class TestPDFGeneration(unittest.TestCase):
                 os.remove(pdf_path)
         except Exception as e:
             self.fail(f"PDF generation failed: {e}")
+    
+    def test_long_semester_repeats_header(self):
+        """Test a semester table split over pages repeats its header row"""
+        transcript_generator._load_reportlab()
+        records = [GradeRecord(i, "21001", f"MK{i:03d}", f"Mata Kuliah {i}", 1, "B", 3.0, 3)
+                   for i in range(60)]
+        elements = self.generator._create_semester_table(
+            {'semester': 1, 'ips': 3.0, 'total_sks': 180, 'courses': records}, self.generator._get_styles())
+        self.assertTrue(elements[0].getKeepWithNext())
+        parts = elements[-1].split(6.6 * 72, 5 * 72)
+        self.assertGreater(len(parts), 1)
+        self.assertEqual([part._cellvalues[0][0] for part in parts], ["Kode MK"] * len(parts))
+    
+    def test_concurrent_first_renders_wait_for_reportlab(self):
+        """Test renders racing the first ReportLab import only start once every name is bound"""
+        transcript_generator._load_reportlab()
+        # A load interrupted after SimpleDocTemplate but before the alignment enums
+        transcript_generator._REPORTLAB_LOADED = False
+        del transcript_generator.TA_CENTER
+        barrier = threading.Barrier(4)
+        def render(_):
+            barrier.wait()
+            return self.generator.render("21001", 'pdf')[0]
+        with ThreadPoolExecutor(4) as pool:
+            pdfs = list(pool.map(render, range(4)))
+        self.assertTrue(all(pdf.startswith(b"%PDF") for pdf in pdfs))
+    
+    def test_streaming_story_matches_whole_story(self):
+        """Test the streaming build lays out a 14-semester transcript like the whole-story build"""
+        self.seed(grades=[("21002", "PBO101" if semester % 2 else "NET101", semester, "C", 2.0, 90)
+                          for semester in range(2, 15)])
+        pdfs = [TranscriptGenerator(self.output_dir, streaming=streaming).render("21002", 'pdf')[0]
+                for streaming in (False, True)]
+        pages = [len(re.findall(rb"/Type /Page\b", pdf)) for pdf in pdfs]
+        self.assertGreater(pages[0], 1)
+        self.assertEqual(pages[0], pages[1])
+    
+    def test_html_and_jsonld_renderings(self):
+        """Test HTML and JSON-LD are rendered from the same transcript model"""
+        get_storage().students.add_many([("21009", "<b>Eve</b>", "Teknik Informatika", 2021)])
+        GradeManager.input_grade("21009", "PBO101", 1, "B", 90)
+        html, media_type = self.generator.render("21009", 'html')
+        self.assertEqual(media_type, 'text/html; charset=utf-8')
+        self.assertIn(b"&lt;b&gt;Eve&lt;/b&gt;", html)
+        self.assertIn(b"SEMESTER 1 - IPS: 3.0", html)
+        
+        content, media_type = self.generator.render("21001", 'jsonld')
+        self.assertEqual(media_type, 'application/ld+json')
+        credential = json.loads(content)
+        self.assertIn('OpenBadgeCredential', credential['type'])
+        self.assertEqual(credential['id'], "urn:x-transcript:21001:current")
+        subject = credential['credentialSubject']
+        self.assertEqual(subject['creditsEarned'], 13)
+        # Four courses, one IPS, IPK and predicate, each described by the achievement
+        self.assertEqual(len(subject['result']), 7)
+        self.assertEqual(len(subject['achievement']['resultDescription']), 7)
+        values = {r['resultDescription'].rsplit(':', 1)[-1]: r['value'] for r in subject['result']}
+        self.assertEqual((values['ipk'], values['predicate']), ("3.69", "Cum Laude"))
+        
+        with self.assertRaises(ValueError):
+            self.generator.render("21001", 'docx')
+        with self.assertRaises(ValueError):
+            self.generator.render("99999", 'html')
+    
+    def test_signed_renderings(self):
+        """Test a frozen transcript's credential is identified by its verification URL"""
+        generator = TranscriptGenerator(self.output_dir, TranscriptSigner("test-key", "https://akademik.example.ac.id"))
+        self.assertIn("Transkrip sementara", json.loads(generator.render("21001", 'jsonld')[0])['description'])
+        
+        GradeCalculator.close_semester(1)
+        credential = json.loads(generator.render("21001", 'jsonld')[0])
+        self.assertTrue(credential['id'].startswith("https://akademik.example.ac.id/verify/"))
+        self.assertEqual(credential['issuer']['id'], "https://akademik.example.ac.id")
+        self.assertIn(credential['id'].encode('utf-8'), generator.render("21001", 'html')[0])
+        
+        pdf, media_type = generator.render("21001", 'pdf')
+        self.assertEqual(media_type, 'application/pdf')
+        self.assertTrue(pdf.startswith(b"%PDF"))
 
 
-class TestEdgeCases(unittest.TestCase):
+class TestEdgeCases(DatabaseTestCase):
     """Test edge cases and error handling"""
     
     def test_zero_sks_course(self):
@@ -368,6 +511,1847 @@ class TestEdgeCases(unittest.TestCase):
         self.assertTrue(is_valid)
 
 
+class TestReportingSnapshot(unittest.TestCase):
+    """Test read-only snapshot mode for reporting queries"""
+    
+    def setUp(self):
+        """Point the database module at a throwaway live database file"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.previous_database = use_database(os.path.join(self.tmp_dir, "live.db"),
+                                              os.path.join(self.tmp_dir, "snapshot.db"))
+        init_database(verbose=False)
+        populate_sample_data(verbose=False)
+    
+    def tearDown(self):
+        use_database(*self.previous_database)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def test_snapshot_isolated_from_later_writes(self):
+        """Test reports inside reporting_snapshot() see the data as of the last refresh"""
+        refresh_snapshot()
+        success, _ = GradeManager.input_grade("21001", "PBO101", 1, "C", 90)
+        self.assertTrue(success)
+        
+        with reporting_snapshot():
+            self.assertEqual(GradeManager.get_grade("21001", "PBO101", 1)['letter_grade'], "A")
+        self.assertEqual(GradeManager.get_grade("21001", "PBO101", 1)['letter_grade'], "C")
+    
+    def test_snapshot_connection_is_read_only(self):
+        """Test the snapshot connection rejects writes"""
+        conn = get_snapshot_connection()
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM grades")
+        finally:
+            conn.close()
+    
+    def test_refresh_while_writer_holds_transaction(self):
+        """Test a snapshot refresh does not wait on an open write transaction"""
+        writer = get_connection()
+        try:
+            writer.execute("BEGIN IMMEDIATE")
+            writer.execute("UPDATE grades SET letter_grade = 'E', numeric_grade = 0.0")
+            refresh_snapshot()
+        finally:
+            writer.rollback()
+            writer.close()
+        
+        with reporting_snapshot():
+            self.assertEqual(GradeManager.get_grade("21001", "PBO101", 1)['letter_grade'], "A")
+    
+    def test_refresh_stages_to_its_own_file(self):
+        """Test a refresh never writes to or swaps in another worker's staging file"""
+        other_staging = os.path.join(self.tmp_dir, "snapshot.db.tmp")
+        with open(other_staging, 'wb') as f:
+            f.write(b"half-copied")
+        
+        refresh_snapshot()
+        
+        with open(other_staging, 'rb') as f:
+            self.assertEqual(f.read(), b"half-copied")
+        self.assertEqual(sorted(name for name in os.listdir(self.tmp_dir) if name.startswith("snapshot")),
+                         ["snapshot.db", "snapshot.db.tmp"])
+        with reporting_snapshot():
+            self.assertEqual(GradeManager.get_grade("21001", "PBO101", 1)['letter_grade'], "A")
+    
+    def test_batch_transcripts_read_snapshot(self):
+        """Test batch transcripts come from the snapshot"""
+        refresh_snapshot()
+        GradeManager.input_grade("21001", "PBO101", 1, "E", 90)
+        
+        transcripts = GradeCalculator.get_batch_transcripts(["21001", "99999"])
+        
+        self.assertEqual(list(transcripts.keys()), ["21001"])
+        self.assertEqual(transcripts["21001"]['ipk'], 3.69)
+    
+    def test_stale_snapshot_refreshed_before_report(self):
+        """Test a report refreshes a snapshot older than SNAPSHOT_MAX_AGE"""
+        refresh_snapshot()
+        GradeManager.input_grade("21001", "PBO101", 1, "E", 90)
+        snapshot_file = os.path.join(self.tmp_dir, "snapshot.db")
+        an_hour_ago = time.time() - 3600
+        os.utime(snapshot_file, (an_hour_ago, an_hour_ago))
+        
+        previous_max_age = database.SNAPSHOT_MAX_AGE
+        try:
+            database.SNAPSHOT_MAX_AGE = 0  # Only refreshed when missing
+            self.assertEqual(GradeCalculator.get_batch_transcripts(["21001"])["21001"]['ipk'], 3.69)
+            
+            database.SNAPSHOT_MAX_AGE = 300
+            transcripts = GradeCalculator.get_batch_transcripts(["21001"])
+        finally:
+            database.SNAPSHOT_MAX_AGE = previous_max_age
+        
+        self.assertEqual(transcripts["21001"]['ipk'], GradeCalculator.calculate_ipk("21001"))
+        self.assertLess(transcripts["21001"]['ipk'], 3.69)
+
+
+class TestInMemoryStorage(unittest.TestCase):
+    """Test business logic running over the in-memory repositories"""
+    
+    def setUp(self):
+        """Swap in preloaded in-memory storage"""
+        storage = InMemoryStorage(
+            students=[("31001", "ANDI", "Teknik Informatika", 2022),
+                      ("31002", "BUDI", "Sistem Informasi", 2022)],
+            courses=[("PBO101", "Pemrograman Berorientasi Objek", 3),
+                     ("WEB101", "Pengembangan Web", 4)],
+            grades=[("31001", "PBO101", 1, "A", 4.0, 90),
+                    ("31001", "WEB101", 1, "B", 3.0, 85),
+                    ("31001", "PBO101", 2, "E", 0.0, 80),
+                    ("31001", "GHOST1", 1, "A", 4.0, 80)]
+        )
+        self.previous_storage = set_storage(storage)
+    
+    def tearDown(self):
+        set_storage(self.previous_storage)
+    
+    def test_integrity_scan(self):
+        """Test the integrity checker over the in-memory repositories"""
+        GradeManager.input_grade("31001", "WEB101", 1, "A", 90)
+        report = IntegrityChecker(chunk_size=2).scan()
+        self.assertEqual(report['checked']['grades'], 4)
+        self.assertEqual(report['checked']['history'], 1)
+        self.assertEqual([(i['check'], i['course_code']) for i in report['issues']],
+                         [(ORPHANED_GRADE, "GHOST1")])
+        self.assertEqual(IntegrityChecker().scan_changes()['checked']['changes'], 5)
+    
+    def test_transcript_snapshots(self):
+        """Test semester-close snapshots over the in-memory repositories"""
+        self.assertEqual(GradeCalculator.close_semester(1)['snapshots'], 1)
+        transcript = GradeCalculator.get_transcript("31001")
+        self.assertEqual(transcript['snapshot']['version'], 1)
+        self.assertEqual(transcript['number_of_semesters'], 2)
+        self.assertEqual(transcript['ipk'], 3.43)
+    
+    def test_calculator_over_preloaded_data(self):
+        """Test IPS/IPK use the preloaded rows, skipping grades of unknown courses"""
+        self.assertEqual(GradeCalculator.calculate_ips("31001", 1), 3.43)
+        self.assertEqual(GradeCalculator.calculate_ipk("31001"), 3.43)
+        self.assertEqual(len(GradeManager.get_all_grades_for_student("31001")), 3)
+    
+    def test_input_grade_updates_and_records_history(self):
+        """Test grade updates go to the in-memory audit trail"""
+        success, msg = GradeManager.input_grade("31001", "WEB101", 1, "A", 90)
+        self.assertTrue(success, msg)
+        self.assertIn("updated", msg)
+        
+        history = GradeManager.get_grade_history("31001")
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0]['course_name'], "Pengembangan Web")
+        self.assertEqual(history[0]['old_numeric_grade'], 3.0)
+        self.assertEqual(history[0]['new_numeric_grade'], 4.0)
+    
+    def test_transcript_from_memory(self):
+        """Test transcript assembly over in-memory data"""
+        transcript = GradeCalculator.get_transcript("31001")
+        self.assertEqual(transcript['student']['name'], "ANDI")
+        self.assertEqual(transcript['number_of_semesters'], 2)
+        self.assertEqual(GradeCalculator.get_transcript("31002")['semesters'], [])
+
+
+class TestGradeRecords(DatabaseTestCase):
+    """Test compact grade records used by calculations and transcripts"""
+    
+    def test_record_has_no_instance_dict(self):
+        """Test records use __slots__ and carry no timestamps"""
+        record = GradeManager.get_grade_records("21001")[0]
+        self.assertIsInstance(record, GradeRecord)
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertNotIn('created_at', record.to_dict())
+    
+    def test_records_match_dict_rows(self):
+        """Test records carry the same values as the full dict rows"""
+        rows = GradeManager.get_all_grades_for_student("21001")
+        records = GradeManager.get_grade_records("21001")
+        
+        self.assertEqual(records, [GradeRecord.from_dict(row) for row in rows])
+    
+    def test_semester_filter(self):
+        """Test records can be filtered by semester"""
+        records = GradeManager.get_grade_records("21001", 1)
+        self.assertTrue(records)
+        self.assertTrue(all(r.semester == 1 for r in records))
+    
+    def test_transcript_courses_are_records(self):
+        """Test transcript courses stay records until serialized"""
+        transcript = GradeCalculator.get_transcript("21001")
+        course = transcript['semesters'][0]['courses'][0]
+        self.assertIsInstance(course, GradeRecord)
+        self.assertEqual(course.to_dict()['nim'], "21001")
+
+
+class TestWhatIfSimulator(unittest.TestCase):
+    """Test what-if IPK projections"""
+    
+    def setUp(self):
+        """Use in-memory data so the projections can be checked against real input"""
+        storage = InMemoryStorage(
+            students=[("31001", "ANDI", "Teknik Informatika", 2022)],
+            courses=[("PBO101", "Pemrograman Berorientasi Objek", 3),
+                     ("WEB101", "Pengembangan Web", 4),
+                     ("NET101", "Jaringan Komputer", 3)],
+            grades=[("31001", "PBO101", 1, "C", 2.0, 90),
+                    ("31001", "WEB101", 1, "B", 3.0, 85),
+                    ("31001", "NET101", 1, "E", 0.0, 80)]
+        )
+        self.previous_storage = set_storage(storage)
+        self.simulator = GradeSimulator("31001")
+    
+    def tearDown(self):
+        set_storage(self.previous_storage)
+    
+    def assertMatchesRealInput(self, scenario):
+        """Projection must equal what the calculator reports after entering the grades"""
+        projection = self.simulator.simulate(scenario)
+        for row in scenario:
+            GradeManager.input_grade("31001", row['course_code'],
+                                     row.get('semester', self.simulator.next_semester),
+                                     row['letter_grade'], 90)
+        self.assertEqual(projection['ipk'], GradeCalculator.calculate_ipk("31001"))
+        for semester in projection['semesters']:
+            self.assertEqual(semester['ips'], GradeCalculator.calculate_ips("31001", semester['semester']))
+    
+    def test_no_changes_keeps_current_ipk(self):
+        """Test an empty scenario projects the current IPK"""
+        projection = self.simulator.simulate([])
+        self.assertEqual(projection['ipk'], GradeCalculator.calculate_ipk("31001"))
+        self.assertEqual(projection['ipk'], projection['current_ipk'])
+    
+    def test_retake_takes_highest_grade(self):
+        """Test retaking a course counts only the highest grade"""
+        self.assertMatchesRealInput([{'course_code': 'PBO101', 'letter_grade': 'A'},
+                                     {'course_code': 'NET101', 'letter_grade': 'B'}])
+    
+    def test_lower_retake_does_not_reduce_ipk(self):
+        """Test a worse retake leaves IPK unchanged"""
+        projection = self.simulator.simulate([{'course_code': 'WEB101', 'letter_grade': 'D'}])
+        self.assertEqual(projection['ipk'], projection['current_ipk'])
+    
+    def test_overwrite_same_semester(self):
+        """Test a hypothetical grade for an existing semester replaces that grade"""
+        self.assertMatchesRealInput([{'course_code': 'WEB101', 'letter_grade': 'E', 'semester': 1}])
+    
+    def test_new_course_needs_known_sks(self):
+        """Test courses outside the catalogue need explicit SKS"""
+        with self.assertRaises(ValueError):
+            self.simulator.simulate([{'course_code': 'XYZ999', 'letter_grade': 'A'}])
+        projection = self.simulator.simulate([{'course_code': 'XYZ999', 'letter_grade': 'A', 'sks': 2}])
+        self.assertEqual(projection['semesters'], [{'semester': 2, 'ips': 4.0}])
+    
+    def test_scenarios_are_independent(self):
+        """Test scenarios evaluated together do not leak into each other"""
+        results = self.simulator.simulate_many([
+            [{'course_code': 'PBO101', 'letter_grade': 'A'}],
+            []
+        ])
+        self.assertGreater(results[0]['ipk'], results[1]['ipk'])
+        self.assertEqual(results[1]['ipk'], results[1]['current_ipk'])
+
+
+class TestGradeTargetSolver(unittest.TestCase):
+    """Test minimum-grade solving for graduation predicate targets"""
+    
+    def setUp(self):
+        storage = InMemoryStorage(
+            students=[("31001", "ANDI", "Teknik Informatika", 2022)],
+            courses=[("PBO101", "Pemrograman Berorientasi Objek", 3),
+                     ("WEB101", "Pengembangan Web", 4),
+                     ("NET101", "Jaringan Komputer", 3),
+                     ("SKR401", "Skripsi", 6),
+                     ("KWU201", "Kewirausahaan", 2)],
+            grades=[("31001", "PBO101", 1, "C", 2.0, 90),
+                    ("31001", "WEB101", 1, "B", 3.0, 85),
+                    ("31001", "NET101", 1, "E", 0.0, 80)]
+        )
+        self.previous_storage = set_storage(storage)
+    
+    def tearDown(self):
+        set_storage(self.previous_storage)
+    
+    def brute_force(self, planned, threshold):
+        """Smallest IPK-qualifying grade combination by trying every combination"""
+        best = None
+        letters = ['A', 'B', 'C', 'D']
+        for combo in itertools.product(letters, repeat=len(planned)):
+            simulator = GradeSimulator("31001")
+            projection = simulator.simulate([
+                {'course_code': code, 'letter_grade': letter} for code, letter in zip(planned, combo)
+            ])
+            if projection['ipk'] >= threshold:
+                points = sum(simulator._sks_for(code) * GradeManager.convert_letter_to_numeric(letter)
+                             for code, letter in zip(planned, combo))
+                if best is None or points < best:
+                    best = points
+        return best
+    
+    def test_matches_brute_force(self):
+        """Test the lattice search finds the same minimum as full enumeration"""
+        planned = ['SKR401', 'KWU201', 'NET101']
+        result = GradeTargetSolver.solve("31001", [{'course_code': c} for c in planned])
+        
+        for target in result['targets']:
+            expected = self.brute_force(planned, target['min_ipk'])
+            if expected is None:
+                self.assertFalse(target['achievable'], target['predicate'])
+                continue
+            
+            self.assertTrue(target['achievable'], target['predicate'])
+            points = sum(g['sks'] * GradeManager.convert_letter_to_numeric(g['letter_grade'])
+                         for g in target['grades'])
+            self.assertEqual(points, expected, target['predicate'])
+            projection = GradeSimulator("31001").simulate(
+                [{'course_code': g['course_code'], 'letter_grade': g['letter_grade']} for g in target['grades']]
+            )
+            self.assertEqual(projection['ipk'], target['projected_ipk'])
+    
+    def test_unreachable_target(self):
+        """Test targets out of reach are reported as not achievable"""
+        result = GradeTargetSolver.solve("31001", [{'course_code': 'KWU201'}])
+        cum_laude = result['targets'][0]
+        self.assertEqual(cum_laude['predicate'], 'Cum Laude')
+        self.assertFalse(cum_laude['achievable'])
+        self.assertIsNone(cum_laude['grades'])
+    
+    def test_retake_floor_is_current_grade(self):
+        """Test a planned retake never goes below the grade already earned"""
+        result = GradeTargetSolver.solve("31001", [{'course_code': 'WEB101'}, {'course_code': 'SKR401'}])
+        for target in result['targets']:
+            if target['achievable']:
+                self.assertIn(target['grades'][0]['letter_grade'], ['A', 'B'])
+    
+    def test_cohort_batch(self):
+        """Test batch solving returns one result per student from batched lookups"""
+        expected = GradeTargetSolver.solve("31001", [{'course_code': 'SKR401'}])
+        single_lookups = []
+        originals = (GradeManager.get_grade_records, GradingScaleRegistry.get_scale_for_student)
+        GradeManager.get_grade_records = staticmethod(lambda nim, *args: single_lookups.append(nim))
+        GradingScaleRegistry.get_scale_for_student = staticmethod(lambda nim: single_lookups.append(nim))
+        try:
+            results = GradeTargetSolver.solve_cohort({
+                "31001": [{'course_code': 'SKR401'}],
+                "99999": [{'course_code': 'SKR401'}]
+            })
+        finally:
+            GradeManager.get_grade_records = staticmethod(originals[0])
+            GradingScaleRegistry.get_scale_for_student = staticmethod(originals[1])
+        
+        self.assertEqual(single_lookups, [])
+        self.assertEqual(set(results), {"31001", "99999"})
+        self.assertEqual(results["31001"], expected)
+        self.assertEqual(results["99999"]['current_ipk'], 0.0)
+        self.assertTrue(results["99999"]['targets'][0]['achievable'])
+    
+    def test_course_planned_twice_rejected(self):
+        """Test a plan listing the same course twice is rejected instead of counted twice"""
+        with self.assertRaises(ValueError):
+            GradeTargetSolver.solve("31001", [{'course_code': 'SKR401'}, {'course_code': 'SKR401'}])
+
+
+class TestCohortRanking(unittest.TestCase):
+    """Test cohort IPK ranking index"""
+    
+    def setUp(self):
+        storage = InMemoryStorage(
+            students=[("31001", "ANDI", "Teknik Informatika", 2022),
+                      ("31002", "BUDI", "Teknik Informatika", 2022),
+                      ("31003", "CITRA", "Teknik Informatika", 2022),
+                      ("31004", "DEWI", "Teknik Informatika", 2022),
+                      ("32001", "EKA", "Sistem Informasi", 2022)],
+            courses=[("PBO101", "Pemrograman Berorientasi Objek", 3)],
+            grades=[("31001", "PBO101", 1, "B", 3.0, 90),
+                    ("31002", "PBO101", 1, "A", 4.0, 90),
+                    ("31003", "PBO101", 1, "B", 3.0, 90),
+                    ("32001", "PBO101", 1, "A", 4.0, 90)]
+        )
+        self.previous_storage = set_storage(storage)
+        self.index = CohortRankingIndex()
+    
+    def tearDown(self):
+        set_storage(self.previous_storage)
+    
+    def test_top_k_with_ties(self):
+        """Test top-K ordering; equal IPKs share a rank"""
+        top = self.index.top("Teknik Informatika", 2022, 3)
+        self.assertEqual([t['nim'] for t in top], ["31002", "31001", "31003"])
+        self.assertEqual([t['rank'] for t in top], [1, 2, 2])
+    
+    def test_rank_and_percentile(self):
+        """Test rank and percentile within the cohort only"""
+        rank = self.index.rank_of("31001")
+        self.assertEqual(rank['rank'], 2)
+        self.assertEqual(rank['cohort_size'], 4)
+        self.assertEqual(rank['percentile'], 50.0)
+        self.assertEqual(self.index.rank_of("32001")['cohort_size'], 1)
+        self.assertIsNone(self.index.rank_of("99999"))
+    
+    def test_incremental_update_on_grade_input(self):
+        """Test entering a grade moves the student without a rebuild"""
+        self.index.ensure_built()
+        GradeManager.input_grade("31004", "PBO101", 1, "A", 90)
+        
+        self.assertEqual(self.index.rank_of("31004")['rank'], 1)
+        self.assertEqual(self.index.rank_of("31004")['ipk'], 4.0)
+        self.assertEqual(self.index.rank_of("31001")['rank'], 3)
+    
+    def test_concurrent_updates_keep_newest_ipk(self):
+        """Test an update that read old grades neither blocks lookups nor overwrites a later update"""
+        self.index.ensure_built()
+        read_done = threading.Event()
+        release = threading.Event()
+        load_records = GradeManager.get_grade_records_for_students
+        
+        def slow_load(nims):
+            records = load_records(nims)
+            if not read_done.is_set():
+                read_done.set()
+                release.wait(5)
+            return records
+        
+        try:
+            GradeManager.get_grade_records_for_students = staticmethod(slow_load)
+            with ThreadPoolExecutor(1) as pool:
+                stale = pool.submit(self.index.update, "31001")
+                self.assertTrue(read_done.wait(5))
+                GradeManager.input_grade("31001", "PBO101", 1, "A", 90)
+                # Applied while the stale update is still waiting on its read
+                self.assertEqual(self.index.rank_of("31001")['ipk'], 4.0)
+                release.set()
+                stale.result(5)
+        finally:
+            release.set()
+            GradeManager.get_grade_records_for_students = staticmethod(load_records)
+        
+        self.assertEqual(self.index.rank_of("31001")['ipk'], 4.0)
+        self.assertEqual([t['nim'] for t in self.index.top("Teknik Informatika", 2022, 10)].count("31001"), 1)
+    
+    def test_students_registered_later_are_ranked(self):
+        """Test a student registered after the build is ranked like one present at build time"""
+        self.assertEqual(self.index.rank_of("31004")['ipk'], 0.0)
+        get_storage().students.add_many([("31005", "FAJAR", "Teknik Informatika", 2022)])
+        
+        rank = self.index.rank_of("31005")
+        self.assertEqual((rank['ipk'], rank['rank'], rank['cohort_size']), (0.0, 4, 5))
+        self.assertEqual(rank, {**self.index.rank_of("31004"), 'nim': "31005"})
+
+
+class TestDatabaseIsolation(DatabaseTestCase):
+    """Test per-test database fixtures"""
+    
+    def test_writes_stay_in_this_test(self):
+        """Test a grade written here is not visible after switching databases"""
+        GradeManager.input_grade("21001", "NET101", 1, "B", 90)
+        self.assertIsNotNone(GradeManager.get_grade("21001", "NET101", 1))
+        
+        previous = use_database(":memory:")
+        try:
+            init_database(verbose=False)
+            populate_sample_data(verbose=False)
+            self.assertIsNone(GradeManager.get_grade("21001", "NET101", 1))
+        finally:
+            use_database(*previous)
+    
+    def test_bulk_seed(self):
+        """Test the seed fixture inserts rows in bulk"""
+        self.seed(students=[(f"4{i:04d}", f"S{i}", "Teknik Informatika", 2024) for i in range(200)],
+                  grades=[(f"4{i:04d}", "PBO101", 1, "A", 4.0, 90) for i in range(200)])
+        self.assertEqual(len(get_storage().students.list_all()), 202)
+        self.assertEqual(GradeCalculator.calculate_ipk("40199"), 4.0)
+
+
+class TestGradingScales(DatabaseTestCase):
+    """Test per-program grading scales, raw score conversion and bulk import"""
+    
+    INTERMEDIATE = [('A', 4.0, 85), ('AB', 3.5, 78), ('B', 3.0, 70), ('BC', 2.5, 62),
+                    ('C', 2.0, 55), ('D', 1.0, 40), ('E', 0.0, 0)]
+    
+    def test_default_score_thresholds(self):
+        """Test raw scores map to the default A-E scale at the boundaries"""
+        expected = {100: 'A', 85: 'A', 84.99: 'B', 70: 'B', 55: 'C', 40: 'D', 39.9: 'E', 0: 'E'}
+        for score, letter in expected.items():
+            self.assertEqual(GradeManager.convert_score_to_letter(score), letter, score)
+        with self.assertRaises(ValueError):
+            GradeManager.convert_score_to_letter(100.5)
+    
+    def test_default_conversion_tables(self):
+        """Test the module-level conversion tables follow the default scale"""
+        self.assertEqual(GRADE_CONVERSION, {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'E': 0.0})
+        self.assertEqual(NUMERIC_TO_GRADE, {4.0: 'A', 3.0: 'B', 2.0: 'C', 1.0: 'D', 0.0: 'E'})
+    
+    def test_program_scale_with_intermediate_grades(self):
+        """Test a program's own scale accepts AB/BC while other programs keep A-E"""
+        GradingScaleRegistry.set_scale("Teknik Informatika", self.INTERMEDIATE)
+        
+        self.assertTrue(GradeManager.validate_input("21001", "NET101", "AB", 90, 2, "Teknik Informatika")[0])
+        is_valid, msg = GradeManager.validate_input("21001", "NET101", "AB", 90, 2, "Sistem Informasi")
+        self.assertFalse(is_valid)
+        self.assertIn("A, B, C, D, atau E", msg)
+        self.assertEqual(GradeManager.convert_score_to_letter(80, "Teknik Informatika"), "AB")
+        self.assertEqual(GradeManager.convert_numeric_to_letter(2.5, "Teknik Informatika"), "BC")
+        
+        success, _ = GradeManager.input_grade("21001", "NET101", 2, "AB", 90)
+        self.assertTrue(success)
+        self.assertEqual(GradeManager.get_grade("21001", "NET101", 2)['numeric_grade'], 3.5)
+    
+    def test_cache_invalidated_on_change(self):
+        """Test compiled scales are reused until a scale changes"""
+        first = GradingScaleRegistry.get_scale("Teknik Informatika")
+        self.assertIs(GradingScaleRegistry.get_scale("Teknik Informatika"), first)
+        
+        GradingScaleRegistry.set_scale("Teknik Informatika", self.INTERMEDIATE)
+        self.assertIn("AB", GradingScaleRegistry.get_scale("Teknik Informatika").letters)
+        
+        GradingScaleRegistry.remove_scale("Teknik Informatika")
+        self.assertNotIn("AB", GradingScaleRegistry.get_scale("Teknik Informatika").letters)
+    
+    def test_change_from_another_worker_is_picked_up(self):
+        """Test a scale stored by another process replaces the cached one after the version check"""
+        GradingScaleRegistry.get_scale(DEFAULT_PROGRAM)
+        get_storage().scales.replace(DEFAULT_PROGRAM, [('L', 2.0, 50), ('T', 0.0, 0)])
+        
+        original_interval = GradingScaleRegistry.VERSION_CHECK_INTERVAL
+        GradingScaleRegistry.VERSION_CHECK_INTERVAL = 0
+        try:
+            self.assertEqual(GradingScaleRegistry.get_scale().letters, ('L', 'T'))
+        finally:
+            GradingScaleRegistry.VERSION_CHECK_INTERVAL = original_interval
+    
+    def test_invalid_scale_rejected(self):
+        """Test scales without a 0 threshold or with duplicate thresholds or letters are rejected"""
+        with self.assertRaises(ValueError):
+            GradingScaleRegistry.set_scale("X", [('A', 4.0, 80), ('B', 3.0, 60)])
+        with self.assertRaises(ValueError):
+            GradingScale("X", [('A', 4.0, 80), ('B', 3.0, 80), ('E', 0.0, 0)])
+        with self.assertRaises(ValueError):
+            GradingScaleRegistry.set_scale("X", [('A', 4.0, 80), ('A', 3.5, 70), ('E', 0.0, 0)])
+        self.assertNotIn("X", [scale.program_study for scale in GradingScaleRegistry.list_scales()])
+    
+    def test_convert_scores_matches_single_lookups(self):
+        """Test the batch conversion agrees with per-score conversion"""
+        scale = GradingScale("X", self.INTERMEDIATE)
+        scores = [i / 4 for i in range(401)]
+        self.assertEqual(scale.convert_scores(scores), [scale.letter_for_score(s) for s in scores])
+    
+    def test_bulk_input_grades(self):
+        """Test bulk import converts raw scores, reports invalid rows and stores the rest"""
+        GradingScaleRegistry.set_scale("Teknik Informatika", self.INTERMEDIATE)
+        results = GradeManager.bulk_input_grades([
+            {'nim': "21001", 'course_code': "NET101", 'semester': 2, 'score': 80, 'presence_percentage': 90},
+            {'nim': "21002", 'course_code': "NET101", 'semester': 2, 'letter_grade': "BC"},
+            {'nim': "21002", 'course_code': "PBO101", 'semester': 2, 'score': 120},
+            {'nim': "21001", 'course_code': "PBO101", 'semester': 1, 'score': 60, 'presence_percentage': 50},
+            {'nim': "21001", 'course_code': "WEB101", 'semester': 1, 'score': 90},
+        ])
+        
+        self.assertEqual([ok for ok, _ in results], [True, True, False, False, True])
+        self.assertIn("updated", results[4][1])
+        self.assertEqual(GradeManager.get_grade("21001", "NET101", 2)['letter_grade'], "AB")
+        self.assertEqual(GradeManager.get_grade("21002", "NET101", 2)['numeric_grade'], 2.5)
+        self.assertEqual(GradeManager.get_grade("21001", "WEB101", 1)['letter_grade'], "A")
+        self.assertIsNone(GradeManager.get_grade("21002", "PBO101", 2))
+        self.assertEqual(len(GradeManager.get_grade_history("21001")), 1)
+    
+    def test_bulk_malformed_rows_fail_alone(self):
+        """Test rows with missing or unparseable fields are reported per row, not for the batch"""
+        results = GradeManager.bulk_input_grades([
+            {'nim': "21001", 'course_code': "NET101", 'semester': 2, 'letter_grade': "B"},
+            {'nim': "21002", 'course_code': "NET101", 'semester': "dua", 'letter_grade': "B"},
+            {'nim': "21002", 'course_code': "NET101", 'semester': 2, 'letter_grade': "B",
+             'presence_percentage': "penuh"},
+            {'course_code': "NET101", 'semester': 2, 'letter_grade': "B"},
+            "21002,NET101,2,B",
+        ])
+        
+        self.assertEqual([ok for ok, _ in results], [True, False, False, False, False])
+        self.assertTrue(all("tidak valid" in message for _, message in results[1:]))
+        self.assertEqual(GradeManager.get_grade("21001", "NET101", 2)['letter_grade'], "B")
+        self.assertIsNone(GradeManager.get_grade("21002", "NET101", 2))
+    
+    def test_simulator_uses_program_scale(self):
+        """Test what-if projections accept the program's intermediate grades"""
+        GradingScaleRegistry.set_scale("Teknik Informatika", self.INTERMEDIATE)
+        result = GradeSimulator("21001").simulate([{'course_code': "NET101", 'letter_grade': "AB"}])
+        self.assertEqual(result['ipk'], 3.66)  # (48 + 3 x 3.5) / 16
+
+
+class TestGradeComponents(DatabaseTestCase):
+    """Test component weights, class aggregation and finalizing into grades"""
+    
+    def setUp(self):
+        super().setUp()
+        GradeComponents.set_weights("NET101", {'tugas': 30, 'uts': 30, 'uas': 40})
+        GradeComponents.record_scores("NET101", 2, [
+            ("21001", 'tugas', 90), ("21001", 'uts', 80), ("21001", 'uas', 85),
+            ("21002", 'tugas', 70), ("21002", 'uts', 60), ("21002", 'uas', 50),
+            ("21003", 'tugas', 100), ("21003", 'uts', 100),
+        ])
+    
+    def test_weights_must_sum_to_100(self):
+        """Test invalid weightings are rejected"""
+        with self.assertRaises(ValueError):
+            GradeComponents.set_weights("NET101", {'uts': 50, 'uas': 40})
+        with self.assertRaises(ValueError):
+            GradeComponents.set_weights("NOPE101", {'uas': 100})
+        self.assertEqual(GradeComponents.get_weights("NET101"), {'tugas': 30.0, 'uas': 40.0, 'uts': 30.0})
+    
+    def test_scores_validated(self):
+        """Test unknown components and out-of-range scores store nothing"""
+        with self.assertRaises(ValueError):
+            GradeComponents.record_scores("NET101", 2, [("21001", 'uas', 90), ("21001", 'kuis', 90)])
+        with self.assertRaises(ValueError):
+            GradeComponents.record_scores("NET101", 2, [("21001", 'uas', 101)])
+        self.assertEqual(GradeComponents.compute_class("NET101", 2)[0]['final_score'], 85.0)
+    
+    def test_compute_class(self):
+        """Test weighted final scores, letters and missing components"""
+        results = {row['nim']: row for row in GradeComponents.compute_class("NET101", 2)}
+        
+        self.assertEqual(results["21001"]['final_score'], 85.0)  # 27 + 24 + 34
+        self.assertEqual(results["21001"]['letter_grade'], "A")
+        self.assertEqual(results["21002"]['final_score'], 59.0)  # 21 + 18 + 20
+        self.assertEqual(results["21002"]['letter_grade'], "C")
+        self.assertEqual(results["21003"]['final_score'], 60.0)
+        self.assertEqual(results["21003"]['missing'], ['uas'])
+    
+    def test_finalize_class_feeds_grades(self):
+        """Test finalized grades go through input validation into the grades table"""
+        GradingScaleRegistry.set_scale("Teknik Informatika", TestGradingScales.INTERMEDIATE)
+        result = GradeComponents.finalize_class("NET101", 2, presence={"21002": 60})
+        
+        self.assertEqual(result['stored'], 1)
+        self.assertEqual(GradeManager.get_grade("21001", "NET101", 2)['letter_grade'], "A")
+        self.assertIsNone(GradeManager.get_grade("21002", "NET101", 2))  # Presence below 75%
+        self.assertIn("75%", result['results'][1]['message'])
+        # 21003 has no UAS score yet: nothing is stored until it is entered
+        self.assertIsNone(GradeManager.get_grade("21003", "NET101", 2))
+        self.assertFalse(result['results'][2]['success'])
+        self.assertIn("uas", result['results'][2]['message'])
+        
+        result = GradeComponents.finalize_class("NET101", 2, allow_missing=True)
+        self.assertEqual(result['stored'], 3)
+        # 21003 is not a registered student, so the default A-E scale applies
+        self.assertEqual(GradeManager.get_grade("21003", "NET101", 2)['letter_grade'], "C")
+
+
+class TestCurriculum(DatabaseTestCase):
+    """Test prerequisite graph, eligibility and remaining SKS"""
+    
+    COURSES = [
+        {'course_code': "ALSTD101", 'semester': 1},
+        {'course_code': "PBO101", 'semester': 2, 'prerequisites': ["ALSTD101"]},
+        {'course_code': "DBMS101", 'semester': 2},
+        {'course_code': "WEB101", 'semester': 3, 'prerequisites': ["PBO101", "DBMS101"]},
+        {'course_code': "NET101", 'semester': 3, 'required': False, 'prerequisites': ["ALSTD101"]},
+        {'course_code': "PROJ401", 'semester': 4, 'prerequisites': ["WEB101", "NET101"]},
+    ]
+    
+    def setUp(self):
+        super().setUp()
+        self.seed(students=[("21004", "MAHASISWA BARU", "Teknik Informatika", 2023)],
+                  courses=[("PROJ401", "Proyek Akhir", 6)],
+                  grades=[("21004", "ALSTD101", 1, "A", 4.0, 90), ("21004", "PBO101", 2, "E", 0.0, 80)])
+        Curriculum.set_curriculum("Teknik Informatika", self.COURSES, graduation_sks=20)
+    
+    def test_topological_order(self):
+        """Test courses come after their prerequisites, by suggested semester"""
+        order = [c['course_code'] for c in Curriculum.get_graph("Teknik Informatika").to_dict()['courses']]
+        self.assertEqual(order, ["ALSTD101", "DBMS101", "PBO101", "NET101", "WEB101", "PROJ401"])
+    
+    def test_invalid_curricula_rejected(self):
+        """Test cycles, unknown courses and outside prerequisites store nothing"""
+        with self.assertRaisesRegex(ValueError, "cycle"):
+            Curriculum.set_curriculum("Teknik Informatika", [
+                {'course_code': "PBO101", 'prerequisites': ["WEB101"]},
+                {'course_code': "WEB101", 'prerequisites': ["PBO101"]}])
+        with self.assertRaises(ValueError):
+            Curriculum.set_curriculum("Teknik Informatika", [{'course_code': "NOPE101"}])
+        with self.assertRaises(ValueError):
+            Curriculum.set_curriculum("Teknik Informatika", [
+                {'course_code': "PBO101", 'prerequisites': ["ALSTD101"]}])
+        self.assertEqual(len(Curriculum.get_graph("Teknik Informatika").order), 6)
+    
+    def test_student_eligibility(self):
+        """Test eligible/blocked courses, failed courses and remaining SKS"""
+        result = Curriculum.check_student("21004")
+        
+        # PBO101 was failed (E), so it can be taken again and WEB101 stays blocked
+        self.assertEqual(result['eligible'], ["DBMS101", "PBO101", "NET101"])
+        self.assertEqual(result['blocked'], {"WEB101": ["DBMS101", "PBO101"],
+                                             "PROJ401": ["DBMS101", "PBO101", "NET101", "WEB101"]})
+        self.assertEqual(result['remaining_required'], ["DBMS101", "PBO101", "WEB101", "PROJ401"])
+        self.assertEqual(result['earned_sks'], 3)
+        self.assertEqual(result['remaining_sks'], 17)
+        
+        advanced = Curriculum.check_student("21001")
+        self.assertEqual(advanced['eligible'], ["NET101"])
+        self.assertEqual(advanced['remaining_sks'], 7)
+    
+    def test_unknown_curriculum(self):
+        """Test students without a curriculum get None"""
+        self.seed(students=[("51001", "X", "Sistem Informasi", 2023)])
+        self.assertIsNone(Curriculum.check_student("51001"))
+        self.assertIsNone(Curriculum.check_student("99999"))
+    
+    def test_check_all_matches_per_student(self):
+        """Test the batch check gives the same answer as checking each student"""
+        self.seed(students=[(f"6{i:04d}", f"S{i}", "Teknik Informatika", 2022) for i in range(50)],
+                  grades=[(f"6{i:04d}", code, 1, "C" if i % 3 else "E", 2.0 if i % 3 else 0.0, 80)
+                          for i in range(50) for code in ("ALSTD101", "DBMS101")[:1 + i % 2]])
+        batch = Curriculum.check_all("Teknik Informatika")
+        self.assertEqual(len(batch), 53)
+        for result in batch:
+            self.assertEqual(result, Curriculum.check_student(result['nim']))
+
+
+class TestAcademicStanding(DatabaseTestCase):
+    """Test the academic standing rules and the batch evaluator"""
+    
+    def setUp(self):
+        super().setUp()
+        self.seed(
+            students=[("71001", "PROBATION", "Teknik Informatika", 2023),
+                      ("71002", "LEWAT MASA STUDI", "Teknik Informatika", 2017),
+                      ("71003", "TAHUN TERAKHIR", "Teknik Informatika", 2018),
+                      ("71004", "BANYAK GAGAL", "Teknik Informatika", 2023)],
+            grades=[("71001", "PBO101", 2, "E", 0.0, 80), ("71001", "DBMS101", 2, "E", 0.0, 80),
+                    ("71001", "WEB101", 2, "D", 1.0, 80), ("71001", "NET101", 2, "C", 2.0, 80),
+                    ("71004", "PBO101", 1, "E", 0.0, 80), ("71004", "DBMS101", 1, "E", 0.0, 80),
+                    ("71004", "WEB101", 1, "E", 0.0, 80), ("71004", "ALSTD101", 2, "A", 4.0, 80)])
+    
+    def test_rules(self):
+        """Test probation, failed-course warning and study period limits"""
+        summary = AcademicStanding.evaluate_all(StandingRules(), as_of_year=2024)
+        self.assertEqual(summary['evaluated'], 6)
+        self.assertEqual(summary['standings'], {'good': 2, 'warning': 2, 'probation': 1,
+                                                'study_period_exceeded': 1})
+        
+        probation = AcademicStanding.get_standing("71001")
+        self.assertEqual(probation['standing'], 'probation')
+        self.assertEqual(probation['ips'], 1.43)  # (4 x 1 + 3 x 2) / 7, semester 2
+        self.assertEqual(probation['failed_courses'], 2)
+        
+        self.assertEqual(AcademicStanding.get_standing("71002")['standing'], 'study_period_exceeded')
+        self.assertEqual(AcademicStanding.get_standing("71003")['standing'], 'warning')
+        self.assertEqual(AcademicStanding.get_standing("71004")['standing'], 'warning')
+        self.assertEqual(AcademicStanding.get_standing("21001")['reasons'], [])
+    
+    def test_history_records_only_changes(self):
+        """Test re-running stores changes only, and a recovered student moves back to good"""
+        AcademicStanding.evaluate_all(as_of_year=2024)
+        self.assertEqual(AcademicStanding.evaluate_all(as_of_year=2024)['changed'], 0)
+        
+        GradeManager.input_grade("71001", "PBO101", 3, "A", 90)
+        summary = AcademicStanding.evaluate_all(as_of_year=2024)
+        self.assertEqual(summary['changed'], 1)
+        
+        standing = AcademicStanding.get_standing("71001")
+        self.assertEqual(standing['standing'], 'good')
+        self.assertEqual([(h['old_standing'], h['new_standing']) for h in standing['history']],
+                         [('probation', 'good'), (None, 'probation')])
+    
+    def test_unevaluated_student(self):
+        """Test students never evaluated have no standing"""
+        self.assertIsNone(AcademicStanding.get_standing("71001"))
+
+
+class TestTranscriptSnapshots(DatabaseTestCase):
+    """Test semester-close snapshots and frozen transcript versions"""
+    
+    def test_snapshot_matches_live_transcript(self):
+        """Test a transcript served from a snapshot equals the live computation"""
+        live = GradeCalculator.get_transcript("21001")
+        self.assertIsNone(live['snapshot'])
+        
+        result = GradeCalculator.close_semester(1)
+        self.assertEqual(result, {'semester': 1, 'snapshots': 2, 'unchanged': 0})
+        
+        frozen = GradeCalculator.get_transcript("21001")
+        self.assertEqual(frozen['snapshot']['version'], 1)
+        self.assertEqual(frozen['snapshot']['closed_semester'], 1)
+        self.assertEqual(frozen['semesters'], live['semesters'])
+        self.assertIsInstance(frozen['semesters'][0]['courses'][0], GradeRecord)
+        for key in ('total_sks', 'ipk', 'graduation_predicate', 'number_of_semesters'):
+            self.assertEqual(frozen[key], live[key])
+    
+    def test_closed_semester_is_frozen(self):
+        """Test later changes to a closed semester don't alter the transcript, open ones do"""
+        GradeCalculator.close_semester(1)
+        GradeManager.input_grade("21001", "WEB101", 1, "E", 90)
+        GradeManager.input_grade("21001", "NET101", 2, "A", 90)
+        
+        transcript = GradeCalculator.get_transcript("21001")
+        self.assertEqual([s['semester'] for s in transcript['semesters']], [1, 2])
+        web = [c for c in transcript['semesters'][0]['courses'] if c.course_code == "WEB101"][0]
+        self.assertEqual(web.letter_grade, "B")
+        self.assertEqual(transcript['semesters'][1]['ips'], 4.0)
+        self.assertEqual(transcript['total_sks'], 16)
+        self.assertEqual(transcript['ipk'], 3.75)  # (3x4 + 3x4 + 4x3 + 3x4 + 3x4) / 16
+    
+    def test_versions(self):
+        """Test closing again stores only changed transcripts as new versions"""
+        GradeCalculator.close_semester(1)
+        self.assertEqual(GradeCalculator.close_semester(1)['unchanged'], 2)
+        
+        GradeManager.input_grade("21001", "WEB101", 1, "A", 90)
+        iter_all_grade_records = GradeManager.iter_all_grade_records
+        GradeManager.iter_all_grade_records = staticmethod(lambda: self.fail("Streamed every grade"))
+        try:
+            # Only the requested students' grades are loaded
+            self.assertEqual(GradeCalculator.close_semester(1, nims=["21001", "99999"]),
+                             {'semester': 1, 'snapshots': 1, 'unchanged': 0})
+        finally:
+            GradeManager.iter_all_grade_records = staticmethod(iter_all_grade_records)
+        
+        versions = GradeCalculator.list_transcript_versions("21001")
+        self.assertEqual([v['version'] for v in versions], [2, 1])
+        self.assertNotIn('content', versions[0])
+        self.assertNotEqual(versions[0]['content_hash'], versions[1]['content_hash'])
+        
+        self.assertEqual(GradeCalculator.get_transcript("21001")['ipk'], 4.0)
+        self.assertEqual(GradeCalculator.get_transcript_version("21001", 1)['ipk'], 3.69)
+        self.assertEqual(GradeCalculator.get_transcript_version("21001", 3), {})
+
+
+class TestTranscriptVerification(DatabaseTestCase):
+    """Test signed verification tokens for printed transcripts"""
+    
+    def setUp(self):
+        super().setUp()
+        self.signer = TranscriptSigner("test-key", "https://akademik.example.ac.id/")
+    
+    def test_verify_snapshot_token(self):
+        """Test a token for a closed transcript verifies by hash lookup"""
+        GradeCalculator.close_semester(1)
+        transcript = GradeCalculator.get_transcript("21001")
+        token = self.signer.token_for(transcript)
+        self.assertEqual(token.split('.')[0], transcript['snapshot']['content_hash'])
+        self.assertTrue(self.signer.verify_url(token).startswith("https://akademik.example.ac.id/verify/"))
+        
+        result = self.signer.verify(token)
+        self.assertTrue(result['valid'])
+        self.assertEqual((result['nim'], result['version'], result['latest_version']), ("21001", 1, 1))
+        self.assertEqual(result['ipk'], transcript['ipk'])
+        
+        GradeManager.input_grade("21001", "WEB101", 1, "A", 90)
+        GradeCalculator.close_semester(1)
+        self.assertEqual(self.signer.verify(token)['latest_version'], 2)
+    
+    def test_rejects_forged_tokens(self):
+        """Test tampered, foreign-key and unknown-hash tokens are rejected"""
+        GradeCalculator.close_semester(1)
+        token = self.signer.token_for(GradeCalculator.get_transcript("21001"))
+        content_hash, signature = token.split('.')
+        
+        self.assertIsNone(self.signer.verify(f"{content_hash}.{'0' * len(signature)}"))
+        self.assertIsNone(TranscriptSigner("other-key").verify(token))
+        self.assertIsNone(self.signer.verify(self.signer.sign("f" * 64)))
+        self.assertIsNone(self.signer.verify("tidak-valid"))
+        self.assertIsNone(self.signer.verify(f"{content_hash}.é"))
+    
+    def test_provisional_transcript_has_no_token(self):
+        """Test transcripts with grades after the closed semester aren't signed"""
+        self.assertIsNone(self.signer.token_for(GradeCalculator.get_transcript("21001")))
+        GradeCalculator.close_semester(1)
+        GradeManager.input_grade("21001", "NET101", 2, "A", 90)
+        self.assertIsNone(self.signer.token_for(GradeCalculator.get_transcript("21001")))
+    
+    def test_signed_pdf(self):
+        """Test PDFs render with the QR code and with the provisional note"""
+        output_dir = tempfile.mkdtemp()
+        try:
+            generator = TranscriptGenerator(output_dir, self.signer)
+            GradeCalculator.close_semester(1)
+            self.assertTrue(os.path.getsize(generator.generate_transcript("21001", "signed.pdf")) > 0)
+            GradeManager.input_grade("21001", "NET101", 2, "A", 90)
+            self.assertTrue(os.path.getsize(generator.generate_transcript("21001", "provisional.pdf")) > 0)
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+
+class TestAsyncApp(unittest.TestCase):
+    """Test the ASGI entry point: bounded executor and coalesced identical reads"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.previous_database = (database.DATABASE_FILE, database.SNAPSHOT_FILE)
+        self.asgi_app = create_asgi_app({
+            'TESTING': True,
+            'DATABASE_FILE': os.path.join(self.tmp_dir, "app.db"),
+            'SNAPSHOT_FILE': os.path.join(self.tmp_dir, "snapshot.db"),
+            'DB_POOL_SIZE': 2,
+            'TRANSCRIPT_DIR': os.path.join(self.tmp_dir, "pdf")
+        })
+        init_database(verbose=False)
+        populate_sample_data(verbose=False)
+    
+    def tearDown(self):
+        self.asgi_app.executor.shutdown(wait=True)
+        extensions = self.asgi_app.app.extensions['transcript_system']
+        GradeManager.remove_change_listener(extensions['change_broker'].publish)
+        database.configure(pool_size=0)
+        use_database(*self.previous_database)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    async def request(self, method, path, body=b'', query=b''):
+        """Drive one HTTP request through the ASGI interface"""
+        messages = []
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+                 'headers': [(b'content-type', b'application/json')]}
+        
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        
+        async def send(message):
+            messages.append(message)
+        
+        await self.asgi_app(scope, receive, send)
+        return messages[0]['status'], json.loads(messages[1]['body'])
+    
+    def test_read_endpoints(self):
+        """Test read endpoints answer like the Flask app"""
+        async def run():
+            return await asyncio.gather(
+                self.request('GET', '/api/transcript/21001'),
+                self.request('GET', '/api/calculator/ipk/21001'),
+                self.request('GET', '/api/grades/21002', query=b'semester=1'),
+                self.request('GET', '/api/transcript/99999'))
+        transcript, ipk, grades, missing = asyncio.run(run())
+        
+        self.assertEqual(transcript[0], 200)
+        self.assertEqual(transcript[1]['ipk'], ipk[1]['ipk'])
+        self.assertEqual(len(grades[1]), 4)
+        self.assertEqual(missing[0], 404)
+    
+    def test_identical_requests_coalesce(self):
+        """Test concurrent identical reads share one computation; writes never do"""
+        async def run():
+            return await asyncio.gather(*[self.request('GET', '/api/transcript/21001') for _ in range(20)])
+        responses = asyncio.run(run())
+        
+        self.assertEqual(self.asgi_app.coalesced, 19)
+        self.assertTrue(all(response == responses[0] for response in responses))
+        
+        body = json.dumps({'nim': "21001", 'course_code': "NET101", 'semester': 2,
+                           'letter_grade': "A"}).encode()
+        async def write():
+            return await asyncio.gather(*[self.request('POST', '/api/grade', body) for _ in range(2)])
+        asyncio.run(write())
+        self.assertEqual(self.asgi_app.coalesced, 19)
+        self.assertEqual(self.asgi_app.requests, 22)
+    
+    def test_grade_stream(self):
+        """Test the SSE stream is served on the event loop and pushes stored grades"""
+        messages = []
+        
+        async def run():
+            disconnect = asyncio.Event()
+            received = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            
+            async def receive():
+                if received:
+                    return received.pop()
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+            
+            async def send(message):
+                messages.append(message)
+                if b'event: grade' in message.get('body', b''):
+                    disconnect.set()
+            
+            scope = {'type': 'http', 'method': 'GET', 'path': '/api/stream/grades',
+                     'query_string': b'nim=21001', 'headers': []}
+            stream = asyncio.ensure_future(self.asgi_app(scope, receive, send))
+            broker = self.asgi_app.app.extensions['transcript_system']['change_broker']
+            while broker.stats()['subscribers'] == 0:
+                await asyncio.sleep(0.001)
+            
+            body = json.dumps({'nim': "21001", 'course_code': "NET101", 'semester': 2,
+                               'letter_grade': "A"}).encode()
+            await self.request('POST', '/api/grade', body)
+            await asyncio.wait_for(stream, 5)
+            return broker.stats()
+        
+        stats = asyncio.run(run())
+        self.assertEqual(messages[0]['headers'][0], (b'content-type', b'text/event-stream; charset=utf-8'))
+        event = json.loads(messages[-1]['body'].decode().split("data: ")[1])
+        self.assertEqual((event['nim'], event['course_code'], event['letter_grade']), ("21001", "NET101", "A"))
+        self.assertEqual(stats['subscribers'], 0)
+
+
+class TestSingleFlight(DatabaseTestCase):
+    """Test concurrent identical computations share one execution"""
+    
+    def run_concurrently(self, flight, function, followers=4):
+        """Start a leader, wait until followers join it, then let it finish"""
+        started = threading.Event()
+        release = threading.Event()
+        
+        def leader_function():
+            started.set()
+            release.wait(5)
+            return function()
+        
+        with ThreadPoolExecutor(followers + 1) as pool:
+            futures = [pool.submit(flight.do, "key", leader_function)]
+            started.wait(5)
+            futures += [pool.submit(flight.do, "key", function) for _ in range(followers)]
+            while flight.metrics()['coalesced'] < followers:
+                time.sleep(0.001)
+            release.set()
+            return futures
+    
+    def test_followers_share_result(self):
+        """Test callers arriving during a computation get its result object"""
+        flight = SingleFlight("test")
+        futures = self.run_concurrently(flight, lambda: ["hasil"])
+        results = [future.result() for future in futures]
+        
+        self.assertTrue(all(result is results[0] for result in results))
+        metrics = flight.metrics()
+        self.assertEqual((metrics['calls'], metrics['executions'], metrics['coalesced']), (5, 1, 4))
+        self.assertEqual((metrics['max_waiters'], metrics['in_flight']), (4, 0))
+        
+        flight.do("key", lambda: None)
+        self.assertEqual(flight.metrics()['executions'], 2)  # Finished calls aren't cached
+    
+    def test_followers_share_error(self):
+        """Test an exception reaches every caller of the shared execution"""
+        flight = SingleFlight("test")
+        
+        def fail():
+            raise ValueError("gagal")
+        
+        for future in self.run_concurrently(flight, fail):
+            with self.assertRaises(ValueError):
+                future.result()
+        self.assertEqual(flight.metrics()['errors'], 1)
+    
+    def test_calculator_metrics(self):
+        """Test GradeCalculator counts transcript and IPK calls per layer"""
+        before = GradeCalculator.flight_metrics()
+        GradeCalculator.get_transcript("21001")
+        GradeCalculator.calculate_ipk("21001")
+        after = GradeCalculator.flight_metrics()
+        
+        for name in ('get_transcript', 'calculate_ipk'):
+            self.assertEqual(after[name]['executions'] - before[name]['executions'], 1)
+        self.assertEqual(GradeCalculator.calculate_ipk("21001"), 3.69)
+    
+    def test_write_during_computation_starts_new_flight(self):
+        """Test callers after a grade write don't join an IPK computation that read the old grades"""
+        index = CohortRankingIndex()
+        index.build()
+        read_done = threading.Event()
+        release = threading.Event()
+        compute_ipk = GradeCalculator._compute_ipk
+        
+        def slow_compute(nim):
+            records = GradeManager.get_grade_records(nim)
+            if not read_done.is_set():
+                read_done.set()
+                release.wait(5)
+            return GradeCalculator._ipk_from_records(records)
+        
+        try:
+            GradeCalculator._compute_ipk = staticmethod(slow_compute)
+            with ThreadPoolExecutor(2) as pool:
+                before = pool.submit(GradeCalculator.calculate_ipk, "21001")
+                read_done.wait(5)
+                GradeManager.input_grade("21001", "WEB101", 1, "A", 90)
+                self.assertEqual(index.rank_of("21001")['ipk'], 4.0)  # Recomputed from the change log
+                after = pool.submit(GradeCalculator.calculate_ipk, "21001").result(5)
+                release.set()
+                self.assertEqual((before.result(5), after), (3.69, 4.0))
+        finally:
+            release.set()
+            GradeCalculator._compute_ipk = staticmethod(compute_ipk)
+    
+    
+    def test_write_generations_stay_bounded(self):
+        """Test write generations use a fixed table however many students are written"""
+        before = GradeManager.write_generation("21001")
+        rows = [{'nim': f"9{i:05d}", 'course_code': "WEB101", 'semester': 1, 'letter_grade': "A",
+                 'presence_percentage': 90} for i in range(5000)]
+        self.assertTrue(all(ok for ok, _ in GradeManager.bulk_input_grades(rows)))
+        GradeManager.input_grade("21001", "WEB101", 1, "A", 90)
+        
+        self.assertGreater(GradeManager.write_generation("21001"), before)
+        self.assertEqual(len(grade_manager._write_generations), grade_manager._GENERATION_STRIPES)
+
+class TestChangeFeed(DatabaseTestCase):
+    """Test the grade change broker and its SSE formatting"""
+    
+    def setUp(self):
+        super().setUp()
+        self.broker = ChangeBroker()
+        GradeManager.add_change_listener(self.broker.publish)
+    
+    def tearDown(self):
+        GradeManager.remove_change_listener(self.broker.publish)
+        super().tearDown()
+    
+    def test_subscriptions_filter_events(self):
+        """Test subscribers get only their student's or course's changes"""
+        by_nim = self.broker.subscribe(nim="21001")
+        by_course = self.broker.subscribe(course_code="NET101")
+        everything = self.broker.subscribe()
+        
+        GradeManager.input_grade("21001", "NET101", 2, "A", 90)
+        GradeManager.input_grade("21002", "WEB101", 1, "A", 90)
+        
+        event = by_nim.get(0)
+        self.assertEqual((event['nim'], event['course_code'], event['letter_grade']), ("21001", "NET101", "A"))
+        self.assertIsNone(by_nim.get(0))
+        self.assertEqual(by_course.get(0)['id'], event['id'])
+        self.assertIsNone(by_course.get(0))
+        self.assertEqual([everything.get(0)['nim'], everything.get(0)['nim']], ["21001", "21002"])
+        self.assertTrue(self.broker.subscribe(nim="21002").matches({'nim': "21002", 'course_code': "X"}))
+    
+    def test_slow_subscriber_gets_resync(self):
+        """Test a full queue collapses into one resync event, then delivery resumes"""
+        broker = ChangeBroker(queue_size=2)
+        subscription = broker.subscribe()
+        for course_code in ("PBO101", "DBMS101", "WEB101"):
+            broker.publish({'nim': "21001", 'course_code': course_code, 'semester': 1,
+                            'letter_grade': "A", 'numeric_grade': 4.0})
+        
+        self.assertIs(subscription.get(0), RESYNC)
+        self.assertIsNone(subscription.get(0))
+        self.assertEqual(subscription.dropped, 1)
+        broker.publish({'nim': "21001", 'course_code': "NET101", 'semester': 1,
+                        'letter_grade': "A", 'numeric_grade': 4.0})
+        self.assertEqual(subscription.get(0)['course_code'], "NET101")
+    
+    def test_resume_from_last_event_id(self):
+        """Test reconnecting clients replay kept events or are told to resync"""
+        broker = ChangeBroker(history_size=2)
+        for semester in (1, 2, 3):
+            broker.publish({'nim': "21001", 'course_code': "PBO101", 'semester': semester,
+                            'letter_grade': "A", 'numeric_grade': 4.0})
+        
+        resumed = broker.subscribe(nim="21001", last_event_id=2)
+        self.assertEqual(resumed.get(0)['id'], 3)
+        self.assertIsNone(resumed.get(0))
+        self.assertIs(broker.subscribe(last_event_id=0).get(0), RESYNC)  # Event 1 no longer kept
+        self.assertIs(broker.subscribe(last_event_id=50).get(0), RESYNC)  # Ids from before a restart
+    
+    def test_wsgi_stream(self):
+        """Test the SSE text stream and unsubscribing when it is closed"""
+        events = stream_events(self.broker.subscribe(nim="21001"), heartbeat=0.01)
+        self.assertEqual(next(events), "retry: 3000\n\n")
+        self.assertEqual(next(events), ": keep-alive\n\n")
+        
+        GradeManager.input_grade("21001", "NET101", 2, "B", 90)
+        message = next(events)
+        self.assertTrue(message.startswith("id: 1\nevent: grade\ndata: "))
+        self.assertEqual(json.loads(message.split("data: ")[1])['letter_grade'], "B")
+        
+        events.close()
+        self.assertEqual(self.broker.stats(), {'published': 1, 'subscribers': 0})
+        self.assertEqual(format_sse(RESYNC), "event: resync\ndata: {}\n\n")
+
+
+class TestChangeLog(DatabaseTestCase):
+    """Test the grade change-data-capture log and consumer offsets"""
+    
+    def test_writes_are_logged_in_order(self):
+        """Test inserts and updates are logged with increasing ids and old values"""
+        batch = ChangeLog.read()
+        self.assertFalse(batch['has_more'])
+        self.assertTrue(batch['changes'])
+        self.assertTrue(all(change['operation'] == 'insert' for change in batch['changes']))
+        ids = [change['change_id'] for change in batch['changes']]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(batch['next_offset'], ids[-1])
+        
+        GradeManager.input_grade("21001", "WEB101", 1, "A", 90)
+        changes = ChangeLog.read(since=batch['next_offset'])['changes']
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0]['operation'], 'update')
+        self.assertEqual((changes[0]['nim'], changes[0]['course_code'], changes[0]['semester']),
+                         ("21001", "WEB101", 1))
+        self.assertEqual((changes[0]['old_letter_grade'], changes[0]['letter_grade']), ("B", "A"))
+    
+    def test_raw_sql_writes_are_logged(self):
+        """Test writes that bypass the repositories still reach the log"""
+        latest = ChangeLog.read()['next_offset']
+        with get_connection() as conn:
+            conn.execute("DELETE FROM grades WHERE nim = '21002'")
+            conn.commit()
+        changes = ChangeLog.read(since=latest)['changes']
+        self.assertTrue(changes)
+        self.assertTrue(all(c['operation'] == 'delete' and c['nim'] == "21002" for c in changes))
+    
+    def test_paging(self):
+        """Test limit splits the log into batches that resume at next_offset"""
+        first = ChangeLog.read(limit=5)
+        self.assertEqual(len(first['changes']), 5)
+        self.assertTrue(first['has_more'])
+        second = ChangeLog.read(since=first['next_offset'], limit=5)
+        self.assertEqual(second['changes'][0]['change_id'], first['next_offset'] + 1)
+    
+    def test_consumer_offsets(self):
+        """Test consumers poll from their committed offset and report lag"""
+        batch = ChangeLog.poll("finance", limit=3)
+        self.assertEqual(batch['offset'], 0)
+        latest = ChangeLog.read(limit=10000)['next_offset']
+        
+        ChangeLog.commit("finance", batch['next_offset'])
+        self.assertEqual(ChangeLog.poll("finance")['offset'], 3)
+        self.assertEqual(ChangeLog.consumers(),
+                         [{'consumer': "finance", 'last_change_id': 3,
+                           'updated_at': ChangeLog.consumers()[0]['updated_at'], 'lag': latest - 3}])
+        
+        ChangeLog.commit("finance", latest)
+        self.assertEqual(ChangeLog.poll("finance")['changes'], [])
+        with self.assertRaises(ValueError):
+            ChangeLog.commit("finance", latest + 1)
+        with self.assertRaises(ValueError):
+            ChangeLog.commit(" ", 0)
+    
+    def test_in_memory_log(self):
+        """Test the in-memory repositories log the same operations"""
+        previous = set_storage(InMemoryStorage(
+            students=[("31001", "ANDI", "Teknik Informatika", 2022)],
+            courses=[("PBO101", "Pemrograman Berorientasi Objek", 3)],
+            grades=[("31001", "PBO101", 1, "B", 3.0, 85)]))
+        try:
+            GradeManager.input_grade("31001", "PBO101", 1, "A", 90)
+            changes = ChangeLog.read()['changes']
+            self.assertEqual([c['operation'] for c in changes], ['insert', 'update'])
+            self.assertEqual([c['change_id'] for c in changes], [1, 2])
+            self.assertEqual(changes[1]['old_letter_grade'], "B")
+            
+            ChangeLog.commit("alumni", 1)
+            self.assertEqual(ChangeLog.consumers()[0]['lag'], 1)
+        finally:
+            set_storage(previous)
+    
+    def test_ranking_index_follows_log(self):
+        """Test the ranking index applies grade changes written outside this process"""
+        index = CohortRankingIndex()
+        self.assertEqual(index.rank_of("21001")['ipk'], 3.69)
+        
+        # Another worker's write only reaches this process through the change log
+        with get_connection() as conn:
+            conn.execute("UPDATE grades SET letter_grade = 'A', numeric_grade = 4.0 WHERE nim = '21001'")
+            conn.commit()
+        self.assertEqual(index.rank_of("21001")['ipk'], 4.0)
+        self.assertEqual(index.catch_up(), 0)
+
+
+class TestGroupCommit(DatabaseTestCase):
+    """Test concurrent grade input committed in groups by one writer thread"""
+    
+    def tearDown(self):
+        GradeManager.disable_group_commit()
+        super().tearDown()
+    
+    def test_concurrent_inputs_share_commits(self):
+        """Test every concurrent submission is stored and gets its own result"""
+        self.seed(courses=[(f"MK{i:02d}", f"Mata Kuliah {i}", 3) for i in range(40)])
+        GradeManager.enable_group_commit(max_delay=0.05)
+        
+        def submit(i):
+            return GradeManager.input_grade("21002", f"MK{i:02d}", 3, "ABCDE"[i % 5], 90)
+        
+        with ThreadPoolExecutor(max_workers=40) as executor:
+            results = list(executor.map(submit, range(40)))
+        
+        self.assertTrue(all(success for success, _ in results))
+        self.assertEqual(results[7][1], "Grade inserted: C (2.0)")
+        self.assertEqual(len(GradeManager.get_grade_records("21002", 3)), 40)
+        metrics = GradeManager.group_commit_metrics()
+        self.assertEqual(metrics['writes'], 40)
+        self.assertLess(metrics['commits'], 40)
+        
+        success, msg = GradeManager.input_grade("21002", "MK00", 3, "B", 90)
+        self.assertEqual((success, msg), (True, "Grade updated: B (3.0)"))
+        self.assertEqual(len(GradeManager.get_grade_history("21002")), 1)
+    
+    def test_failing_row_rolls_back_alone(self):
+        """Test a row that fails in a group doesn't undo the others"""
+        writer = GroupCommitWriter(max_delay=0.2)
+        try:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                good = executor.submit(writer.save, get_storage(), ("21002", "NET101", 3, "A", 4.0, 90))
+                bad = executor.submit(writer.save, get_storage(), ("21002", "WEB101", 3, None, 4.0, 90))
+                self.assertFalse(good.result())
+                with self.assertRaises(sqlite3.IntegrityError):
+                    bad.result()
+        finally:
+            writer.close()
+        
+        self.assertEqual(writer.metrics()['commits'], 1)
+        self.assertEqual([r.course_code for r in GradeManager.get_grade_records("21002", 3)], ["NET101"])
+    
+    def test_disable_stores_queued_writes(self):
+        """Test closing the writer stores what was queued and rejects new writes"""
+        writer = GroupCommitWriter(max_delay=10)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(writer.save, get_storage(), ("21002", "NET101", 3, "A", 4.0, 90))
+            time.sleep(0.05)  # Queued, well inside the 10 s window
+            writer.close()
+            self.assertFalse(pending.result())
+        with self.assertRaises(RuntimeError):
+            writer.save(get_storage(), ("21002", "NET101", 4, "A", 4.0, 90))
+    
+    def test_input_after_writer_closed_stores_directly(self):
+        """Test a grade whose writer is closed mid-call (group commit being disabled) is still stored"""
+        writer = GradeManager.enable_group_commit()
+        writer.close()  # As disable_group_commit() would, after input_grade() read the writer
+        
+        self.assertEqual(GradeManager.input_grade("21002", "NET101", 3, "A", 90), (True, "Grade inserted: A (4.0)"))
+        self.assertEqual(GradeManager.get_grade("21002", "NET101", 3)['letter_grade'], "A")
+        self.assertEqual(writer.metrics()['writes'], 0)
+
+
+class TestSharding(unittest.TestCase):
+    """Test grades and grade history sharded across SQLite files"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.previous_database = use_database(os.path.join(self.tmp_dir, "main.db"))
+        self.shard_files = [os.path.join(self.tmp_dir, f"shard{i}.db") for i in range(3)]
+        self.router = use_shards(self.shard_files)
+        init_database(verbose=False)
+        populate_sample_data(verbose=False)
+    
+    def tearDown(self):
+        GradeManager.disable_group_commit()
+        use_shards(None)
+        use_database(*self.previous_database)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def grade_count(self, database_file, nim=None):
+        conn = sqlite3.connect(database_file)
+        try:
+            if nim is None:
+                return conn.execute("SELECT COUNT(*) FROM grades").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM grades WHERE nim = ?", (nim,)).fetchone()[0]
+        finally:
+            conn.close()
+    
+    def test_students_live_on_one_shard(self):
+        """Test each student's grades are stored only on their shard"""
+        self.assertEqual(self.grade_count(os.path.join(self.tmp_dir, "main.db")), 0)
+        for nim in ("21001", "21002", "21003"):
+            home = self.router.shard_for(nim)
+            self.assertEqual(self.grade_count(home, nim), 4)
+            for shard_file in self.shard_files:
+                if shard_file != home:
+                    self.assertEqual(self.grade_count(shard_file, nim), 0)
+    
+    def test_per_student_operations(self):
+        """Test input, calculation and audit trail route to the student's shard"""
+        self.assertEqual(GradeCalculator.calculate_ipk("21001"), 3.69)
+        self.assertEqual(GradeCalculator.get_transcript("21001")['semesters'][0]['courses'][0].course_name,
+                         "Algoritma dan Struktur Data")
+        
+        success, msg = GradeManager.input_grade("21001", "WEB101", 1, "A", 90)
+        self.assertTrue(success, msg)
+        self.assertEqual(GradeCalculator.calculate_ipk("21001"), 4.0)
+        self.assertEqual(GradeManager.get_grade_history("21001")[0]['course_name'], "Pengembangan Web")
+        
+        with use_shard(self.router.shard_for("21001")):
+            changes = ChangeLog.read()['changes']
+        self.assertEqual(changes[-1]['operation'], 'update')
+    
+    def test_cohort_queries_merge_shards(self):
+        """Test cohort-wide reads see every shard, in NIM order"""
+        records = list(GradeManager.iter_all_grade_records())
+        self.assertEqual(len(records), 12)
+        keys = [(r.nim, r.semester, r.course_code) for r in records]
+        self.assertEqual(keys, sorted(keys))
+        
+        self.assertEqual(GradeCalculator.close_semester(1),
+                         {'semester': 1, 'snapshots': 2, 'unchanged': 0})
+        transcripts = GradeCalculator.get_batch_transcripts(["21002", "21001"], use_snapshot=False)
+        self.assertEqual(list(transcripts), ["21002", "21001"])
+        self.assertEqual(transcripts["21001"]['snapshot']['version'], 1)
+    
+    def test_bulk_and_group_commit_writes(self):
+        """Test bulk input and group commit split their writes by shard"""
+        results = GradeManager.bulk_input_grades([
+            {'nim': "21001", 'course_code': "NET101", 'semester': 2, 'letter_grade': "A"},
+            {'nim': "21002", 'course_code': "NET101", 'semester': 2, 'score': 70},
+        ])
+        self.assertEqual([success for success, _ in results], [True, True])
+        
+        GradeManager.enable_group_commit()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(lambda nim: GradeManager.input_grade(nim, "PBO101", 2, "B", 90),
+                                        ["21001", "21002"]))
+        self.assertTrue(all(success for success, _ in results))
+        for nim in ("21001", "21002"):
+            self.assertEqual(self.grade_count(self.router.shard_for(nim), nim), 6)
+    
+    def test_batch_year_key(self):
+        """Test batch_year sharding keeps a cohort together"""
+        router = use_shards(self.shard_files, key='batch_year')
+        self.assertEqual(router.shard_for("21001"), self.shard_files[2021 % 3])
+        self.assertEqual(router.shard_for("21002"), self.shard_files[2021 % 3])
+        with self.assertRaises(ValueError):
+            use_shards(self.shard_files, key='program_study')
+
+
+class TestBackup(unittest.TestCase):
+    """Test hot backups and point-in-time restore"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.live_file = os.path.join(self.tmp_dir, "live.db")
+        self.previous_database = use_database(self.live_file)
+        init_database(verbose=False)
+        populate_sample_data(verbose=False)
+        self.manager = BackupManager(os.path.join(self.tmp_dir, "backups"), pages_per_step=2)
+    
+    def tearDown(self):
+        use_shards(None)
+        use_database(*self.previous_database)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def query(self, database_file, sql, params=()):
+        conn = sqlite3.connect(database_file)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+    
+    def test_backup_during_writes_is_consistent(self):
+        """Test a stepped backup taken while grades are written matches its change log position"""
+        stop = threading.Event()
+        
+        def write():
+            i = 0
+            while not stop.is_set():
+                GradeManager.input_grade("21002", "NET101", 2 + i % 6, "ABCDE"[i % 5], 90)
+                i += 1
+        
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            manifest = self.manager.create()
+        finally:
+            stop.set()
+            writer.join()
+        
+        entry = manifest['files'][0]
+        self.assertEqual(entry['file'], "main.db.gz")
+        self.assertGreater(entry['steps'], 1)
+        restored = self.manager.restore(os.path.join(self.tmp_dir, "copy"), manifest['created_at'])
+        copy = restored['files'][self.live_file]
+        # Grades in the copy are exactly the log up to the backup's change id
+        logged = self.query(copy, "SELECT COUNT(*) FROM grade_change_log WHERE change_id <= ?",
+                            (entry['last_change_id'],))[0][0]
+        self.assertEqual(logged, entry['last_change_id'])
+        self.assertEqual(self.query(copy, "PRAGMA integrity_check"), [("ok",)])
+    
+    def test_restore_to_point_in_time(self):
+        """Test restore replays logged changes up to the chosen time only"""
+        manifest = self.manager.create()
+        GradeManager.input_grade("21001", "WEB101", 1, "A", 90)
+        GradeManager.input_grade("21001", "NET101", 2, "B", 90)
+        
+        # A later mistake, logged after the restore point
+        GradeManager.input_grade("21001", "PBO101", 1, "E", 90)
+        with get_connection() as conn:
+            conn.execute("UPDATE grade_change_log SET changed_at = '2999-01-01 00:00:00' "
+                         "WHERE change_id = (SELECT MAX(change_id) FROM grade_change_log)")
+            conn.execute("UPDATE grade_history SET changed_at = '2999-01-01 00:00:00' "
+                         "WHERE history_id = (SELECT MAX(history_id) FROM grade_history)")
+            conn.commit()
+        
+        # Later than the backup, though the writes may share its second
+        result = self.manager.restore(os.path.join(self.tmp_dir, "restored"), "2998-01-01 00:00:00")
+        self.assertEqual(result['backup'], manifest['name'])
+        self.assertEqual(result['replayed'], 2)
+        restored = result['files'][self.live_file]
+        grades = dict(self.query(restored, "SELECT course_code, letter_grade FROM grades WHERE nim = '21001'"))
+        self.assertEqual((grades['WEB101'], grades['NET101'], grades['PBO101']), ("A", "B", "A"))
+        self.assertEqual(self.query(restored, "SELECT new_letter_grade FROM grade_history"), [("A",)])
+        self.assertEqual(self.query(restored, "SELECT MAX(change_id) FROM grade_change_log")[0][0], 14)
+        
+        with self.assertRaises(ValueError):
+            self.manager.restore(os.path.join(self.tmp_dir, "too-early"), "2000-01-01 00:00:00")
+    
+    def test_restore_without_live_database(self):
+        """Test a backup restores after the live database is lost, without recreating it"""
+        manifest = self.manager.create()
+        GradeManager.input_grade("21001", "WEB101", 1, "A", 90)
+        use_database(*self.previous_database)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.live_file + suffix):
+                os.remove(self.live_file + suffix)
+        
+        result = self.manager.restore(os.path.join(self.tmp_dir, "as-of-backup"), manifest['created_at'])
+        self.assertEqual((result['replayed'], result['not_replayed']), (0, []))
+        result = self.manager.restore(os.path.join(self.tmp_dir, "later"), "2998-01-01 00:00:00")
+        self.assertEqual((result['replayed'], result['not_replayed']), (0, [self.live_file]))
+        self.assertFalse(os.path.exists(self.live_file))
+        grades = self.query(result['files'][self.live_file],
+                            "SELECT letter_grade FROM grades WHERE nim = '21001' AND course_code = 'WEB101'")
+        self.assertEqual(grades, [("B",)])
+    
+    def test_sharded_backup_and_retention(self):
+        """Test shards are backed up with the main file and old backups are pruned"""
+        use_shards([os.path.join(self.tmp_dir, f"shard{i}.db") for i in range(2)])
+        init_database(verbose=False)
+        GradeManager.input_grade("21001", "NET101", 2, "A", 90)
+        
+        manager = BackupManager(os.path.join(self.tmp_dir, "sharded"), compress=False, keep=2)
+        for _ in range(3):
+            manifest = manager.create()
+        self.assertEqual([f['file'] for f in manifest['files']], ["main.db", "shard0.db", "shard1.db"])
+        self.assertEqual(len(manager.list()), 2)
+        
+        result = manager.restore(os.path.join(self.tmp_dir, "restored"))
+        shard = result['files'][database.shard_router().shard_for("21001")]
+        self.assertEqual(self.query(shard, "SELECT letter_grade FROM grades WHERE course_code = 'NET101'"),
+                         [("A",)])
+        
+        with open(os.path.join(manager.backup_dir, manifest['name'], "shard0.db"), 'ab') as f:
+            f.write(b"corrupt")
+        with self.assertRaises(ValueError):
+            manager.restore(os.path.join(self.tmp_dir, "corrupt"))
+
+
+class TestIntegrity(DatabaseTestCase):
+    """Test the online integrity checker"""
+    
+    def test_sample_data_orphans(self):
+        """Test the sample grades of the unregistered student 21003 are reported"""
+        report = IntegrityChecker(chunk_size=5).scan()
+        self.assertFalse(report['ok'])
+        self.assertEqual(report['checked']['grades'], 12)
+        self.assertEqual(report['counts'][ORPHANED_GRADE], 4)
+        self.assertEqual({issue['nim'] for issue in report['issues']}, {"21003"})
+        self.assertEqual(sum(report['counts'].values()), 4)
+    
+    def test_grade_mismatch_and_orphaned_history(self):
+        """Test letter/numeric mismatches and audit rows left behind by a deleted grade"""
+        self.seed(grades=[("21002", "ALSTD101", 2, "B", 2.0, 90),
+                          ("21002", "WEB101", 2, "X", 0.0, 90)])
+        GradeManager.input_grade("21001", "PBO101", 1, "B", 90)
+        with get_connection() as conn:
+            conn.execute("DELETE FROM grades WHERE nim = '21001' AND course_code = 'PBO101'")
+            conn.commit()
+        
+        report = IntegrityChecker(max_issues=5).scan()
+        self.assertEqual(report['counts'][GRADE_MISMATCH], 2)
+        self.assertEqual(report['counts'][ORPHANED_HISTORY], 1)
+        self.assertEqual(len(report['issues']), 5)
+        self.assertTrue(report['truncated'])
+        self.assertEqual(report['issues'][-1]['check'], GRADE_MISMATCH)  # Kept in the order found
+    
+    def test_derived_results(self):
+        """Test stored standings are recomputed and snapshot contents checked against their hashes"""
+        AcademicStanding.evaluate_all(as_of_year=2024)
+        GradeCalculator.close_semester(1)
+        self.assertEqual(IntegrityChecker().scan()['counts'][STANDING_DRIFT], 0)
+        
+        GradeManager.input_grade("21001", "PBO101", 1, "E", 90)
+        with get_connection() as conn:
+            conn.execute("UPDATE transcript_snapshots SET content_hash = ? WHERE nim = '21002'", ("0" * 64,))
+            conn.commit()
+        
+        report = IntegrityChecker().scan()
+        self.assertEqual(report['checked']['standings'], 2)
+        self.assertEqual(report['checked']['snapshots'], 2)
+        drift = [issue for issue in report['issues'] if issue['check'] == STANDING_DRIFT]
+        self.assertEqual([issue['nim'] for issue in drift], ["21001"])
+        self.assertIn("ipk tersimpan 3.69", drift[0]['detail'])
+        corrupt = [issue for issue in report['issues'] if issue['check'] == SNAPSHOT_CORRUPT]
+        self.assertEqual([issue['nim'] for issue in corrupt], ["21002"])
+    
+    def test_standings_read_in_pages_of_students(self):
+        """Test the full scan loads the grades behind standings chunk_size students per read"""
+        AcademicStanding.evaluate_all(as_of_year=2024)
+        GradeManager.input_grade("21001", "PBO101", 1, "E", 90)
+        
+        pages = []
+        original = GradeManager.get_grade_records_for_students
+        def recording(nims):
+            pages.append(list(nims))
+            return original(nims)
+        GradeManager.get_grade_records_for_students = staticmethod(recording)
+        try:
+            report = IntegrityChecker(chunk_size=1).scan()
+        finally:
+            GradeManager.get_grade_records_for_students = staticmethod(original)
+        
+        self.assertEqual(pages, [["21001"], ["21002"]])
+        self.assertEqual(report['checked']['standings'], 2)
+        self.assertEqual([issue['nim'] for issue in report['issues'] if issue['check'] == STANDING_DRIFT],
+                         ["21001"])
+    
+    def test_incremental_checks_only_new_changes(self):
+        """Test incremental runs read the change log from their committed offset"""
+        checker = IntegrityChecker(chunk_size=5)
+        first = checker.scan_changes()
+        self.assertEqual(first['checked']['changes'], 12)
+        self.assertEqual(first['counts'][ORPHANED_GRADE], 4)
+        self.assertEqual(checker.scan_changes()['checked']['changes'], 0)
+        
+        GradeManager.input_grade("21002", "NET101", 2, "A", 90)
+        AcademicStanding.evaluate_all(as_of_year=2024)
+        report = checker.scan_changes()
+        self.assertTrue(report['ok'])
+        self.assertEqual(report['checked'], {'grades': 1, 'history': 0, 'standings': 1, 'snapshots': 0,
+                                             'changes': 1})
+        self.assertEqual([c['lag'] for c in ChangeLog.consumers() if c['consumer'] == "integrity-checker"],
+                         [0])
+
+
+class TestAppFactory(unittest.TestCase):
+    """Test application factory, explicit configuration and one-time initialization"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.previous_database = (database.DATABASE_FILE, database.SNAPSHOT_FILE)
+        self.db_file = os.path.join(self.tmp_dir, "app.db")
+        self.config = {
+            'TESTING': True,
+            'DATABASE_FILE': self.db_file,
+            'SNAPSHOT_FILE': os.path.join(self.tmp_dir, "snapshot.db"),
+            'DB_POOL_SIZE': 2,
+            'TRANSCRIPT_DIR': os.path.join(self.tmp_dir, "pdf"),
+            'SIGNING_KEY': "test-key"
+        }
+        self.app = create_app(self.config)
+    
+    def tearDown(self):
+        extensions = self.app.extensions['transcript_system']
+        GradeManager.remove_change_listener(extensions['change_broker'].publish)
+        use_shards(None)
+        database.configure(pool_size=0)
+        use_database(*self.previous_database)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def test_factory_does_not_initialize_database(self):
+        """Test creating an app (worker startup) runs no schema setup"""
+        self.assertFalse(os.path.exists(self.db_file))
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp_dir, "pdf")))
+    
+    def test_apps_do_not_accumulate_listeners(self):
+        """Test a discarded app's change broker stops receiving grade changes"""
+        listeners = len(GradeManager._live_listeners())
+        app = create_app(self.config)
+        self.assertEqual(len(GradeManager._live_listeners()), listeners + 1)
+        
+        del app
+        gc.collect()
+        self.assertEqual(len(GradeManager._live_listeners()), listeners)
+    
+    def test_init_db_command(self):
+        """Test the one-time init-db command creates schema and sample data"""
+        result = self.app.test_cli_runner().invoke(args=['init-db', '--sample-data'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        
+        response = self.app.test_client().get('/api/students')
+        self.assertEqual([s['nim'] for s in response.json], ["21001", "21002"])
+    
+    def test_evaluate_standing_command(self):
+        """Test the nightly standing job runs from the CLI"""
+        runner = self.app.test_cli_runner()
+        runner.invoke(args=['init-db', '--sample-data'])
+        result = runner.invoke(args=['evaluate-standing', '--year', '2024'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Evaluated 2 students, 2 changed", result.output)
+    
+    def test_change_log_api(self):
+        """Test reading the change log and committing consumer offsets over the API"""
+        self.app.test_cli_runner().invoke(args=['init-db', '--sample-data'])
+        client = self.app.test_client()
+        
+        batch = client.get('/api/changes?limit=2').json
+        self.assertEqual(len(batch['changes']), 2)
+        self.assertTrue(batch['has_more'])
+        
+        self.assertEqual(client.get('/api/changes/consumers/finance?limit=2').json['offset'], 0)
+        self.assertEqual(client.put('/api/changes/consumers/finance', json={}).status_code, 400)
+        committed = client.put('/api/changes/consumers/finance', json={'offset': batch['next_offset']}).json
+        self.assertEqual(committed['last_change_id'], 2)
+        self.assertEqual(client.get('/api/changes/consumers').json[0]['consumer'], "finance")
+        
+        output = self.app.test_cli_runner().invoke(args=['export-changes', 'finance']).output
+        self.assertEqual(json.loads(output.splitlines()[0])['change_id'], 3)
+        self.assertEqual(client.get('/api/changes/consumers').json[0]['lag'], 0)
+    
+    def test_sharded_change_log_api(self):
+        """Test the change log API and export-changes span every shard with composite offsets"""
+        router = use_shards([os.path.join(self.tmp_dir, f"shard{i}.db") for i in range(3)])
+        runner = self.app.test_cli_runner()
+        runner.invoke(args=['init-db', '--sample-data'])
+        client = self.app.test_client()
+        
+        batch = client.get('/api/changes').json
+        self.assertEqual(len(batch['changes']), 12)
+        self.assertEqual({c['shard'] for c in batch['changes']},
+                         {router.shard_files.index(router.shard_for(nim)) for nim in ("21001", "21002", "21003")})
+        self.assertEqual(len(batch['next_offset'].split('.')), 3)
+        self.assertEqual(client.get('/api/changes?since=1.2').status_code, 400)
+        
+        GradeManager.input_grade("21001", "WEB101", 1, "A", 90)
+        changes = client.get(f"/api/changes?since={batch['next_offset']}").json['changes']
+        self.assertEqual([(c['operation'], c['nim']) for c in changes], [('update', "21001")])
+        
+        first = client.get('/api/changes/consumers/finance?limit=5').json
+        self.assertEqual((first['offset'], len(first['changes'])), ("0.0.0", 5))
+        self.assertEqual(client.put('/api/changes/consumers/finance', json={'offset': "99.99.99"}).status_code, 400)
+        committed = client.put('/api/changes/consumers/finance', json={'offset': first['next_offset']}).json
+        self.assertEqual((committed['last_change_id'], committed['lag']), (first['next_offset'], 8))
+        
+        output = runner.invoke(args=['export-changes', 'finance']).output
+        self.assertEqual(len(output.splitlines()), 8)
+        self.assertEqual(client.get('/api/changes/consumers').json[0]['lag'], 0)
+    
+    def test_grading_scale_api_rejects_duplicate_letters(self):
+        """Test an invalid scale is a 400, not a storage error"""
+        self.app.test_cli_runner().invoke(args=['init-db'])
+        client = self.app.test_client()
+        entries = [{'letter_grade': "A", 'numeric_grade': 4.0, 'min_score': 80},
+                   {'letter_grade': "A", 'numeric_grade': 3.0, 'min_score': 60},
+                   {'letter_grade': "E", 'numeric_grade': 0.0, 'min_score': 0}]
+        
+        response = client.put('/api/grading-scales/Teknik%20Informatika', json={'entries': entries})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("only once", response.json['error'])
+    
+    def test_transcript_preview_and_credential(self):
+        """Test the HTML preview and JSON-LD credential endpoints"""
+        self.app.test_cli_runner().invoke(args=['init-db', '--sample-data'])
+        client = self.app.test_client()
+        
+        preview = client.get('/transcript/21001/preview')
+        self.assertEqual(preview.mimetype, 'text/html')
+        self.assertIn("TRANSKRIP AKADEMIK", preview.get_data(as_text=True))
+        credential = client.get('/api/transcript/21001/credential')
+        self.assertEqual(credential.mimetype, 'application/ld+json')
+        self.assertEqual(json.loads(credential.data)['credentialSubject']['creditsEarned'], 13)
+        self.assertEqual(client.get('/transcript/99999/preview').status_code, 404)
+        self.assertEqual(client.get('/api/transcript/21001/credential?version=5').status_code, 404)
+    
+    def test_check_integrity_command(self):
+        """Test the integrity CLI reports the sample orphans and fails the run"""
+        runner = self.app.test_cli_runner()
+        runner.invoke(args=['init-db', '--sample-data'])
+        result = runner.invoke(args=['check-integrity'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertEqual(result.output.count("orphaned_grade: grade_id="), 4)
+        report = json.loads(runner.invoke(args=['check-integrity', '--incremental', '--json']).output)
+        self.assertEqual((report['mode'], report['checked']['changes']), ('incremental', 12))
+    
+    def test_semester_close_api(self):
+        """Test closing a semester over the API and reading the frozen version"""
+        self.app.test_cli_runner().invoke(args=['init-db', '--sample-data'])
+        client = self.app.test_client()
+        
+        self.assertEqual(client.post('/api/semester-close', json={}).status_code, 400)
+        self.assertEqual(client.post('/api/semester-close', json={'semester': 1}).json['snapshots'], 2)
+        
+        self.assertEqual([v['version'] for v in client.get('/api/transcript/21001/versions').json], [1])
+        transcript = client.get('/api/transcript/21001?version=1').json
+        self.assertEqual(transcript['snapshot']['closed_semester'], 1)
+        self.assertEqual(transcript['semesters'][0]['courses'][0]['nim'], "21001")
+        self.assertEqual(client.get('/api/transcript/21001?version=2').status_code, 404)
+        
+        token = self.app.extensions['transcript_system']['signer'].sign(transcript['snapshot']['content_hash'])
+        self.assertEqual(client.get(f'/verify/{token}').json['nim'], "21001")
+        self.assertEqual(client.get('/verify/abc.def').status_code, 404)
+    
+    def test_standing_evaluation_api_rejects_bad_year(self):
+        """Test a non-numeric evaluation year is a 400, not a server error"""
+        self.app.test_cli_runner().invoke(args=['init-db', '--sample-data'])
+        client = self.app.test_client()
+        
+        self.assertEqual(client.post('/api/standing/evaluate', json={'year': "tahun ini"}).status_code, 400)
+        self.assertEqual(client.post('/api/standing/evaluate', json={'year': [2024]}).status_code, 400)
+        self.assertEqual(client.post('/api/standing/evaluate', json={'year': 2024}).status_code, 200)
+    
+    def test_no_signing_key_means_no_signatures(self):
+        """Test an app without an explicit signing key warns, signs nothing and verifies nothing"""
+        with self.assertLogs(self.app.logger.name, level='WARNING') as logs:
+            app = create_app(dict(self.config, SIGNING_KEY=None))
+        self.assertIn("SIGNING_KEY", logs.output[0])
+        self.assertIsNone(app.extensions['transcript_system']['signer'])
+        
+        app.test_cli_runner().invoke(args=['init-db', '--sample-data'])
+        client = app.test_client()
+        client.post('/api/semester-close', json={'semester': 1})
+        self.assertNotIn("/verify/", client.get('/api/transcript/21001/credential').json['id'])
+        content_hash = client.get('/api/transcript/21001').json['snapshot']['content_hash']
+        forged = TranscriptSigner("your-secret-key-here").sign(content_hash)  # The old default key
+        self.assertEqual(client.get(f'/verify/{forged}').status_code, 503)
+    
+    def test_connection_pool_reuses_connections(self):
+        """Test closed connections go back to the pool and are handed out again"""
+        init_database(verbose=False)
+        first = database.get_connection()
+        first.execute("BEGIN")
+        first.close()
+        second = database.get_connection()
+        try:
+            self.assertIs(first, second)
+            self.assertFalse(second.in_transaction)
+        finally:
+            second.close()
+
+
+class TestLazyImports(unittest.TestCase):
+    """Test the PDF stack is only loaded when a transcript is rendered"""
+    
+    def test_worker_start_skips_reportlab(self):
+        """Test importing the app and creating it does not import ReportLab"""
+        with tempfile.TemporaryDirectory() as tmp:
+            script = (
+                "import sys, app\n"
+                f"app.create_app({{'DATABASE_FILE': {os.path.join(tmp, 'x.db')!r}, "
+                f"'TRANSCRIPT_DIR': {tmp!r}}})\n"
+                "print('reportlab' in sys.modules)"
+            )
+            result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.stdout.strip(), "False", result.stderr)
+    
+    def test_html_preview_skips_reportlab(self):
+        """Test rendering the HTML preview does not import ReportLab"""
+        with tempfile.TemporaryDirectory() as tmp:
+            script = (
+                "import sys\n"
+                "from database import use_database, init_database, populate_sample_data\n"
+                "use_database(':memory:')\n"
+                "init_database(verbose=False)\n"
+                "populate_sample_data(verbose=False)\n"
+                "from transcript_generator import TranscriptGenerator\n"
+                f"TranscriptGenerator({tmp!r}).render('21001', 'html')\n"
+                "print('reportlab' in sys.modules)"
+            )
+            result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.stdout.strip(), "False", result.stderr)
+
+
 # ===================== TEST SUITE RUNNER =====================
 
 def run_all_tests():
@@ -387,6 +2371,29 @@ def run_all_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestPerformanceStatistics))
     suite.addTests(loader.loadTestsFromTestCase(TestPDFGeneration))
     suite.addTests(loader.loadTestsFromTestCase(TestEdgeCases))
+    suite.addTests(loader.loadTestsFromTestCase(TestReportingSnapshot))
+    suite.addTests(loader.loadTestsFromTestCase(TestInMemoryStorage))
+    suite.addTests(loader.loadTestsFromTestCase(TestGradeRecords))
+    suite.addTests(loader.loadTestsFromTestCase(TestWhatIfSimulator))
+    suite.addTests(loader.loadTestsFromTestCase(TestGradeTargetSolver))
+    suite.addTests(loader.loadTestsFromTestCase(TestCohortRanking))
+    suite.addTests(loader.loadTestsFromTestCase(TestDatabaseIsolation))
+    suite.addTests(loader.loadTestsFromTestCase(TestGradingScales))
+    suite.addTests(loader.loadTestsFromTestCase(TestGradeComponents))
+    suite.addTests(loader.loadTestsFromTestCase(TestCurriculum))
+    suite.addTests(loader.loadTestsFromTestCase(TestAcademicStanding))
+    suite.addTests(loader.loadTestsFromTestCase(TestTranscriptSnapshots))
+    suite.addTests(loader.loadTestsFromTestCase(TestTranscriptVerification))
+    suite.addTests(loader.loadTestsFromTestCase(TestSingleFlight))
+    suite.addTests(loader.loadTestsFromTestCase(TestChangeFeed))
+    suite.addTests(loader.loadTestsFromTestCase(TestChangeLog))
+    suite.addTests(loader.loadTestsFromTestCase(TestGroupCommit))
+    suite.addTests(loader.loadTestsFromTestCase(TestSharding))
+    suite.addTests(loader.loadTestsFromTestCase(TestBackup))
+    suite.addTests(loader.loadTestsFromTestCase(TestIntegrity))
+    suite.addTests(loader.loadTestsFromTestCase(TestAppFactory))
+    suite.addTests(loader.loadTestsFromTestCase(TestAsyncApp))
+    suite.addTests(loader.loadTestsFromTestCase(TestLazyImports))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
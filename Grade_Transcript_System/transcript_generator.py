@@ -1,89 +1,257 @@
 """
 PDF Transcript Generator - Generate professional academic transcripts
+
+ReportLab is imported on the first render (see _load_reportlab), so
+processes that only serve JSON, HTML previews or JSON-LD never pay for
+loading the PDF stack.
 """
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageTemplate, Frame
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
 from datetime import datetime
+from io import BytesIO
 from grade_calculator import GradeCalculator
 from grade_manager import GradeManager
+from database import reporting_snapshot
+from transcript_verification import TranscriptSigner
+from transcript_renderers import TranscriptRenderer, HtmlTranscriptRenderer, JsonLdTranscriptRenderer
+from contextlib import nullcontext
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 import os
+import threading
+
+# Set only once every ReportLab name below is bound
+_REPORTLAB_LOADED = False
+_reportlab_lock = threading.Lock()
+
+def _load_reportlab():
+    """Import the ReportLab names used below into this module, once"""
+    global letter, A4, getSampleStyleSheet, ParagraphStyle, inch, colors
+    global SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer
+    global TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
+    global Drawing, QrCodeWidget
+    global _REPORTLAB_LOADED
+    
+    if _REPORTLAB_LOADED:
+        return
+    
+    with _reportlab_lock:
+        if _REPORTLAB_LOADED:
+            return
+        from reportlab.lib.pagesizes import letter, A4
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.lib import colors
+        from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer
+        from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
+        from reportlab.graphics.shapes import Drawing
+        from reportlab.graphics.barcode.qr import QrCodeWidget
+        _REPORTLAB_LOADED = True
+
+class _StoryFeed(list):
+    """
+    Story list filled from a flowable generator while the document is built
+    
+    BaseDocTemplate.build() checks len(story) before it lays out each
+    flowable, so topping the list up there keeps only LOOKAHEAD flowables
+    (enough for keepWithNext groups) alive at once: earlier semesters are
+    drawn and dropped before later ones are created, and memory stays
+    bounded however long the transcript is.
+    """
+    
+    LOOKAHEAD = 8
+    
+    def __init__(self, flowables: Iterable):
+        super().__init__()
+        self._source = iter(flowables)
+    
+    def __len__(self):
+        while self._source is not None and super().__len__() < self.LOOKAHEAD:
+            flowable = next(self._source, None)
+            if flowable is None:
+                self._source = None
+            else:
+                self.append(flowable)
+        return super().__len__()
+
+
+class PdfTranscriptRenderer(TranscriptRenderer):
+    """PDF bytes from the generator's ReportLab layout"""
+    
+    media_type = 'application/pdf'
+    extension = 'pdf'
+    
+    def __init__(self, generator: 'TranscriptGenerator'):
+        self.generator = generator
+    
+    def render(self, model: Dict) -> bytes:
+        buffer = BytesIO()
+        self.generator._build_pdf(model, buffer)
+        return buffer.getvalue()
+
 
 class TranscriptGenerator:
-    """Generate professional PDF transcripts"""
+    """Generate professional PDF transcripts, and HTML and JSON-LD renderings of the same model"""
     
-    def __init__(self, output_dir="transcripts"):
+    def __init__(self, output_dir="transcripts", signer: Optional[TranscriptSigner] = None,
+                 renderers: Optional[Dict[str, TranscriptRenderer]] = None, streaming: bool = True):
+        """
+        Args:
+            output_dir: Directory for generated PDFs
+            signer: Adds a verification QR code to transcripts backed by a snapshot
+            renderers: Extra or replacement renderers by format name
+            streaming: Create PDF flowables as pages fill (see _StoryFeed)
+                instead of holding the whole story before the build
+        """
         self.output_dir = output_dir
+        self.signer = signer
+        self.streaming = streaming
+        self._styles = None
+        self.renderers = {
+            'pdf': PdfTranscriptRenderer(self),
+            'html': HtmlTranscriptRenderer(),
+            'jsonld': JsonLdTranscriptRenderer(signer.base_url if signer else None)
+        }
+        self.renderers.update(renderers or {})
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
     
-    def generate_transcript(self, nim: str, filename: str = None) -> str:
+    def load_transcript(self, nim: str, version: Optional[int] = None) -> Dict:
+        """
+        The model every renderer draws: the transcript plus verification
+        ({token, url} if it is frozen and signed, else None), provisional and
+        generated_at
+        
+        Raises:
+            ValueError: If the student has no transcript (or no such version)
+        """
+        
+        if version is not None:
+            transcript = GradeCalculator.get_transcript_version(nim, version)
+        else:
+            transcript = GradeCalculator.get_transcript(nim)
+        
+        if not transcript:
+            raise ValueError(f"No data found for student {nim}")
+        
+        token = self.signer.token_for(transcript) if self.signer else None
+        return dict(transcript,
+                    verification={'token': token, 'url': self.signer.verify_url(token)} if token else None,
+                    provisional=self.signer is not None and token is None,
+                    generated_at=datetime.now())
+    
+    def render(self, nim: str, format: str = 'html', version: Optional[int] = None) -> Tuple[bytes, str]:
+        """
+        Render a transcript in one of self.renderers' formats
+        
+        Returns:
+            Tuple: (content, media type)
+        
+        Raises:
+            ValueError: If the format is unknown or the student has no transcript
+        """
+        
+        renderer = self.renderers.get(format)
+        if renderer is None:
+            raise ValueError(f"Unknown transcript format {format}")
+        return renderer.render(self.load_transcript(nim, version)), renderer.media_type
+    
+    def generate_transcript(self, nim: str, filename: str = None,
+                            version: Optional[int] = None) -> str:
         """
         Generate a complete transcript PDF for a student
         
         Args:
             nim: Student ID
             filename: Output filename (optional)
-            
+            version: Frozen snapshot version to print (default: current transcript)
+        
         Returns:
             str: Path to generated PDF
         """
         
-        # Get transcript data
-        transcript = GradeCalculator.get_transcript(nim)
-        
-        if not transcript:
-            raise ValueError(f"No data found for student {nim}")
+        transcript = self.load_transcript(nim, version)
         
         student = transcript['student']
         if filename is None:
             filename = f"Transcript_{student['nim']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         
         filepath = os.path.join(self.output_dir, filename)
+        self._build_pdf(transcript, filepath)
+        
+        return filepath
+    
+    def _build_pdf(self, transcript: Dict, target) -> None:
+        """Lay out a transcript model into a PDF file path or binary file object"""
+        
+        _load_reportlab()
         
         # Create PDF document
-        doc = SimpleDocTemplate(filepath, pagesize=A4,
+        doc = SimpleDocTemplate(target, pagesize=A4,
                               leftMargin=0.75*inch, rightMargin=0.75*inch,
                               topMargin=0.75*inch, bottomMargin=0.75*inch)
         
-        story = []
+        story = self._iter_story(transcript)
+        
+        # Build PDF
+        doc.build(_StoryFeed(story) if self.streaming else list(story))
+    
+    def _iter_story(self, transcript: Dict) -> Iterator:
+        """Flowables of a transcript in page order"""
+        
+        student = transcript['student']
         styles = self._get_styles()
         
         # Header
-        story.extend(self._create_header())
-        story.append(Spacer(1, 0.3*inch))
+        yield from self._create_header()
+        yield Spacer(1, 0.3*inch)
         
         # Title
-        title = Paragraph("TRANSKRIP AKADEMIK", styles['title'])
-        story.append(title)
-        story.append(Spacer(1, 0.2*inch))
+        yield Paragraph("TRANSKRIP AKADEMIK", styles['title'])
+        yield Spacer(1, 0.2*inch)
         
         # Student Info
-        story.extend(self._create_student_info(student, styles))
-        story.append(Spacer(1, 0.2*inch))
+        yield from self._create_student_info(student, styles)
+        yield Spacer(1, 0.2*inch)
         
         # Grades by Semester
         for semester_data in transcript['semesters']:
-            story.extend(self._create_semester_table(semester_data, styles))
-            story.append(Spacer(1, 0.15*inch))
+            yield from self._create_semester_table(semester_data, styles)
+            yield Spacer(1, 0.15*inch)
         
         # Summary
-        story.extend(self._create_summary(transcript, styles))
-        story.append(Spacer(1, 0.3*inch))
+        yield from self._create_summary(transcript, styles)
+        yield Spacer(1, 0.3*inch)
         
         # Footer with signature
-        story.extend(self._create_footer(student, styles))
+        verification = transcript['verification']
+        yield from self._create_footer(student, styles, verification['token'] if verification else None)
+    
+    def generate_batch(self, nims: List[str], use_snapshot: bool = True) -> Dict[str, str]:
+        """
+        Generate transcript PDFs for many students
         
-        # Build PDF
-        doc.build(story)
+        Args:
+            nims: Student IDs
+            use_snapshot: Read grades from the reporting snapshot instead of
+                the live database used by grade entry
         
-        return filepath
+        Returns:
+            Dict: PDF path per NIM (students without data are skipped)
+        """
+        
+        paths = {}
+        with reporting_snapshot() if use_snapshot else nullcontext():
+            for nim in nims:
+                try:
+                    paths[nim] = self.generate_transcript(nim)
+                except ValueError:
+                    continue
+        
+        return paths
     
     def _get_styles(self) -> dict:
-        """Get custom paragraph styles"""
+        """Get custom paragraph styles (created once per generator)"""
+        
+        if self._styles is not None:
+            return self._styles
         
         styles = getSampleStyleSheet()
         
@@ -107,6 +275,15 @@ class TranscriptGenerator:
                 borderBottomColor=colors.HexColor('#cccccc'),
                 borderBottomWidth=1
             ),
+            'semester': ParagraphStyle(
+                'SemesterHeading',
+                parent=styles['Heading2'],
+                fontSize=12,
+                textColor=colors.HexColor('#333333'),
+                spaceAfter=10 + 0.1*inch,
+                fontName='Helvetica-Bold',
+                keepWithNext=1  # Never leave a semester heading at the bottom of a page
+            ),
             'normal': ParagraphStyle(
                 'CustomNormal',
                 parent=styles['Normal'],
@@ -121,6 +298,7 @@ class TranscriptGenerator:
             )
         }
         
+        self._styles = custom_styles
         return custom_styles
     
     def _create_header(self) -> list:
@@ -172,10 +350,9 @@ class TranscriptGenerator:
         # Semester header
         sem_header = Paragraph(
             f"<b>SEMESTER {semester_data['semester']} - IPS: {semester_data['ips']}</b>",
-            styles['heading2']
+            styles['semester']
         )
         elements.append(sem_header)
-        elements.append(Spacer(1, 0.1*inch))
         
         # Create grade table
         table_data = [
@@ -183,13 +360,13 @@ class TranscriptGenerator:
         ]
         
         for course in semester_data['courses']:
-            keterangan = 'LULUS' if course['numeric_grade'] >= 1.0 else 'TIDAK LULUS'
+            keterangan = 'LULUS' if course.numeric_grade >= 1.0 else 'TIDAK LULUS'
             table_data.append([
-                course['course_code'],
-                course['course_name'],
-                str(course['sks']),
-                course['letter_grade'],
-                f"{course['numeric_grade']:.2f}",
+                course.course_code,
+                course.course_name,
+                str(course.sks),
+                course.letter_grade,
+                f"{course.numeric_grade:.2f}",
                 keterangan
             ])
         
@@ -199,7 +376,9 @@ class TranscriptGenerator:
             '', '<b>JUMLAH</b>', f'<b>{total_sks}</b>', '', '', ''
         ])
         
-        grade_table = Table(table_data, colWidths=[0.9*inch, 2.8*inch, 0.6*inch, 0.7*inch, 0.6*inch, 1.0*inch])
+        # A semester that runs over a page break continues under a repeated header row
+        grade_table = LongTable(table_data, colWidths=[0.9*inch, 2.8*inch, 0.6*inch, 0.7*inch, 0.6*inch, 1.0*inch],
+                                repeatRows=1)
         
         grade_table.setStyle(TableStyle([
             # Header style
@@ -260,8 +439,8 @@ class TranscriptGenerator:
         
         return elements
     
-    def _create_footer(self, student: dict, styles: dict) -> list:
-        """Create footer with signature line"""
+    def _create_footer(self, student: dict, styles: dict, token: Optional[str] = None) -> list:
+        """Create footer with signature line and, if signed, the verification QR code"""
         
         elements = []
         
@@ -292,7 +471,37 @@ class TranscriptGenerator:
         
         elements.append(sig_table)
         
+        if token:
+            elements.append(Spacer(1, 0.2*inch))
+            elements.extend(self._create_verification(token, styles))
+        elif self.signer:
+            elements.append(Spacer(1, 0.15*inch))
+            elements.append(Paragraph(
+                "<i>Transkrip sementara: memuat nilai semester yang belum ditutup, "
+                "tidak dapat diverifikasi.</i>", styles['small']))
+        
         return elements
+    
+    def _create_verification(self, token: str, styles: dict) -> list:
+        """QR code with the signed verification URL, and the URL in text"""
+        
+        url = self.signer.verify_url(token)
+        size = 1.1*inch
+        qr = QrCodeWidget(url, barLevel='M')
+        x1, y1, x2, y2 = qr.getBounds()
+        drawing = Drawing(size, size, transform=[size / (x2 - x1), 0, 0, size / (y2 - y1), 0, 0])
+        drawing.add(qr)
+        
+        text = Paragraph(
+            "<b>Verifikasi keaslian transkrip</b><br/>"
+            "Pindai kode QR atau buka alamat berikut:<br/>"
+            f"<font size=7>{url}</font>", styles['small'])
+        
+        table = Table([[drawing, text]], colWidths=[1.3*inch, 4.7*inch])
+        table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]))
+        return [table]
 
 
 if __name__ == "__main__":
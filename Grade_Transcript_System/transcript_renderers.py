@@ -0,0 +1,151 @@
+"""
+Transcript Renderers - HTML and JSON-LD outputs of the transcript model, without the PDF stack
+"""
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import timezone
+from threading import Lock
+from typing import Dict, Optional
+from urllib.parse import quote
+from grade_manager import GradeManager
+
+INSTITUTION_NAME = "Universitas XYZ"
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+# Open Badges 3.0 credentials are W3C Verifiable Credentials with the OB context
+CREDENTIAL_CONTEXT = [
+    "https://www.w3.org/ns/credentials/v2",
+    "https://purl.imsglobal.org/spec/ob/v3p0/context-3.0.3.json"
+]
+
+
+class TranscriptRenderer(ABC):
+    """
+    One output format of a transcript
+    
+    Every renderer gets the same model from TranscriptGenerator.load_transcript():
+    the transcript from GradeCalculator plus verification (token and url, or
+    None), provisional and generated_at.
+    """
+    
+    media_type = 'application/octet-stream'
+    extension = 'bin'
+    
+    @abstractmethod
+    def render(self, model: Dict) -> bytes:
+        """The transcript in this format"""
+
+
+class HtmlTranscriptRenderer(TranscriptRenderer):
+    """
+    Printable HTML page from templates/transcript_document.html
+    
+    The template is compiled once, on the first render, and the compiled
+    template is reused by every later render.
+    """
+    
+    media_type = 'text/html; charset=utf-8'
+    extension = 'html'
+    
+    def __init__(self, template_dir: str = TEMPLATE_DIR, template_name: str = 'transcript_document.html'):
+        self.template_dir = template_dir
+        self.template_name = template_name
+        self._template = None
+        self._lock = Lock()
+    
+    def _get_template(self):
+        with self._lock:
+            if self._template is None:
+                from jinja2 import Environment, FileSystemLoader
+                environment = Environment(loader=FileSystemLoader(self.template_dir), autoescape=True,
+                                          trim_blocks=True, lstrip_blocks=True)
+                self._template = environment.get_template(self.template_name)
+            return self._template
+    
+    def render(self, model: Dict) -> bytes:
+        return self._get_template().render(
+            transcript=model, institution=INSTITUTION_NAME, is_passed=GradeManager.is_passed
+        ).encode('utf-8')
+
+
+class JsonLdTranscriptRenderer(TranscriptRenderer):
+    """
+    Machine-readable transcript as an Open Badges 3.0 credential (JSON-LD)
+    
+    The credential subject is the student (by NIM) and the achievement their
+    program's transcript. Each course grade, IPS, the IPK and the predicate
+    is a Result pointing at a ResultDescription of the achievement. The
+    credential carries no proof: a frozen transcript's id is its signed
+    /verify URL, which is how a receiver checks it.
+    """
+    
+    media_type = 'application/ld+json'
+    extension = 'jsonld'
+    
+    def __init__(self, issuer_id: Optional[str] = None, issuer_name: str = INSTITUTION_NAME):
+        self.issuer_id = issuer_id or "urn:x-transcript-system:issuer"
+        self.issuer_name = issuer_name
+    
+    def render(self, model: Dict) -> bytes:
+        return json.dumps(self.credential(model), ensure_ascii=False, indent=2).encode('utf-8')
+    
+    def credential(self, model: Dict) -> Dict:
+        student = model['student']
+        subject_id = f"urn:x-transcript:{quote(student['nim'])}"
+        descriptions = []
+        results = []
+        
+        def add(key, name, result_type, value):
+            description_id = f"{subject_id}:{key}"
+            descriptions.append({'id': description_id, 'type': ['ResultDescription'], 'name': name,
+                                 'resultType': result_type})
+            results.append({'type': ['Result'], 'resultDescription': description_id, 'value': value})
+        
+        for semester_data in model['semesters']:
+            semester = semester_data['semester']
+            for course in semester_data['courses']:
+                add(f"semester:{semester}:course:{quote(course.course_code)}",
+                    f"Semester {semester} - {course.course_code} {course.course_name} ({course.sks} SKS)",
+                    'LetterGrade', course.letter_grade)
+            add(f"semester:{semester}:ips", f"IPS Semester {semester}", 'GradePointAverage',
+                f"{semester_data['ips']:.2f}")
+        add("ipk", "IPK (Indeks Prestasi Kumulatif)", 'GradePointAverage', f"{model['ipk']:.2f}")
+        add("predicate", "Predikat Kelulusan", 'PerformanceLevel', model['graduation_predicate'])
+        
+        snapshot = model.get('snapshot')
+        if model['verification']:
+            credential_id = model['verification']['url']
+        elif snapshot:
+            credential_id = f"{subject_id}:v{snapshot['version']}"
+        else:
+            credential_id = f"{subject_id}:current"
+        
+        credential = {
+            '@context': CREDENTIAL_CONTEXT,
+            'id': credential_id,
+            'type': ['VerifiableCredential', 'OpenBadgeCredential'],
+            'name': f"Transkrip Akademik {student['name']}",
+            'issuer': {'id': self.issuer_id, 'type': ['Profile'], 'name': self.issuer_name},
+            'validFrom': model['generated_at'].astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'credentialSubject': {
+                'type': ['AchievementSubject'],
+                'identifier': [{'type': 'IdentityObject', 'identityHash': student['nim'],
+                                'identityType': 'studentId', 'hashed': False}],
+                'achievement': {
+                    'id': f"urn:x-transcript:program:{quote(student['program_study'])}",
+                    'type': ['Achievement'],
+                    'name': f"Transkrip Akademik {student['program_study']}",
+                    'description': f"Nilai mata kuliah, IPS dan IPK angkatan {student['batch_year']}",
+                    'criteria': {'narrative': "Nilai yang tercatat pada sistem akademik"},
+                    'resultDescription': descriptions
+                },
+                'creditsEarned': model['total_sks'],
+                'result': results
+            }
+        }
+        if model['provisional']:
+            credential['description'] = ("Transkrip sementara: memuat nilai semester yang belum ditutup, "
+                                         "tidak dapat diverifikasi.")
+        return credential
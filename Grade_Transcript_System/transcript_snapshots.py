@@ -0,0 +1,56 @@
+"""
+Transcript Snapshots - Compact, hashed encoding of transcripts frozen at semester close
+"""
+import hashlib
+import json
+import zlib
+from functools import lru_cache
+from typing import Dict, Tuple
+from records import GradeRecord
+
+
+def _default(value):
+    if isinstance(value, GradeRecord):
+        return value.to_dict()
+    raise TypeError(f"Cannot snapshot {type(value).__name__}")
+
+
+def encode(transcript: Dict) -> Tuple[str, bytes]:
+    """
+    Serialize a transcript for storage
+    
+    The transcript is written as canonical JSON (sorted keys, no whitespace)
+    so equal transcripts always give the same bytes and the same hash.
+    
+    Returns:
+        Tuple[str, bytes]: SHA-256 hex digest of the canonical JSON and the
+            zlib-compressed JSON
+    """
+    
+    canonical = json.dumps(transcript, sort_keys=True, separators=(',', ':'),
+                           ensure_ascii=False, default=_default).encode('utf-8')
+    return hashlib.sha256(canonical).hexdigest(), zlib.compress(canonical, 9)
+
+
+@lru_cache(maxsize=1024)
+def _parse(content_hash: str, content: bytes) -> Dict:
+    # Keyed on the hash too; snapshots are immutable, so a hit never goes stale
+    return json.loads(zlib.decompress(content).decode('utf-8'))
+
+
+def decode(content_hash: str, content: bytes) -> Dict:
+    """
+    Transcript stored by encode(), with courses as GradeRecords again
+    
+    Decompressed snapshots are cached; every call returns fresh objects so
+    callers may modify the result.
+    """
+    
+    parsed = _parse(content_hash, content)
+    transcript = dict(parsed)
+    transcript['student'] = dict(parsed['student'])
+    transcript['semesters'] = [
+        dict(semester, courses=[GradeRecord.from_dict(course) for course in semester['courses']])
+        for semester in parsed['semesters']
+    ]
+    return transcript
@@ -0,0 +1,102 @@
+"""
+Transcript Verification - Signed tokens for printed transcripts, checked against stored snapshots
+"""
+import hashlib
+import hmac
+from typing import Dict, Optional, Union
+from repositories import get_storage
+import transcript_snapshots
+
+
+class TranscriptSigner:
+    """
+    HMAC-SHA256 signatures over semester-close snapshot hashes
+    
+    A token is "<content_hash>.<signature>". Verifying one is a constant-time
+    signature check plus one indexed lookup of the hash in
+    transcript_snapshots; the PDF is never regenerated.
+    """
+    
+    SIGNATURE_BYTES = 16  # Truncated HMAC keeps the QR code small
+    
+    def __init__(self, key: Union[str, bytes], base_url: str = ''):
+        if not key:
+            raise ValueError("A signing key is required")
+        self._key = key.encode('utf-8') if isinstance(key, str) else key
+        self.base_url = base_url.rstrip('/')
+    
+    def _signature(self, content_hash: str) -> str:
+        digest = hmac.new(self._key, content_hash.encode('ascii'), hashlib.sha256).digest()
+        return digest[:self.SIGNATURE_BYTES].hex()
+    
+    def sign(self, content_hash: str) -> str:
+        """Token for a snapshot content hash"""
+        return f"{content_hash}.{self._signature(content_hash)}"
+    
+    def token_for(self, transcript: Dict) -> Optional[str]:
+        """
+        Token for a transcript, if everything on it is frozen in a snapshot
+        
+        Transcripts with grades after the latest closed semester are still
+        provisional and get None.
+        """
+        
+        snapshot = transcript.get('snapshot')
+        if not snapshot:
+            return None
+        if any(semester_data['semester'] > snapshot['closed_semester']
+               for semester_data in transcript['semesters']):
+            return None
+        return self.sign(snapshot['content_hash'])
+    
+    def verify_url(self, token: str) -> str:
+        return f"{self.base_url}/verify/{token}"
+    
+    def check(self, token: str) -> Optional[str]:
+        """Content hash of a token with a valid signature, else None"""
+        
+        if not token.isascii():
+            return None
+        content_hash, _, signature = token.partition('.')
+        if not content_hash or not signature:
+            return None
+        if not hmac.compare_digest(signature, self._signature(content_hash)):
+            return None
+        return content_hash
+    
+    def verify(self, token: str) -> Optional[Dict]:
+        """
+        Check a token against the stored snapshots
+        
+        Returns:
+            Dict: The student, version and results the token vouches for, and
+                whether that version is still the student's latest; None if
+                the signature is invalid or no snapshot has the hash
+        """
+        
+        content_hash = self.check(token)
+        if content_hash is None:
+            return None
+        
+        storage = get_storage()
+        snapshot = storage.snapshots.find_by_hash(content_hash)
+        if snapshot is None:
+            return None
+        
+        transcript = transcript_snapshots.decode(snapshot['content_hash'], snapshot['content'])
+        latest = storage.snapshots.list_versions(snapshot['nim'])[0]['version']
+        student = transcript['student']
+        return {
+            'valid': True,
+            'nim': student['nim'],
+            'name': student['name'],
+            'program_study': student['program_study'],
+            'version': snapshot['version'],
+            'latest_version': latest,
+            'closed_semester': snapshot['closed_semester'],
+            'total_sks': transcript['total_sks'],
+            'ipk': transcript['ipk'],
+            'graduation_predicate': transcript['graduation_predicate'],
+            'issued_at': snapshot['created_at'],
+            'content_hash': content_hash
+        }